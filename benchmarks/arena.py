@@ -0,0 +1,130 @@
+"""
+Headless benchmark of the MainView game loop.
+
+Runs MainView.frame() with SDL's dummy video driver for a number of
+frames without a frame cap while replaying a scripted sequence of key
+presses, and reports frames per second along with p50/p95/p99 frame
+times for each phase of the loop, as timed by the game's own Profiler.
+Results are written as JSON so runs can be compared, i.e. on CI
+machines without a display.
+
+Run from the root of the repo:
+    python -m benchmarks.arena --frames 2000 --out bench.json
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # must be set before the display is created
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import pygame
+from start import MainView, SCR_WIDTH, SCR_HEIGHT
+from modules.profiler import Profiler
+
+FRAME_TIME = 1.0 / 60 # simulated seconds per frame, keeps the work per frame the same every run
+PHASES = ["events", "arm.update", "player.update", "arena.update", "draw", "flip"]
+
+# (frame, event type, key) cycled through every len(SCRIPT) frames
+SCRIPT_LENGTH = 480
+SCRIPT = [
+    (0, pygame.KEYDOWN, pygame.K_RIGHT),
+    (60, pygame.KEYDOWN, pygame.K_UP),
+    (150, pygame.KEYDOWN, pygame.K_UP),
+    (200, pygame.KEYUP, pygame.K_RIGHT),
+    (210, pygame.KEYDOWN, pygame.K_LEFT),
+    (300, pygame.KEYDOWN, pygame.K_UP),
+    (400, pygame.KEYUP, pygame.K_LEFT),
+    (420, pygame.KEYDOWN, pygame.K_UP),
+]
+
+def percentile(values, pct):
+    """
+    return the pct percentile of sorted list values (nearest rank)
+    """
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values))) - 1))
+    return values[rank]
+
+def summarize(samples):
+    """
+    return dict of mean/p50/p95/p99/max in milliseconds for list of seconds
+    """
+    values = sorted(samples)
+    ms = 1000.0
+    return {"mean": sum(values) / len(values) * ms if values else 0.0,
+            "p50": percentile(values, 50) * ms,
+            "p95": percentile(values, 95) * ms,
+            "p99": percentile(values, 99) * ms,
+            "max": values[-1] * ms if values else 0.0}
+
+def postScripted(frame):
+    """
+    Post the scripted key events for frame to the pygame event queue
+    """
+    beat = frame % SCRIPT_LENGTH
+    for at, kind, key in SCRIPT:
+        if at == beat:
+            pygame.event.post(pygame.event.Event(kind, key=key))
+
+def run(frames, dirty=False, warmup=60):
+    """
+    Run the game loop for frames frames after warmup frames
+    and return dict of results
+    """
+    profiler = Profiler()
+    profiler.enabled = True
+    view = MainView(SCR_WIDTH, SCR_HEIGHT, dirty=dirty, profiler=profiler)
+    view.setup()
+    timings = {name: [] for name in PHASES}
+    totals = []
+
+    for frame in range(warmup + frames):
+        postScripted(frame)
+        profiler.clear() # only this frame's scopes
+        view.frame(FRAME_TIME)
+
+        if frame < warmup:
+            continue
+        spent = dict.fromkeys(PHASES, 0.0)
+        for name, start, duration in profiler.scopes():
+            if name == "frame":
+                totals.append(duration)
+            elif name in spent:
+                spent[name] += duration # summed over the frame's physics steps
+        for name in PHASES:
+            timings[name].append(spent[name])
+
+    view.teardown()
+    pygame.quit()
+    wall = sum(totals)
+    return {"frames": frames,
+            "renderer": "dirty" if dirty else "full",
+            "fps": frames / wall if wall else 0.0,
+            "frame": summarize(totals),
+            "phases": {name: summarize(timings[name]) for name in PHASES},
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "machine": platform.machine()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark of the arena game loop")
+    parser.add_argument("--frames", type=int, default=2000, help="number of frames to time")
+    parser.add_argument("--warmup", type=int, default=60, help="frames to run before timing")
+    parser.add_argument("--dirty", action="store_true", help="use the dirty-rect renderer")
+    parser.add_argument("--out", help="file to write JSON results to (default stdout)")
+    args = parser.parse_args()
+
+    results = run(args.frames, dirty=args.dirty, warmup=args.warmup)
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print("{:.1f} fps, p99 frame {:.2f} ms -> {}".format(
+            results["fps"], results["frame"]["p99"], args.out))
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
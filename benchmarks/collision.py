@@ -0,0 +1,61 @@
+"""
+Benchmark of per-frame platform collision cost as the number of
+platforms in the arena grows. Compares pygame.sprite.spritecollide
+against the whole group with queries through the arena's SpatialHash.
+
+Run from the root of the repo:
+    python -m benchmarks.collision
+"""
+import random
+import time
+import pygame
+from start import Platform
+from modules.spatial import SpatialHash, IndexedGroup
+
+COUNTS = [5, 50, 500, 1000, 5000, 10000]
+FRAMES = 600
+SPACING = 80 # world pixels per platform, so longer arenas keep the same density
+
+def makeLevel(count, seed=0):
+    """
+    return (plain Group, IndexedGroup) holding the same count platforms
+    """
+    rng = random.Random(seed)
+    group = pygame.sprite.Group()
+    indexed = IndexedGroup(SpatialHash())
+    for i in range(count):
+        block = Platform(64, 16)
+        block.rect.x = rng.randrange(0, count * SPACING)
+        block.rect.y = rng.randrange(100, 460)
+        group.add(block)
+        indexed.add(block)
+    return group, indexed
+
+def run(count, collide):
+    """
+    Move a player sized sprite across the level making the same three
+    collision queries Player.update and Player.jump make each frame.
+    return average seconds per frame
+    """
+    player = pygame.sprite.Sprite()
+    player.rect = pygame.Rect(0, 200, 40, 60)
+    width = count * SPACING
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        player.rect.x = (frame * 7) % width
+        player.rect.y = 100 + (frame * 3) % 360
+        collide(player)
+        collide(player)
+        collide(player)
+    return (time.perf_counter() - start) / FRAMES
+
+def main():
+    print("{:>9} {:>16} {:>16}".format("platforms", "spritecollide us", "spatial hash us"))
+    for count in COUNTS:
+        group, indexed = makeLevel(count)
+        brute = run(count, lambda p: pygame.sprite.spritecollide(p, group, False))
+        hashed = run(count, indexed.collide)
+        print("{:>9} {:>16.1f} {:>16.1f}".format(count, brute * 1e6, hashed * 1e6))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of enemy simulation cost per physics step, comparing
+Enemy.update on every sprite with the NumPy EnemySim backend.
+
+Run from the root of the repo:
+    python -m benchmarks.enemies
+"""
+import random
+import time
+import pygame
+from start import Platform, SCR_WIDTH, SCR_HEIGHT, PHYSICS_HZ
+from modules.enemy import EnemyPool
+from modules.enemysim import EnemySim
+from modules.spatial import SpatialHash, IndexedGroup
+
+COUNTS = [10, 100, 500, 1000, 2000, 5000]
+STEPS = 240
+LEVEL = [[500, 25, 0, 400], [210, 70, 500, 500], [210, 70, 800, 400],
+         [210, 70, 1000, 500], [210, 70, 1120, 280]] # same platforms as Arena
+
+class BenchLevel():
+    """
+    Just the parts of Arena that enemies use
+    """
+    def __init__(self):
+        self.index = SpatialHash()
+        self.platform_list = IndexedGroup(self.index)
+        self.enemy_list = IndexedGroup(self.index)
+        for width, height, x, y in LEVEL:
+            block = Platform(width, height)
+            block.rect.topleft = (x, y)
+            self.platform_list.add(block)
+
+def spawn(count, sim=None, seed=0):
+    """
+    return (level, pool, target) with count enemies spread over the level
+    """
+    rng = random.Random(seed)
+    level = BenchLevel()
+    pool = EnemyPool(count, sim=sim)
+    target = pygame.sprite.Sprite()
+    target.rect = pygame.Rect(600, 400, 40, 60)
+    for i in range(count):
+        enemy = pool.acquire()
+        enemy.spawn(level, rng.randrange(-2000, 3000), rng.randrange(0, SCR_HEIGHT // 2), target)
+        level.enemy_list.add(enemy)
+    return level, pool, target
+
+def runSprites(count):
+    """
+    return average seconds per step updating each enemy sprite
+    """
+    level, pool, target = spawn(count)
+    step = 1.0 / PHYSICS_HZ
+    start = time.perf_counter()
+    for i in range(STEPS):
+        level.enemy_list.update(step)
+        level.enemy_list.refresh()
+    return (time.perf_counter() - start) / STEPS
+
+def runArrays(count):
+    """
+    return average seconds per step simulating enemies with EnemySim
+    """
+    sim = EnemySim()
+    level, pool, target = spawn(count, sim)
+    view = pygame.Rect(300, 0, SCR_WIDTH, SCR_HEIGHT)
+    step = 1.0 / PHYSICS_HZ
+    start = time.perf_counter()
+    for i in range(STEPS):
+        sim.step(step, target.rect.centerx, level.platform_list)
+        sim.sync(pool.enemies, level.enemy_list, view)
+    return (time.perf_counter() - start) / STEPS
+
+def main():
+    print("{:>8} {:>12} {:>12} {:>8}".format("enemies", "sprites us", "numpy us", "speedup"))
+    for count in COUNTS:
+        sprites = runSprites(count)
+        arrays = runArrays(count)
+        print("{:>8} {:>12.1f} {:>12.1f} {:>7.1f}x".format(
+            count, sprites * 1e6, arrays * 1e6, sprites / arrays))
+
+if __name__ == "__main__":
+    main()
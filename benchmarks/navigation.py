@@ -0,0 +1,91 @@
+"""
+Benchmark of enemy pathfinding cost with the arena's NavGraph.
+Every frame each chaser finds a route to the player, once by running
+A* (NavGraph.search) itself, which is what searching per enemy per
+frame would cost, and once through the graph's path cache.
+
+Run from the root of the repo:
+    python -m benchmarks.navigation
+"""
+import random
+import time
+import pygame
+from start import Platform
+from modules.spatial import SpatialHash, IndexedGroup
+from modules.render import StaticLayer
+from modules.navigation import NavGraph
+from modules.player import SCR_WIDTH, SCR_HEIGHT
+
+CHASERS = [10, 100, 500]
+PLATFORMS = 200
+FRAMES = 120
+SPACING = 80 # world pixels per platform
+
+class Level():
+    """
+    Just the parts of an Arena the NavGraph uses
+    """
+    def __init__(self, count, seed=0):
+        rng = random.Random(seed)
+        self.platform_list = IndexedGroup(SpatialHash())
+        for i in range(count):
+            block = Platform(rng.randrange(60, 200), 16)
+            block.rect.x = rng.randrange(0, count * SPACING)
+            block.rect.y = rng.randrange(160, SCR_HEIGHT - 40)
+            self.platform_list.add(block)
+        self.staticLayer = StaticLayer(self.platform_list, SCR_WIDTH, SCR_HEIGHT)
+
+def standing(block):
+    """
+    return enemy sized rect standing on block, or on the ground if block is None
+    """
+    rect = pygame.Rect(0, 0, 40, 60)
+    if block is None:
+        rect.midbottom = (random.randrange(0, PLATFORMS * SPACING), SCR_HEIGHT)
+    else:
+        rect.midbottom = block.rect.midtop
+    return rect
+
+def run(level, chasers, cached):
+    """
+    return (seconds per frame, A* searches run) for chasers routing to a player
+    that moves to a different platform every 10 frames, through the path
+    cache if cached is True, else with an A* search for every chaser every frame
+    """
+    nav = NavGraph(level)
+    nav.current()
+    blocks = list(level.platform_list) + [None] * 20
+    rng = random.Random(1)
+    rects = [standing(rng.choice(blocks)) for i in range(chasers)]
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        if frame % 10 == 0:
+            player = standing(rng.choice(blocks))
+        if cached:
+            for rect in rects:
+                nav.route(rect, player)
+        else:
+            goal = nav.nodeAt(player)
+            for rect in rects:
+                node = nav.nodeAt(rect)
+                if node is not None and goal is not None:
+                    nav.search(node, goal)
+    return (time.perf_counter() - start) / FRAMES, nav.searches
+
+def main():
+    level = Level(PLATFORMS)
+    nav = NavGraph(level)
+    start = time.perf_counter()
+    nav.build()
+    edges = sum(len(node.edges) for node in nav.nodes.values())
+    print("graph of {} nodes, {} edges built in {:.2f} ms".format(
+        len(nav.nodes), edges, (time.perf_counter() - start) * 1000))
+    print("{:>8} {:>14} {:>10} {:>14} {:>10}".format("chasers", "search ms", "searches", "cached ms", "searches"))
+    for chasers in CHASERS:
+        plain, plainSearches = run(level, chasers, False)
+        cached, cachedSearches = run(level, chasers, True)
+        print("{:>8} {:>14.3f} {:>10} {:>14.3f} {:>10}".format(
+            chasers, plain * 1000, plainSearches, cached * 1000, cachedSearches))
+
+if __name__ == "__main__":
+    main()
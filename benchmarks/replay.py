@@ -0,0 +1,84 @@
+"""
+Headless replay of a fight recorded with start.py --record.
+
+Feeds the recorded frames back into MainView with SDL's dummy video
+driver and checks the player and enemy state, hashed every few frames
+as the fight goes, against the hash stored in the recording, so a
+change that alters how the game plays shows up as a mismatch. Exits
+with status 1 when the hashes differ.
+
+Replay the fight kept in the repo, which goes on to the first wave
+simulated with numpy, from the root of the repo:
+    python -m benchmarks.replay
+the short fight that stays in the first wave plays back faster:
+    python -m benchmarks.replay benchmarks/recordings/short-fight.json
+or record a fight and replay that:
+    python start.py --record fight.json --seed 7
+    python -m benchmarks.replay fight.json
+A change that is meant to alter gameplay stores the new hash with --update.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # must be set before the display is created
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import sys
+import time
+import pygame
+from modules.replay import InputPlayer
+from start import MainView, SCR_WIDTH, SCR_HEIGHT
+
+RECORDINGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+RECORDING = os.path.join(RECORDINGS, "wave-7.json")
+
+def replay(player):
+    """
+    Play the recording of InputPlayer player back headless.
+    returns (state hash, wave -> enemy backend name, frames played, seconds taken)
+    """
+    view = MainView(SCR_WIDTH, SCR_HEIGHT, seed=player.seed, input=player)
+    view.setup()
+    start = time.perf_counter()
+    frames = 0
+    running = True
+    while running and not player.done():
+        running = view.frame(0.0) # frame times come from the recording
+        frames += 1
+    wall = time.perf_counter() - start
+    view.teardown()
+    pygame.quit()
+    return player.hash, player.backends, frames, wall
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded fight and check its state")
+    parser.add_argument("recording", nargs="?", default=RECORDING,
+                        help="file written by start.py --record (default the wave 7 fight in benchmarks/recordings)")
+    parser.add_argument("--update", action="store_true", help="store the new hash in the recording")
+    args = parser.parse_args()
+
+    player = InputPlayer.load(args.recording)
+    recording = player.recording
+    if not args.update and not recording.get("hash"):
+        sys.exit("{} has no state hash, store one with --update".format(args.recording))
+    digest, backends, frames, wall = replay(player)
+    print("{} frames in {:.2f}s ({:.1f} fps)".format(frames, wall, frames / wall if wall else 0.0))
+    print("waves " + ", ".join("{} {}".format(wave, name) for wave, name in backends.items()))
+    if not args.update and backends != recording["backends"]:
+        print("warning: recorded with enemy backends {}, replayed with {}".format(
+            recording["backends"], backends))
+
+    if args.update:
+        recording["hash"] = digest
+        recording["backends"] = backends
+        with open(args.recording, "w") as f:
+            json.dump(recording, f)
+        print("stored hash " + digest)
+    elif digest == recording["hash"]:
+        print("state matches " + digest)
+    else:
+        sys.exit("STATE MISMATCH replaying {}: expected {} got {}".format(
+            args.recording, recording["hash"], digest))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Run the whole game: the task menu and the arena in one window.
+Fights get the menu's PlayerStats object, so upgrades and experience
+are shared in memory and switching scenes doesn't reload anything.
+"""
+import mainmenu
+import start
+from modules.scenes import Scene, SceneManager
+from modules.profiler import Profiler
+
+MENU_FPS = 60
+ARENA_FPS = 60
+
+class MenuScene(Scene):
+    """
+    Scene running the MainMenu
+    """
+    fps = MENU_FPS
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.menu = mainmenu.MainMenu(fightFnc=self.fight)
+        self.profiler = Profiler() # shared by every fight so profiling stays on between them
+        self.started = False
+
+    def enter(self):
+        if not self.started:
+            self.menu.init(screen=self.manager.screen)
+            self.started = True
+        else:
+            self.menu.repaintall() # the arena drew over the whole screen
+
+    def frame(self, seconds):
+        self.menu.loop()
+        return not self.menu._quit
+
+    def fight(self):
+        """
+        Start a fight with the player's stats
+        """
+        self.manager.switch(ArenaScene(self.manager, self))
+
+class ArenaScene(Scene):
+    """
+    Scene running one fight in the arena, goes back to the menu when it's over
+    """
+    fps = ARENA_FPS
+
+    def __init__(self, manager, menuScene):
+        self.manager = manager
+        self.menuScene = menuScene
+        self.view = start.MainView(start.SCR_WIDTH, start.SCR_HEIGHT, fps=self.fps,
+                                   screen=manager.screen, stats=menuScene.menu._player,
+                                   profiler=menuScene.profiler)
+
+    def enter(self):
+        self.view.setup()
+
+    def leave(self):
+        self.view.teardown()
+
+    def frame(self, seconds):
+        if self.view.frame(seconds):
+            return True
+        if self.view.closed: # window closed during the fight
+            self.menuScene.menu.saveAndQuit()
+            return False
+        self.manager.switch(self.menuScene)
+        return True
+
+if __name__ == '__main__':
+    manager = SceneManager(mainmenu.SCR_WIDTH, mainmenu.SCR_HEIGHT)
+    manager.run(MenuScene(manager))
@@ -1,34 +1,68 @@
+import os
+import atexit
+import threading
 import pygame
 from pygame.locals import *
 from pgu import gui
 from tinydb import TinyDB
 from modules import taskwidgets, player, statwidget
+from modules.assets import manager as assets
+from modules.storage import JournalStore
+from modules.autosave import AutoSaver
+from modules.taskrepo import SQLiteTaskRepository, TaskPages
+from modules.scheduler import DueScheduler, TASK_DUE
+from modules import taskio
+import start
 
 # Screen dimensions
 SCR_WIDTH = 640
 SCR_HEIGHT = 480
 
+TASK_DB = 'data/tasks.sqlite'
+PLAYER_STORE = 'data/player.db'
+PLAYER_RECORD = 1 # id of the player stats record in PLAYER_STORE
+# files saved by older versions, imported the first time the stores are created
+LEGACY_TASK_STORE = 'data/tasks.db'
+LEGACY_TASKS = 'data/taskData.json'
+LEGACY_PLAYER = 'data/playerDB.json'
+TASK_XP = 10 # experience for completing a task
+AUTOSAVE_DELAY = 2.0 # seconds without edits before saving
+AUTOSAVE_BATCH = 50 # edits waiting that save without waiting for AUTOSAVE_DELAY
+FILE_DONE = pygame.USEREVENT + 2 # posted by the import/export thread when it finishes
+
         
 
 class MainMenu(gui.Desktop):
     def debugKeys(self):
         keys=pygame.key.get_pressed()
         if keys[K_u]: # TEST LEVELING UP
-            self._player.addExperience(10)
-            self.statsTable.updateStats(self._player)
+            self._player.addExperience(10) # stats table picks up the change next frame
             
-    def __init__(self,**params):
+    def __init__(self, fightFnc=None, **params):
+        """
+        Create the menu. fightFnc is called with no arguments when the
+        'Fight' button is clicked
+        """
         gui.Desktop.__init__(self,**params)
+        self.fightFnc = fightFnc
         self.connect(gui.QUIT,self.saveAndQuit)
         self.connect(pygame.KEYDOWN, self.debugKeys) #DEBUG purposes
+        self.connect(TASK_DUE, self.taskDue)
+        self.connect(FILE_DONE, self.fileDone)
+        self.fileThread = None # thread importing or exporting tasks
+        assets.preload(start.ARENA_ASSETS) # read the arena's files while the menu is open
         layout = gui.Table(width=SCR_WIDTH,height=SCR_HEIGHT)
         
         # Create a TaskList
         self.taskList = taskwidgets.TaskList(editFnc=self.editTask, doneFnc=self.completeTask, removeFnc=self.removeTask,
-                                    width=400, height=420, style={'border':1})
+                                    virtual=True, width=400, height=420, style={'border':1})
         # load user data
+        self.openStores()
         self.loadTasks()
         self._player = self.loadPlayerStats()
+        self.autosave = AutoSaver([self.taskRepo, self.playerStore],
+                                  delay=AUTOSAVE_DELAY, maxPending=AUTOSAVE_BATCH)
+        atexit.register(self.autosave.stop) # still save if the game exits without saveAndQuit
         
         # initialize dialogs
         self.taskDialog = taskwidgets.TaskDialog()
@@ -57,7 +91,19 @@ class MainMenu(gui.Desktop):
         newTaskBtn = gui.Button("New Task")
         newTaskBtn.connect(gui.CLICK, self.newTask)
         
+        # Add 'Import' and 'Export' buttons
+        importBtn = gui.Button("Import")
+        importBtn.connect(gui.CLICK, self.openFileDialog, "Import Tasks", self.importTasks)
+        exportBtn = gui.Button("Export")
+        exportBtn.connect(gui.CLICK, self.openFileDialog, "Export Tasks", self.exportTasks)
+        layout.td(importBtn, row=1, col=6)
+        layout.td(exportBtn, row=1, col=8)
+        self.fileStatus = gui.Label("", width=200) # result of the last import or export, or a failed autosave
+        self.saveError = None # autosave error shown in fileStatus
+        layout.td(self.fileStatus, row=2, col=6, colspan=3)
+        
         fightBtn = gui.Button("Fight")
+        fightBtn.connect(gui.CLICK, self.fight)
         quitBtn = gui.Button("Quit")
         quitBtn.connect(gui.CLICK, self.saveAndQuit)
         
@@ -70,70 +116,111 @@ class MainMenu(gui.Desktop):
         self.widget = layout
         
         
+    def fight(self):
+        """
+        callback for the 'Fight' button
+        """
+        self.savePlayerStats()
+        if self.fightFnc is not None:
+            self.fightFnc()
+        
     def saveAndQuit(self):
         """
         Save tasks and player stats to DB files
         and quit game
         """
-        self.saveTasks()
+        if self.fileThread is not None:
+            self.fileThread.join() # let an import or export finish with the repository
         self.savePlayerStats()
+        self.autosave.stop() # final flush of everything still waiting
+        self.taskRepo.close()
+        self.playerStore.close()
         self.quit()
         
         
+    def openStores(self):
+        """
+        Open the task repository and player store, importing the
+        files of older versions the first time
+        """
+        newPlayer = not os.path.exists(PLAYER_STORE) and not os.path.exists(PLAYER_STORE + '.journal')
+        if not os.path.isdir(os.path.dirname(TASK_DB)):
+            os.makedirs(os.path.dirname(TASK_DB))
+        self.taskRepo = SQLiteTaskRepository(TASK_DB)
+        self.playerStore = JournalStore(PLAYER_STORE)
+        
+        if self.taskRepo.isEmpty(): # also retries a migration that didn't finish
+            self.migrateTasks()
+        if newPlayer and os.path.exists(LEGACY_PLAYER):
+            records = TinyDB(LEGACY_PLAYER).all()
+            if len(records) > 0:
+                self.playerStore.update(PLAYER_RECORD, dict(records[0]))
+                self.playerStore.compact()
+        
+    def migrateTasks(self):
+        """
+        One-shot import of tasks saved by older versions, either in
+        a JournalStore or a TinyDB file, into the new task repository.
+        The old files are renamed once their tasks are saved, so tasks
+        aren't imported again after the user removes every task.
+        """
+        if os.path.exists(LEGACY_TASK_STORE) or os.path.exists(LEGACY_TASK_STORE + '.journal'):
+            store = JournalStore(LEGACY_TASK_STORE)
+            self.taskRepo.addMany(record for recordId, record in store.all())
+            store.close()
+            legacy = [LEGACY_TASK_STORE, LEGACY_TASK_STORE + '.journal']
+        elif os.path.exists(LEGACY_TASKS):
+            self.taskRepo.addMany(TinyDB(LEGACY_TASKS).all())
+            legacy = [LEGACY_TASKS]
+        else:
+            return
+        self.taskRepo.flush()
+        for path in legacy:
+            if os.path.exists(path):
+                os.replace(path, path + '.migrated')
+        
     def savePlayerStats(self):
         """
-        Save player stats to playerDB file
+        Queue player stats to be autosaved if they changed
         """
-        playerDB = TinyDB('data/playerDB.json')
-        playerDB.purge() # remove old stats
         record = {'hp': self._player.hp, 'mana': self._player.mana,
                 'stamina': self._player.stamina, 'strength': self._player.strength,
                 'atkSpeed': self._player.atkSpeed, 'netArmor': self._player.netArmor,
                 'xp': self._player.xp, 'skillPts': self._player.skillPts, 'lvl': self._player.lvl,
                 'xpNeeded': self._player.xpNeeded}
-        playerDB.insert(record)
-        
-    def saveTasks(self):
-        """
-        Saves all tasks in TaskList to the taskDB file
-        """
-        taskDB = TinyDB('data/taskData.json')
-        taskDB.purge()
-        for task in self.taskList.tasks:
-            record = {'name': task.name, 'notes': task.notes,
-                    'dueDate': task.dueDate, 'tags': task.tags } # tinydb expects data to be dicts
-            taskDB.insert(record)
+        if self.playerStore.update(PLAYER_RECORD, record):
+            self.autosave.changed()
         
     def loadTasks(self):
         """
-        Loads users tasks from db into program
+        Loads users tasks from db into program,
+        replacing any tasks already loaded. The TaskList reads the
+        open tasks a page at a time as they are scrolled to, only
+        the tasks with a due date are read up front to be scheduled.
         """
-        taskDB = TinyDB('data/taskData.json')
-        allTasks = taskDB.all()
-        for record in allTasks: # reconstruct Task object from dict
-            t = taskwidgets.Task(name=record['name'], notes=record['notes'],
-                        duedate=record['dueDate'], tags=record['tags'])
-            self.taskList.addTask(t)
+        self.taskList.setTasks(TaskPages(self.taskRepo))
+        self.scheduler = DueScheduler()
+        for t in TaskPages(self.taskRepo, hasDue=True):
+            self.scheduler.add(t)
             
     def loadPlayerStats(self):
         """
         Load the user's player stats into memory from db
         returns a PlayerStats object
         """
-        playerDB = TinyDB('data/playerDB.json')
-        records = playerDB.all()
-        if len(records) == 0:
+        record = self.playerStore.get(PLAYER_RECORD)
+        if record is None:
             return player.PlayerStats() # no stats for player, load default
         else:
-            stats = player.PlayerStats(hp=records[0]['hp'], mana=records[0]['mana'],
-                    stamina=records[0]['stamina'], strength=records[0]['strength'],
-                    atkSpeed=records[0]['atkSpeed'], armor=records[0]['netArmor'],
-                    xp=records[0]['xp'], skillPts=records[0]['skillPts'], lvl=records[0]['lvl'],
-                    xpNeeded=records[0]['xpNeeded'])
+            stats = player.PlayerStats(hp=record['hp'], mana=record['mana'],
+                    stamina=record['stamina'], strength=record['strength'],
+                    atkSpeed=record['atkSpeed'], armor=record['netArmor'],
+                    xp=record['xp'], skillPts=record['skillPts'], lvl=record['lvl'],
+                    xpNeeded=min(record['xpNeeded'], player.XP_TABLE[-1])) # older saves have Infinity once maxed
             return stats
         
     def editTask(self, task, task_index):
-        self.selectedTask = task_index
+        self.selectedTask = (task, task_index)
         self.taskDialog.updateState("edit")
         self.taskDialog.fillForm(task)
         self.taskDialog.open()
@@ -143,17 +230,21 @@ class MainMenu(gui.Desktop):
         """
         callback for completing tasks in TaskList
         """
-        self.selectedTask = task_index
-        # do stuff to give xp to character and update DB
-        self.taskList.removeTask(task_index)
+        self.taskRepo.complete(task.id)
+        self.scheduler.remove(task)
+        self._player.addExperience(TASK_XP)
+        self.savePlayerStats()
+        self.autosave.changed()
+        self.taskList.removeTask(task_index, task)
         
     def removeTask(self, task, task_index):
         """
         callback for removing tasks from TaskList
         """
-        self.selectedTask = task_index
-        # do stuff to update DB
-        self.taskList.removeTask(task_index)
+        self.taskRepo.remove(task.id)
+        self.scheduler.remove(task)
+        self.autosave.changed()
+        self.taskList.removeTask(task_index, task)
         
     def newTask(self):
         self.taskDialog.updateState("new")
@@ -167,11 +258,116 @@ class MainMenu(gui.Desktop):
         """
         t = self.taskDialog.getTask()
         if self.taskDialog.state == "new":
+            t.id = self.taskRepo.add(t)
             self.taskList.addTask(t)
+            self.scheduler.add(t)
         elif self.taskDialog.state == "edit":
-            self.taskList.updateTask(t, self.selectedTask)
+            old, task_index = self.selectedTask
+            t.id = old.id # keep id of the task being edited
+            self.taskRepo.update(t)
+            self.scheduler.replace(old, t)
+            self.taskList.updateTask(t, task_index)
+        self.autosave.changed()
         self.taskDialog.close()
         
+    def loop(self):
+        """
+        One tick of the menu, posts TASK_DUE events for tasks whose
+        due date passed and updates stats that changed
+        """
+        self.scheduler.update()
+        self.statsTable.refreshStats() # one redraw for every stat changed since last tick
+        self.showSaveError()
+        gui.Desktop.loop(self)
+        
+    def showSaveError(self):
+        """
+        Show in fileStatus when autosaving starts failing, and when it works again
+        """
+        error = self.autosave.lastError
+        if error is self.saveError:
+            return
+        if error is not None:
+            self.fileStatus.set_text("Autosave failed: {}".format(error.strerror or error))
+        elif self.saveError is not None:
+            self.fileStatus.set_text("Autosave working again")
+        self.saveError = error
+        
+    def taskDue(self, _event):
+        """
+        callback for TASK_DUE events posted by the scheduler
+        """
+        self.taskList.markOverdue(_event.task)
+        
+    def openFileDialog(self, title, fnc):
+        """
+        Open a file dialog that calls fnc with the path the user picks
+        """
+        fileDiag = gui.FileDialog(title_txt=title, button_txt="Okay")
+        fileDiag.connect(gui.CHANGE, self.fileChosen, fileDiag, fnc)
+        fileDiag.open()
+        
+    def fileChosen(self, dialog, fnc):
+        """
+        callback when the file dialog is closed, calls fnc with the
+        chosen path unless the user picked nothing
+        """
+        dialog.close()
+        if dialog.value:
+            fnc(dialog.value)
+            
+    def importTasks(self, path):
+        """
+        Import tasks from a .jsonl, .csv or .ics file on a worker thread,
+        the TaskList is reloaded once when it is done
+        """
+        self.startFileTask("Import", taskio.importTasks, path)
+        
+    def exportTasks(self, path):
+        """
+        Export every task to a .jsonl, .csv or .ics file on a worker thread
+        """
+        self.startFileTask("Export", taskio.exportTasks, path)
+        
+    def startFileTask(self, kind, work, path):
+        """
+        Run work(repo, path) on a worker thread so big files don't freeze
+        the menu. One import or export runs at a time.
+        """
+        if self.fileThread is not None and self.fileThread.is_alive():
+            self.fileStatus.set_text("Wait for the last file to finish")
+            return
+        self.fileStatus.set_text(kind + "ing " + os.path.basename(path) + "...")
+        self.fileThread = threading.Thread(target=self.fileWorker, args=(kind, work, path),
+                                           name="taskfile", daemon=True)
+        self.fileThread.start()
+        
+    def fileWorker(self, kind, work, path):
+        """
+        Worker thread: run work and post a FILE_DONE event with the result,
+        also when it fails so the menu reloads what was imported before that
+        """
+        message = kind + " failed"
+        try:
+            count = work(self.taskRepo, path)
+            message = "{}ed {} tasks".format(kind, count)
+        except (OSError, ValueError) as e:
+            message = "{} failed: {}".format(kind, e)
+        finally:
+            self.autosave.changed()
+            pygame.event.post(pygame.event.Event(FILE_DONE, kind=kind, message=message))
+            
+    def fileDone(self, _event):
+        """
+        callback for FILE_DONE events, shows the result and reloads the
+        TaskList after an import, even one that failed part way through
+        """
+        try:
+            self.fileStatus.set_text(_event.message)
+        finally:
+            if _event.kind == "Import":
+                self.loadTasks()
+        
     def openStatsDialog(self):
         """
         Open the 'Upgrade Stats' dialog for user to upgrade
@@ -183,12 +379,12 @@ class MainMenu(gui.Desktop):
         
     def saveStats(self, dialog):
         """
-        Save the players new stats from the UpgradeStatsDialog
-        and upate the UI
+        Save the players new stats from the UpgradeStatsDialog.
+        Only the stats that changed are redrawn in the StatTable.
         """
-        self._player = dialog.stats
+        self._player.assign(dialog.stats)
         dialog.close()
-        self.statsTable.updateStats(self._player)
+        self.savePlayerStats()
 
 if __name__ == '__main__':
     app = MainMenu()
@@ -0,0 +1,179 @@
+"""
+Module to define the AssetManager that loads images and data files
+once, caches converted Surfaces and can preload the files a scene
+needs on a worker thread
+"""
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+def dataSize(data):
+    """
+    return approximate bytes used by parsed json data, counting
+    every dict, list, string and number in it
+    """
+    size = sys.getsizeof(data)
+    if isinstance(data, dict):
+        for key, value in data.items():
+            size += dataSize(key) + dataSize(value)
+    elif isinstance(data, list):
+        for value in data:
+            size += dataSize(value)
+    return size
+
+class AssetManager():
+    """
+    Loads each asset once and hands out the same object afterwards.
+    Images are cached after convert()/convert_alpha() so they blit fast.
+    preload() reads and decodes files on a worker thread (i.e. while
+    the menu is open) so creating the next scene doesn't wait on disk.
+    Only the worker thread touches the disk for preloaded assets,
+    converting to the display format still happens on the main thread.
+    """
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.pool = None # ThreadPoolExecutor, created on first preload
+        self.lock = threading.Lock()
+        self.loaded = {} # path -> Surface or data read by the worker, not converted yet
+        self.pending = {} # path -> Future of a preload in progress
+        self.requests = {} # path -> number of the preload in progress, results of older ones are dropped
+        self.requested = 0 # preloads started
+        self.images = {} # (path, alpha) -> converted Surface
+        self.data = {} # path -> parsed json
+        self.sizes = {} # path -> bytes of memory used
+        self.hits = 0 # requests answered from cache or a preload
+        self.misses = 0 # requests that had to read from disk on the calling thread
+
+    def read(self, path):
+        """
+        Read and decode the file at path, json files are parsed
+        and everything else is loaded as an image
+        """
+        if path.endswith(".json"):
+            with open(path) as f:
+                return json.load(f)
+        return pygame.image.load(path)
+
+    def preload(self, paths):
+        """
+        Start reading paths on the worker thread. Paths that are
+        already loaded or being loaded are skipped.
+        """
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        with self.lock:
+            for path in paths:
+                if path in self.pending or path in self.loaded or path in self.data or \
+                        (path, False) in self.images or (path, True) in self.images:
+                    continue
+                self.requested += 1
+                self.requests[path] = self.requested
+                self.pending[path] = self.pool.submit(self.work, path, self.requested)
+
+    def work(self, path, request):
+        """
+        Worker thread: read path and keep it until it is asked for,
+        unless it was forgotten while being read
+        """
+        try:
+            asset = self.read(path)
+        except (OSError, ValueError, pygame.error):
+            asset = None # let the main thread raise the error when it asks for it
+        with self.lock:
+            if self.requests.get(path) != request:
+                return # forgotten, or preloaded again, while it was read
+            if asset is not None:
+                self.loaded[path] = asset
+            self.pending.pop(path, None)
+            del self.requests[path]
+
+    def ready(self, paths):
+        """
+        return True if none of paths are still being preloaded
+        """
+        with self.lock:
+            return not any(path in self.pending for path in paths)
+
+    def take(self, path):
+        """
+        return the raw asset for path, from a preload if there was one
+        """
+        with self.lock:
+            future = self.pending.get(path)
+        if future is not None:
+            future.result() # already being read, wait for it instead of reading twice
+        with self.lock:
+            asset = self.loaded.pop(path, None)
+        if asset is not None:
+            self.hits += 1
+            return asset
+        self.misses += 1
+        return self.read(path)
+
+    def image(self, path, alpha=False):
+        """
+        return the image at path converted to the display format,
+        with per pixel alpha if alpha is True. Needs a display mode set.
+        """
+        key = (path, alpha)
+        surface = self.images.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        raw = self.take(path)
+        surface = raw.convert_alpha() if alpha else raw.convert()
+        self.images[key] = surface
+        self.sizes[path] = self.sizes.get(path, 0) + surface.get_pitch() * surface.get_height()
+        return surface
+
+    def json(self, path):
+        """
+        return the parsed json file at path
+        """
+        if path in self.data:
+            self.hits += 1
+            return self.data[path]
+        data = self.take(path)
+        self.data[path] = data
+        self.sizes[path] = dataSize(data)
+        return data
+
+    def forget(self, path):
+        """
+        Drop every cached copy of path to free its memory,
+        including one still being preloaded
+        """
+        with self.lock:
+            self.loaded.pop(path, None)
+            self.requests.pop(path, None)
+            future = self.pending.pop(path, None)
+            if future is not None:
+                future.cancel() # only stops it if the worker hasn't started it
+        self.images.pop((path, False), None)
+        self.images.pop((path, True), None)
+        self.data.pop(path, None)
+        self.sizes.pop(path, None)
+
+    def memory(self):
+        """
+        return dict of path -> bytes used by each cached asset,
+        approximate for json data
+        """
+        sizes = dict(self.sizes)
+        with self.lock:
+            for path, asset in self.loaded.items(): # preloaded but not asked for yet
+                if isinstance(asset, pygame.Surface):
+                    sizes[path] = asset.get_pitch() * asset.get_height()
+                else:
+                    sizes[path] = dataSize(asset)
+        return sizes
+
+    def totalMemory(self):
+        """
+        return bytes used by all cached assets
+        """
+        return sum(self.memory().values())
+
+manager = AssetManager() # shared by the whole game
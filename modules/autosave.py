@@ -0,0 +1,122 @@
+"""
+Module to define the AutoSaver that flushes JournalStores
+on a background thread while the menu keeps running
+"""
+import threading
+import time
+from collections import deque
+
+class AutoSaver():
+    """
+    Batches changes made to one or more JournalStores and flushes
+    them on a worker thread once no change has been made for delay
+    seconds, or right away once maxPending changes are waiting.
+    The UI thread only has to call changed() after editing a store,
+    so saving never blocks the event loop. stop() does a final flush.
+    """
+    def __init__(self, stores, delay=2.0, maxPending=50):
+        """
+        Start saving stores, a list of JournalStore, where:
+            delay -- seconds without changes before flushing
+            maxPending -- changes waiting that force a flush without waiting for delay
+        """
+        self.stores = stores
+        self.delay = delay
+        self.maxPending = maxPending
+        self.cond = threading.Condition()
+        self.queued = 0 # changes since the last flush started
+        self.lastChange = 0.0 # time.monotonic() of the last change
+        self.running = True
+
+        # metrics
+        self.flushes = 0
+        self.errors = 0
+        self.lastError = None # OSError of the last flush if it failed, None once a flush works
+        self.latencies = deque(maxlen=100) # seconds taken by recent flushes
+        self.maxDepth = 0 # most changes ever waiting at once
+
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+        self.thread.start()
+
+    def changed(self, count=1):
+        """
+        Called after count changes were made to the stores
+        """
+        with self.cond:
+            self.queued += count
+            self.lastChange = time.monotonic()
+            self.maxDepth = max(self.maxDepth, self.queued)
+            self.cond.notify()
+
+    def run(self):
+        """
+        Worker thread: wait for the stores to go quiet then flush them
+        """
+        with self.cond:
+            while True:
+                while self.running and self.queued == 0:
+                    self.cond.wait()
+                if not self.running:
+                    return # stop() does the final flush
+                if self.queued < self.maxPending:
+                    remaining = self.lastChange + self.delay - time.monotonic()
+                    if remaining > 0:
+                        self.cond.wait(remaining) # woken early by more changes or stop()
+                        continue
+                count = self.queued
+                self.queued = 0
+                self.cond.release() # keep accepting changes while writing
+                try:
+                    saved = self.flush()
+                finally:
+                    self.cond.acquire()
+                if not saved:
+                    self.queued += count # try again after the next delay
+                    self.lastChange = time.monotonic()
+
+    def flush(self):
+        """
+        Flush every store now.
+        returns False if writing failed, the error is kept in lastError
+        """
+        start = time.perf_counter()
+        try:
+            for store in self.stores:
+                store.flush()
+        except OSError as e:
+            self.errors += 1
+            self.lastError = e
+            return False
+        self.latencies.append(time.perf_counter() - start)
+        self.flushes += 1
+        self.lastError = None
+        return True
+
+    def stop(self):
+        """
+        Stop the worker thread and flush anything still waiting.
+        Safe to call more than once.
+        """
+        with self.cond:
+            wasRunning = self.running
+            self.running = False
+            self.cond.notify()
+        if wasRunning:
+            self.thread.join()
+        self.flush()
+        with self.cond:
+            self.queued = 0
+
+    def stats(self):
+        """
+        return dict of flush latency and queue depth metrics,
+        and lastError, the error of the last flush if it failed
+        """
+        latencies = list(self.latencies)
+        with self.cond:
+            depth = self.queued
+        return {'queueDepth': depth, 'maxQueueDepth': self.maxDepth,
+                'flushes': self.flushes, 'errors': self.errors, 'lastError': self.lastError,
+                'lastLatency': latencies[-1] if latencies else 0.0,
+                'avgLatency': sum(latencies) / len(latencies) if latencies else 0.0,
+                'maxLatency': max(latencies) if latencies else 0.0}
@@ -0,0 +1,71 @@
+"""
+Module to define the Camera class used to scroll the Arena
+"""
+import pygame
+from modules.spatial import IndexedGroup
+
+class Camera():
+    """
+    Keeps track of which part of the world is on screen.
+    Sprites stay in world coordinates and the camera offset is only
+    applied when they are drawn, so scrolling costs the same no matter
+    how many sprites are in the world.
+    """
+    def __init__(self, width, height, left=120, right=None):
+        """
+        Initialize camera the size of the screen where left and right
+        are the screen x coordinates the followed sprite can get to
+        before the camera scrolls, right defaults to 140 from the right edge
+        """
+        self.x = 0 # world x coordinate of the left side of the screen
+        self.width = width
+        self.height = height
+        self.left = left
+        self.right = right if right is not None else width - 140
+
+    @property
+    def viewport(self):
+        """
+        Rect of the world that is currently on screen
+        """
+        return pygame.Rect(self.x, 0, self.width, self.height)
+
+    def follow(self, rect):
+        """
+        Scroll the camera when rect gets near the left or right side of the screen
+        """
+        if rect.right - self.x >= self.right:
+            self.x = rect.right - self.right
+        if rect.left - self.x <= self.left:
+            self.x = rect.left - self.left
+
+    def apply(self, rect):
+        """
+        return a copy of the world rect moved to screen coordinates
+        """
+        return rect.move(-self.x, 0)
+
+    def toWorld(self, pos):
+        """
+        convert a screen position (i.e. the mouse) to world coordinates
+        """
+        return (pos[0] + self.x, pos[1])
+
+    def visible(self, sprites):
+        """
+        return the sprites that are at least partly on screen
+        """
+        view = self.viewport
+        if isinstance(sprites, IndexedGroup):
+            return sprites.query(view) # only look at sprites in cells on screen
+        return [s for s in sprites if view.colliderect(s.rect)]
+
+    def draw(self, screen, sprites):
+        """
+        Draw the sprites that are on screen at their screen position.
+        Sprites with a drawRect (i.e. interpolated position) are drawn there.
+        """
+        blit = screen.blit
+        x = self.x
+        for sprite in self.visible(sprites):
+            blit(sprite.image, getattr(sprite, 'drawRect', sprite.rect).move(-x, 0))
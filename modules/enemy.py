@@ -0,0 +1,271 @@
+"""
+Module to define the Enemy class, the EnemyPool that recycles them,
+and the WaveSpawner that sends waves of enemies into the Arena
+"""
+import gc
+import random
+import pygame
+from modules.player import SCR_HEIGHT, REFERENCE_FPS, GRAVITY
+
+ENEMY_SPEED = 2 # pixels per frame at REFERENCE_FPS
+ENEMY_HP = 20
+ENEMY_DAMAGE = 5 # hp the player loses touching an enemy
+SIM_MIN_WAVE = 50 # smaller waves are faster as sprites than with an EnemySim, see benchmarks.enemies
+
+class Enemy(pygame.sprite.DirtySprite):
+    """
+    Enemy that walks toward the player. Enemies are owned by an
+    EnemyPool and are reused, so killing an enemy returns it to
+    the pool instead of throwing it away. When the pool has an
+    EnemySim the enemy's state lives in the sim's arrays at index
+    slot and update() isn't used.
+    """
+    def __init__(self, pool, slot, image):
+        super().__init__()
+        self.pool = pool
+        self.slot = slot # index of this enemy in the pool
+        self.image = image # shared by every enemy in the pool
+        self.rect = image.get_rect()
+        self.exact = pygame.math.Vector2(0, 0) # sub-pixel position of rect
+        self.prevPos = pygame.math.Vector2(0, 0) # position before last update, for interpolation
+        self.maxHp = ENEMY_HP
+        self.hp = 0
+        self.change_x = 0
+        self.change_y = 0
+        self.target = None # sprite to chase
+        self.level = None
+        self.dirty = 2 # moves every frame
+
+    def spawn(self, level, x, y, target, hp=ENEMY_HP):
+        """
+        Reset enemy to a fresh state at world position x,y
+        """
+        self.level = level
+        self.target = target
+        self.maxHp = hp
+        self.hp = hp
+        self.change_x = 0
+        self.change_y = 0
+        self.exact.update(x, y)
+        self.prevPos.update(x, y)
+        self.rect.topleft = (x, y)
+        if self.pool.sim is not None:
+            self.pool.sim.activate(self.slot, x, y, self.rect.width, self.rect.height, hp)
+
+    def update(self, seconds):
+        """
+        Fall, and walk toward the target
+        where seconds is the length of the physics step
+        """
+        k = seconds * REFERENCE_FPS
+        self.prevPos.update(self.exact)
+        if self.target is not None:
+            dx = self.target.rect.centerx - self.rect.centerx
+            if dx > ENEMY_SPEED:
+                self.change_x = ENEMY_SPEED
+            elif dx < -ENEMY_SPEED:
+                self.change_x = -ENEMY_SPEED
+            else:
+                self.change_x = 0
+        self.change_y += GRAVITY * k
+        self.exact.x += self.change_x * k
+        self.exact.y += self.change_y * k
+
+        # land on the ground
+        bottom = SCR_HEIGHT - self.rect.height
+        if self.exact.y >= bottom:
+            self.exact.y = bottom
+            self.change_y = 0
+        self.rect.x = round(self.exact.x)
+        self.rect.y = round(self.exact.y)
+
+        # land on platforms when falling
+        if self.change_y > 0:
+            for block in self.level.platform_list.collide(self):
+                self.rect.bottom = block.rect.top
+                self.exact.y = self.rect.y
+                self.change_y = 0
+
+    def interpolate(self, alpha):
+        """
+        Set drawRect to the position alpha of the way between the
+        last two physics steps, like Player.interpolate
+        """
+        pos = self.prevPos.lerp(self.exact, alpha)
+        self.drawRect = self.rect.copy()
+        self.drawRect.topleft = (round(pos.x), round(pos.y))
+
+    def hit(self, damage):
+        """
+        Take damage, returning enemy to its pool when hp runs out.
+        returns True if the enemy died
+        """
+        if self.pool.sim is not None:
+            self.hp = self.pool.sim.damage(self.slot, damage)
+        else:
+            self.hp -= damage
+        if self.hp <= 0:
+            self.kill()
+            return True
+        return False
+
+    def kill(self):
+        """
+        Remove enemy from all groups and give it back to its pool
+        """
+        if not self.alive():
+            return # already back in the pool
+        pygame.sprite.DirtySprite.kill(self)
+        self.target = None
+        if self.pool.sim is not None:
+            self.pool.sim.deactivate(self.slot)
+        self.pool.release(self)
+
+class EnemyPool():
+    """
+    Preallocated set of Enemy sprites. acquire() hands out a free
+    enemy and release() takes it back so waves don't construct
+    and throw away sprites.
+    """
+    def __init__(self, size, image=None, sim=None):
+        """
+        Create size enemies up front. All enemies share image.
+        sim is an optional EnemySim that simulates the enemies.
+        """
+        if image is None:
+            image = pygame.Surface([30, 40])
+            image.fill((0,160,0))
+        self.image = image
+        self.sim = sim
+        if sim is not None:
+            sim.grow(size)
+        self.enemies = [Enemy(self, i, image) for i in range(size)] # every enemy by slot
+        self.free = list(reversed(self.enemies))
+        self.size = size
+        self.misses = 0 # times the pool was empty and had to grow
+
+    def acquire(self):
+        """
+        return a free enemy, creating one only if the pool ran out
+        """
+        if self.free:
+            return self.free.pop()
+        self.misses += 1
+        enemy = Enemy(self, self.size, self.image)
+        self.enemies.append(enemy)
+        self.size += 1
+        return enemy
+
+    def release(self, enemy):
+        """
+        Return enemy to the pool
+        """
+        self.free.append(enemy)
+
+    def available(self):
+        """
+        return number of enemies ready to be acquired
+        """
+        return len(self.free)
+
+class WaveSpawner():
+    """
+    Sends waves of enemies at the player. Each wave is bigger than
+    the last, and the next wave starts a short while after every
+    enemy of the current wave is dead. Enemies come from an EnemyPool
+    sized for the biggest wave, and are spawned a batch at a time
+    so a big wave doesn't stall one frame. Waves of at least simWave
+    enemies are simulated with the EnemySim, if there is one, and
+    smaller ones as sprites.
+    """
+    def __init__(self, arena, firstWave=5, growth=1.5, maxWave=2000,
+                 batch=50, delay=3.0, seed=None, sim=None, simWave=SIM_MIN_WAVE):
+        """
+        Initialize spawner for arena where:
+            firstWave -- number of enemies in the first wave
+            growth -- how much bigger each wave is than the last
+            maxWave -- most enemies in one wave, also the size of the pool
+            batch -- most enemies spawned in one update
+            delay -- seconds between the end of a wave and the next one
+            sim -- optional EnemySim to simulate big waves with
+            simWave -- fewest enemies in a wave simulated with sim
+        """
+        self.arena = arena
+        self.firstWave = firstWave
+        self.growth = growth
+        self.maxWave = maxWave
+        self.batch = batch
+        self.delay = delay
+        self.random = random.Random(seed)
+        self.sim = sim
+        self.simWave = simWave
+        self.pool = EnemyPool(maxWave, sim=sim)
+        self.pool.sim = None # until a wave is big enough
+        self.wave = 0 # current wave number, 0 before the first wave
+        self.pending = 0 # enemies of current wave not spawned yet
+        self.cooldown = delay # seconds until next wave
+
+    def waveSize(self, wave):
+        """
+        return number of enemies in the given wave
+        """
+        return min(self.maxWave, int(round(self.firstWave * self.growth ** (wave - 1))))
+
+    def update(self, seconds):
+        """
+        Spawn enemies for the current wave, or count down to the next one
+        """
+        if self.pending > 0:
+            self.spawnBatch()
+        elif len(self.arena.enemy_list) == 0:
+            self.cooldown -= seconds
+            if self.cooldown <= 0:
+                self.nextWave()
+
+    def nextWave(self):
+        """
+        Start the next wave
+        """
+        # clean up between waves so a full collection doesn't land mid-fight
+        gc.collect()
+        self.wave += 1
+        self.pending = self.waveSize(self.wave)
+        self.cooldown = self.delay
+        # every enemy of the last wave is dead, so the backend can change
+        self.pool.sim = self.sim if self.pending >= self.simWave else None
+
+    def recall(self, left, right):
+        """
+        Take back enemies that aren't entirely between world x left
+        and right, where the level's platforms are loaded, and spawn
+        them again next to the screen
+        """
+        if left == float('-inf') and right == float('inf'):
+            return # the whole level is loaded
+        sim = self.pool.sim
+        if sim is not None:
+            enemies = [self.pool.enemies[slot] for slot in sim.outside(left, right)]
+        else:
+            enemies = [e for e in self.arena.enemy_list if e.rect.left < left or e.rect.right > right]
+        for enemy in enemies:
+            enemy.kill()
+        self.pending += len(enemies)
+
+    def spawnBatch(self):
+        """
+        Spawn up to batch enemies just off either side of the screen
+        """
+        arena = self.arena
+        view = arena.camera.viewport
+        rng = self.random
+        count = min(self.batch, self.pending)
+        for i in range(count):
+            enemy = self.pool.acquire()
+            if rng.random() < 0.5:
+                x = view.left - rng.randrange(enemy.rect.width, view.width)
+            else:
+                x = view.right + rng.randrange(0, view.width)
+            y = rng.randrange(0, SCR_HEIGHT // 2)
+            enemy.spawn(arena, x, y, arena.player)
+            arena.enemy_list.add(enemy)
+        self.pending -= count
@@ -0,0 +1,233 @@
+"""
+Module to define the EnemySim class, a NumPy backend that simulates
+every enemy in an EnemyPool at once instead of one sprite at a time
+"""
+import pygame
+from modules.player import SCR_HEIGHT, REFERENCE_FPS, GRAVITY
+from modules.enemy import ENEMY_SPEED
+try:
+    import numpy as np
+except ImportError: # numpy is optional, enemies fall back to Enemy.update
+    np = None
+
+FREE = 0
+ACTIVE = 1
+CELL_KEY = 1 << 20 # cell x * CELL_KEY + cell y packs a cell in one integer, y cells must be in [0, CELL_KEY)
+
+class EnemySim():
+    """
+    Keeps the position, velocity, hp and state of every enemy in
+    NumPy arrays (one slot per enemy in the pool) and applies
+    gravity, movement, ground clamping, platform landing and chase AI
+    to all of them with array operations. Enemy sprite rects are only
+    written back for enemies near the screen, where they get drawn
+    and hit. Enemies farther away are taken out of the spatial hash
+    until they come back, so nothing finds them at a stale position.
+    """
+    def __init__(self, capacity=0, margin=SCR_HEIGHT):
+        """
+        Create arrays for capacity enemies. margin is how far
+        outside the camera viewport enemy rects are kept in sync.
+        """
+        if np is None:
+            raise ImportError("EnemySim needs numpy")
+        self.margin = margin
+        self.capacity = 0
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.px = np.zeros(0) # position before the last step, for interpolation
+        self.py = np.zeros(0)
+        self.vx = np.zeros(0)
+        self.vy = np.zeros(0)
+        self.w = np.zeros(0)
+        self.h = np.zeros(0)
+        self.hp = np.zeros(0)
+        self.state = np.zeros(0, dtype=np.int8)
+        self.synced = np.zeros(0, dtype=bool) # sprite rect is current and in the spatial hash
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        """
+        Make room for capacity enemies, keeping existing slots
+        """
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        for name in ('x', 'y', 'px', 'py', 'vx', 'vy', 'w', 'h', 'hp'):
+            setattr(self, name, np.concatenate((getattr(self, name), np.zeros(extra))))
+        self.state = np.concatenate((self.state, np.zeros(extra, dtype=np.int8)))
+        self.synced = np.concatenate((self.synced, np.zeros(extra, dtype=bool)))
+        self.capacity = capacity
+
+    def activate(self, slot, x, y, width, height, hp):
+        """
+        Start simulating the enemy in slot at world position x,y
+        """
+        if slot >= self.capacity:
+            self.grow(max(slot + 1, self.capacity * 2))
+        self.x[slot] = x
+        self.y[slot] = y
+        self.px[slot] = x
+        self.py[slot] = y
+        self.vx[slot] = 0
+        self.vy[slot] = 0
+        self.w[slot] = width
+        self.h[slot] = height
+        self.hp[slot] = hp
+        self.state[slot] = ACTIVE
+        self.synced[slot] = True # the sprite is put in its group at x,y
+
+    def deactivate(self, slot):
+        """
+        Stop simulating the enemy in slot
+        """
+        self.state[slot] = FREE
+        self.synced[slot] = False
+
+    def damage(self, slot, amount):
+        """
+        Subtract amount from hp of enemy in slot and return its new hp
+        """
+        self.hp[slot] -= amount
+        return self.hp[slot]
+
+    def step(self, seconds, targetX, platforms=None):
+        """
+        Advance every active enemy by seconds, chasing world x position
+        targetX (None to stand still) and landing on the platforms of
+        IndexedGroup platforms. Only the active slots are worked on, so
+        a big pool with a small wave stays cheap.
+        """
+        k = seconds * REFERENCE_FPS
+        live = np.flatnonzero(self.state == ACTIVE)
+        if len(live) == 0:
+            return
+        x, y, vx, vy = self.x[live], self.y[live], self.vx[live], self.vy[live]
+        w, h = self.w[live], self.h[live]
+        self.px[live] = x
+        self.py[live] = y
+
+        # chase the target
+        if targetX is not None:
+            dx = targetX - (x + w / 2)
+            vx = np.where(dx > ENEMY_SPEED, ENEMY_SPEED, np.where(dx < -ENEMY_SPEED, -ENEMY_SPEED, 0.0))
+
+        # gravity and movement
+        vy += GRAVITY * k
+        x += vx * k
+        y += vy * k
+
+        # land on the ground
+        bottom = SCR_HEIGHT - h
+        grounded = y >= bottom
+        y[grounded] = bottom[grounded]
+        vy[grounded] = 0
+
+        # land on platforms when falling
+        if platforms is not None:
+            self.land(platforms, x, y, vy, w, h)
+
+        self.x[live] = x
+        self.y[live] = y
+        self.vx[live] = vx
+        self.vy[live] = vy
+
+    def land(self, platforms, x, y, vy, w, h):
+        """
+        Stop falling enemies (given as arrays, changed in place) that
+        overlap a platform of IndexedGroup platforms, standing them on
+        the highest one. Enemies are bucketed by the spatial hash cells
+        their corners are in, so each platform is only tested against
+        the enemies sharing a cell with it. Enemies must be no bigger
+        than a cell.
+        """
+        falling = np.flatnonzero(vy > 0)
+        if len(falling) == 0:
+            return
+        index = platforms.index
+        size = index.cellSize
+        fx, fy = x[falling], y[falling]
+        right, bottom = fx + w[falling], fy + h[falling]
+        x0 = np.floor(fx / size).astype(np.int64)
+        x1 = (np.ceil(right).astype(np.int64) - 1) // size
+        y0 = np.floor(fy / size).astype(np.int64)
+        y1 = (np.ceil(bottom).astype(np.int64) - 1) // size
+        # one key for each cell an enemy covers, up to 2x2 cells
+        slots = np.arange(len(falling))
+        wide = x1 != x0
+        tall = y1 != y0
+        both = wide & tall
+        keys = np.concatenate((x0 * CELL_KEY + y0, x1[wide] * CELL_KEY + y0[wide],
+                               x0[tall] * CELL_KEY + y1[tall], x1[both] * CELL_KEY + y1[both]))
+        which = np.concatenate((slots, slots[wide], slots[tall], slots[both]))
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        which = which[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        ends = np.append(starts[1:], len(keys))
+
+        top = np.full(len(falling), np.inf) # highest platform each enemy overlaps
+        cell = index.cell
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            key = int(keys[start])
+            blocks = cell(platforms, key // CELL_KEY, key % CELL_KEY)
+            if blocks:
+                group = which[start:end]
+                gx, gy, gr, gb = fx[group], fy[group], right[group], bottom[group]
+                for block in blocks:
+                    r = block.rect
+                    hit = group[(gx < r.right) & (gr > r.left) & (gy < r.bottom) & (gb > r.top)]
+                    top[hit] = np.minimum(top[hit], r.top)
+        landed = np.isfinite(top)
+        if landed.any():
+            hit = falling[landed]
+            y[hit] = top[landed] - h[hit]
+            vy[hit] = 0
+
+    def interpolate(self, alpha, enemies):
+        """
+        Set drawRect of the synced sprites in enemies (sprites by slot)
+        to the position alpha of the way between the last two steps
+        """
+        slots = np.flatnonzero(self.synced)
+        px, py = self.px[slots], self.py[slots]
+        xs = np.rint(px + (self.x[slots] - px) * alpha).astype(int).tolist()
+        ys = np.rint(py + (self.y[slots] - py) * alpha).astype(int).tolist()
+        for i, slot in enumerate(slots.tolist()):
+            enemy = enemies[slot]
+            enemy.drawRect = enemy.rect.copy()
+            enemy.drawRect.topleft = (xs[i], ys[i])
+
+    def outside(self, left, right):
+        """
+        return list of slots of active enemies not entirely between world x left and right
+        """
+        return np.flatnonzero((self.state == ACTIVE) & ((self.x < left) | (self.x + self.w > right))).tolist()
+
+    def sync(self, enemies, group, view):
+        """
+        Copy positions of active enemies within margin of the view
+        Rect to their sprites, and suspend the sprites of the others
+        from the spatial hash. enemies is the list of sprites by slot
+        and group is the IndexedGroup they are bucketed in.
+        """
+        left = view.left - self.margin
+        right = view.right + self.margin
+        near = (self.state == ACTIVE) & (self.x + self.w > left) & (self.x < right)
+        for slot in np.flatnonzero(self.synced & ~near).tolist():
+            group.suspend(enemies[slot]) # went out of range, its rect stops being updated
+        synced = self.synced[near].tolist()
+        self.synced = near
+        near = np.flatnonzero(near)
+        xs = np.rint(self.x[near]).astype(int).tolist()
+        ys = np.rint(self.y[near]).astype(int).tolist()
+        moved = group.moved
+        resume = group.resume
+        for i, slot in enumerate(near.tolist()):
+            enemy = enemies[slot]
+            enemy.rect.x = xs[i]
+            enemy.rect.y = ys[i]
+            if synced[i]:
+                moved(enemy)
+            else:
+                resume(enemy)
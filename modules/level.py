@@ -0,0 +1,164 @@
+"""
+Module to define the chunked level format and the LevelStreamer
+that loads chunks of a level into the Arena as the camera moves.
+
+A level is a directory with a level.json manifest:
+    {"chunkWidth": 640, "chunks": 2, "maxPlatformWidth": 500}
+and one chunk_<n>.json file per chunk listing the platforms whose
+left edge is in that chunk, each as [width, height, x, y]
+in world coordinates:
+    {"platforms": [[500, 25, 0, 400], ...]}
+Levels start at x 0, chunk 0 covers x 0 to chunkWidth.
+"""
+import json
+import os
+from modules.assets import manager as assets
+
+MANIFEST = "level.json"
+
+def chunkFile(path, n):
+    """
+    return file name of chunk n of the level in directory path
+    """
+    return os.path.join(path, "chunk_{}.json".format(n))
+
+def writeLevel(path, platforms, chunkWidth=640):
+    """
+    Save platforms, a list of [width, height, x, y], as a
+    chunked level in directory path.
+    Raises ValueError if a platform's left edge is left of x 0.
+    """
+    chunks = {}
+    for platform in platforms:
+        if platform[2] < 0:
+            raise ValueError("platform {} starts left of x 0, the start of the level".format(list(platform)))
+        chunks.setdefault(platform[2] // chunkWidth, []).append(list(platform))
+    count = max(chunks) + 1 if chunks else 0
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    for n in range(count):
+        with open(chunkFile(path, n), "w") as f:
+            json.dump({"platforms": chunks.get(n, [])}, f)
+    manifest = {"chunkWidth": chunkWidth, "chunks": count,
+                "maxPlatformWidth": max([p[0] for p in platforms] or [0])}
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+class LevelStreamer():
+    """
+    Loads the chunks of a level near the camera into the arena and
+    evicts chunks that are far away, so only a few screens worth
+    of platforms are in memory no matter how long the level is.
+    Chunks are read on the asset manager's worker thread, along with
+    the ones just past them, and added once they are ready. Only a
+    chunk that has platforms on screen is ever read on the main
+    thread, so walking never waits on the disk.
+    """
+    def __init__(self, arena, path, makePlatform, radius=1):
+        """
+        Initialize streamer for the level in directory path where:
+            makePlatform -- function(width, height) returning a Platform sprite
+            radius -- number of chunks past each side of the screen to keep loaded
+        """
+        manifest = assets.json(os.path.join(path, MANIFEST))
+        self.arena = arena
+        self.path = path
+        self.makePlatform = makePlatform
+        self.radius = radius
+        self.chunkWidth = manifest["chunkWidth"]
+        self.count = manifest["chunks"]
+        self.reach = manifest.get("maxPlatformWidth", 0) # how far a platform can stick out of its chunk
+        self.loaded = {} # chunk number -> list of platforms
+        self.window = None # (first, last) chunk numbers wanted last update
+        self.visible = None # (first, last) chunk numbers with platforms on screen last update
+        self.ahead = [] # chunk numbers being read ahead
+        self.waiting = [] # wanted chunk numbers whose read hasn't finished
+        self.stalls = 0 # chunks that had to be read on the main thread
+
+    def wanted(self, view, margin=None):
+        """
+        return (first, last) numbers of the chunks that can have
+        platforms within margin of view, radius chunks by default
+        """
+        width = self.chunkWidth
+        if margin is None:
+            margin = self.radius * width
+        first = max(0, (view.left - margin - self.reach) // width)
+        last = min(self.count - 1, (view.right + margin) // width)
+        return first, last
+
+    def area(self):
+        """
+        return (left, right) world x range where every platform is
+        loaded, infinite on the sides where the level ends
+        """
+        first, last = self.visible
+        while first > 0 and first - 1 in self.loaded:
+            first -= 1
+        while last < self.count - 1 and last + 1 in self.loaded:
+            last += 1
+        left = first * self.chunkWidth + self.reach if first > 0 else float('-inf')
+        right = (last + 1) * self.chunkWidth if last < self.count - 1 else float('inf')
+        return left, right
+
+    def update(self, view):
+        """
+        Load chunks near view, the camera's viewport, and evict far ones
+        """
+        window = self.wanted(view)
+        if window != self.window:
+            self.window = window
+            first, last = window
+            # keep one extra chunk on each side so walking back and forth doesn't reload
+            for n in [n for n in self.loaded if n < first - 1 or n > last + 1]:
+                self.evict(n)
+            self.waiting = [n for n in range(first, last + 1) if n not in self.loaded]
+            # read the next chunks on each side before they are needed
+            ahead = [n for n in (first - 1, last + 1) if 0 <= n < self.count and n not in self.loaded]
+            for n in self.ahead:
+                if n not in ahead and n not in self.loaded:
+                    assets.forget(chunkFile(self.path, n)) # walked away before it was needed
+            self.ahead = ahead
+            assets.preload([chunkFile(self.path, n) for n in self.waiting + ahead])
+        self.visible = self.wanted(view, 0)
+        if self.waiting:
+            self.loadReady()
+
+    def loadReady(self):
+        """
+        Add the waiting chunks that finished reading, and the ones
+        with platforms on screen even if that means reading them now
+        """
+        first, last = self.visible
+        waiting = []
+        for n in self.waiting:
+            ready = assets.ready([chunkFile(self.path, n)])
+            if ready or first <= n <= last:
+                if not ready:
+                    self.stalls += 1 # on screen already, can't wait for the worker
+                self.load(n)
+            else:
+                waiting.append(n)
+        self.waiting = waiting
+
+    def load(self, n):
+        """
+        Read chunk n and add its platforms to the arena
+        """
+        data = assets.json(chunkFile(self.path, n))
+        blocks = []
+        for width, height, x, y in data["platforms"]:
+            block = self.makePlatform(width, height)
+            block.rect.x = x
+            block.rect.y = y
+            blocks.append(block)
+        self.arena.platform_list.add(blocks) # position must be set before adding to index
+        self.loaded[n] = blocks
+
+    def evict(self, n):
+        """
+        Remove the platforms of chunk n from the arena
+        """
+        for block in self.loaded.pop(n):
+            block.kill()
+        assets.forget(chunkFile(self.path, n))
@@ -0,0 +1,237 @@
+"""
+Module to define the NavGraph enemies use to find their way across
+the Arena's platforms.
+
+Every static platform is a node, and so is the spot on the ground
+under each platform, with the ground spots chained together left to
+right. An edge from one node to another means something moving like
+the player can get there: jumping up to a platform no higher than a
+jump reaches, or walking off an edge and falling, and in both cases
+covering the horizontal gap at RUN_SPEED before it lands.
+Edge costs are frames.
+The graph is only rebuilt when the StaticLayer's baked geometry
+changes, and paths found with A* are cached by (source platform,
+target platform) until then, so any number of chasers standing on
+the same platform share one search.
+"""
+import heapq
+from bisect import bisect_left
+from math import sqrt
+import pygame
+from modules.player import SCR_HEIGHT, GRAVITY, JUMP_SPEED, RUN_SPEED
+
+JUMP_HEIGHT = JUMP_SPEED * JUMP_SPEED / (2 * GRAVITY) # highest a jump lifts the feet, ~91px
+
+def airTime(rise):
+    """
+    return frames a jump takes to come down to rise pixels above
+    where it started (negative rise to land lower), None if it can't
+    reach that high
+    """
+    v = -JUMP_SPEED
+    d = v * v - 2 * GRAVITY * rise
+    if d < 0:
+        return None
+    return (v + sqrt(d)) / GRAVITY
+
+class NavNode():
+    """
+    Standing surface in the graph, a platform's top or a spot on the ground
+    """
+    __slots__ = ('key', 'platform', 'left', 'right', 'top', 'edges')
+
+    def __init__(self, key, platform, left, right, top):
+        self.key = key # the platform, or ('ground', x) for a ground spot
+        self.platform = platform # the Platform sprite, None on the ground
+        self.left = left
+        self.right = right
+        self.top = top
+        self.edges = [] # (node, frames, 'jump', 'drop' or 'walk') this node leads to
+
+    def centerx(self):
+        return (self.left + self.right) / 2.0
+
+    def __repr__(self):
+        return "NavNode({}, {}, {})".format(self.left, self.right, self.top)
+
+class NavGraph():
+    """
+    Walk/jump reachability graph between the platforms of an arena
+    with cached A* paths. Moving platforms aren't part of the graph.
+    """
+    def __init__(self, arena, ground=SCR_HEIGHT):
+        """
+        Initialize graph for arena's platforms, where ground is
+        the y coordinate of the floor everything stands on last
+        """
+        self.arena = arena
+        self.layer = arena.staticLayer
+        self.groundY = ground
+        self.version = None # StaticLayer version the graph was built from
+        self.nodes = {} # node key -> NavNode
+        self.groundXs = [] # x of each ground spot, sorted
+        self.paths = {} # (source key, target key) -> tuple of NavNodes or None
+        self.builds = 0 # times the graph was built
+        self.searches = 0 # A* searches run, the rest were cache hits
+
+    def current(self):
+        """
+        Rebuild the graph and forget cached paths if the geometry
+        changed since the last build
+        """
+        if self.version != self.layer.version:
+            self.build()
+
+    def build(self):
+        """
+        Make a node for every static platform above the ground and
+        one on the ground under it, and connect the ones that can
+        be reached from each other
+        """
+        groundY = self.groundY
+        nodes = {}
+        for block in self.arena.platform_list:
+            if not getattr(block, 'moving', False) and block.rect.top < groundY:
+                nodes[block] = NavNode(block, block, block.rect.left, block.rect.right, block.rect.top)
+        platforms = list(nodes.values())
+
+        spots = {}
+        for node in platforms:
+            x = int(node.centerx())
+            spot = spots.get(x)
+            if spot is None:
+                spot = spots[x] = NavNode(('ground', x), None, x, x, groundY)
+            self.connect(node, spot)
+            self.connect(spot, node)
+        xs = sorted(spots)
+        for left, right in zip(xs, xs[1:]): # walk along the ground
+            frames = (right - left) / float(RUN_SPEED)
+            spots[left].edges.append((spots[right], frames, 'walk'))
+            spots[right].edges.append((spots[left], frames, 'walk'))
+        for spot in spots.values():
+            nodes[spot.key] = spot
+
+        query = self.arena.platform_list.query
+        reach = RUN_SPEED * airTime(-groundY) # farthest anything can drift while falling
+        for node in platforms:
+            # platforms close enough to jump to or fall onto, found with the spatial hash
+            near = query(pygame.Rect(node.left - reach, node.top - JUMP_HEIGHT,
+                                     node.right - node.left + 2 * reach,
+                                     groundY - node.top + JUMP_HEIGHT))
+            for block in near:
+                other = nodes.get(block)
+                if other is not None and other is not node:
+                    self.connect(node, other)
+        self.nodes = nodes
+        self.groundXs = xs
+        self.paths.clear()
+        self.version = self.layer.version
+        self.builds += 1
+
+    def connect(self, a, b):
+        """
+        Add an edge from a to b if b can be reached from a
+        """
+        rise = a.top - b.top # how much higher b is
+        frames = airTime(rise)
+        if frames is None:
+            return # too high to jump to
+        if a.platform is not None and b.platform is not None:
+            if rise > 0 and a.left >= b.left and a.right <= b.right:
+                return # b is right overhead with no edge of a to jump past it from
+            if rise < 0 and b.left >= a.left and b.right <= a.right:
+                return # b is right underneath, a is in the way
+        gap = max(0, b.left - a.right, a.left - b.right)
+        if gap > RUN_SPEED * frames:
+            return # can't drift that far before landing
+        walk = abs(b.centerx() - a.centerx()) / RUN_SPEED
+        a.edges.append((b, walk + frames, 'jump' if rise > 0 else 'drop'))
+
+    def nodeAt(self, rect):
+        """
+        return the NavNode rect is standing on or None if it's in the air
+        """
+        self.current()
+        if rect.bottom >= self.groundY:
+            return self.groundSpot(rect.centerx)
+        for block in self.arena.platform_list.query(rect.move(0, 2)):
+            node = self.nodes.get(block)
+            if node is not None and block.rect.top >= rect.bottom:
+                return node
+        return None
+
+    def groundSpot(self, x):
+        """
+        return the ground spot nearest x or None if there are no platforms
+        """
+        xs = self.groundXs
+        if not xs:
+            return None
+        i = bisect_left(xs, x)
+        if i == len(xs) or (i > 0 and x - xs[i - 1] < xs[i] - x):
+            i -= 1
+        return self.nodes[('ground', xs[i])]
+
+    def path(self, source, target):
+        """
+        return tuple of NavNodes from node key source to node key target,
+        or None if target can't be reached. Keys are platforms, or
+        ('ground', x) for ground spots.
+        """
+        self.current()
+        key = (source, target)
+        if key in self.paths:
+            return self.paths[key]
+        path = None
+        start = self.nodes.get(source)
+        goal = self.nodes.get(target)
+        if start is not None and goal is not None:
+            path = self.search(start, goal)
+        self.paths[key] = path
+        return path
+
+    def route(self, rect, targetRect):
+        """
+        return path between the nodes rect and targetRect stand on,
+        None if either is in the air or there is no way there
+        """
+        start = self.nodeAt(rect)
+        goal = self.nodeAt(targetRect)
+        if start is None or goal is None:
+            return None
+        return self.path(start.key, goal.key)
+
+    def search(self, start, goal):
+        """
+        return tuple of NavNodes on the cheapest path from start to goal
+        found with A*, or None
+        """
+        self.searches += 1
+        goalx = goal.centerx()
+
+        def estimate(node):
+            # frames to cover the horizontal distance at full speed, never too high
+            return abs(goalx - node.centerx()) / RUN_SPEED
+
+        count = 0 # tie breaker so nodes are never compared
+        frontier = [(estimate(start), count, 0, start)]
+        cost = {start: 0}
+        came = {start: None}
+        while frontier:
+            f, n, c, node = heapq.heappop(frontier)
+            if node is goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = came[node]
+                return tuple(reversed(path))
+            if c > cost[node]:
+                continue # stale entry, node was reached cheaper since
+            for other, frames, kind in node.edges:
+                c = cost[node] + frames
+                if c < cost.get(other, float('inf')):
+                    cost[other] = c
+                    came[other] = node
+                    count += 1
+                    heapq.heappush(frontier, (c + estimate(other), count, c, other))
+        return None
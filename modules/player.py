@@ -1,17 +1,64 @@
 import pygame
+from bisect import bisect_right
 from math import atan2, degrees, floor
+from modules.rotation import RotationCache
+from modules.assets import manager as assets
 """
 Module to define the Player class, and PlayerStats class
 """
 SCR_WIDTH = 640
 SCR_HEIGHT = 480
+ARM_ROTATE_STEP = 2 # degrees between each pre-rendered arm angle
+
+# Physics constants are in pixels per frame at REFERENCE_FPS
+# and get scaled by the length of each physics step
+REFERENCE_FPS = 60
+GRAVITY = .35
+JUMP_SPEED = -8
+RUN_SPEED = 5
+
+HURT_TIME = 1.0 # seconds the player can't be hurt again after taking damage
+
+FIRST_LEVEL_XP = 50 # experience needed to reach level 1
+MAX_LEVEL = 200
+
+def levelGrowth(lvl):
+    """
+    return fraction the experience needed grows by when reaching lvl,
+    less at higher levels so leveling doesn't get too slow
+    """
+    if lvl > 25:
+        return 0.3
+    elif lvl > 16:
+        return 0.4
+    elif lvl > 8:
+        return 0.45
+    return 0.5
+
+def buildXpTable(maxLevel=MAX_LEVEL):
+    """
+    return list where item n is the total experience needed to reach level n+1
+    """
+    table = [FIRST_LEVEL_XP]
+    for lvl in range(1, maxLevel):
+        table.append(floor(table[-1] + table[-1] * levelGrowth(lvl)))
+    return table
+
+XP_TABLE = buildXpTable()
 
 class PlayerStats():
     """
-    class to contain player stats and compute experience
+    class to contain player stats and compute experience.
+    Setting one of FIELDS to a new value calls every function
+    registered with watch() with (stats, field name).
+    health is the hp left in the current fight, it isn't saved.
     """
+    FIELDS = ('hp', 'mana', 'stamina', 'strength', 'atkSpeed', 'netArmor',
+              'xp', 'xpNeeded', 'skillPts', 'lvl')
+    
     def __init__(self, hp=100, mana=100, stamina=100, strength=1.0,
                 atkSpeed=1.0, armor=0, xp=0, skillPts=0, lvl=0, xpNeeded=50):
+        self.watchers = [] # called with (stats, field) when a field changes
         self.hp = hp
         self.mana = mana
         self.stamina = stamina
@@ -22,33 +69,96 @@ class PlayerStats():
         self.xpNeeded = xpNeeded # amount of experience needed to level up
         self.skillPts = skillPts # number of skill points player has available to spen
         self.lvl = lvl # players current level
+        self.health = hp # hp left in the current fight, hp is the most there can be
         
+    def __setattr__(self, name, value):
+        if name in PlayerStats.FIELDS and self.watchers:
+            old = self.__dict__.get(name)
+            object.__setattr__(self, name, value)
+            if old != value:
+                for watcher in self.watchers:
+                    watcher(self, name)
+        else:
+            object.__setattr__(self, name, value)
+            
+    def __copy__(self):
+        """
+        return copy of the stats without the watchers
+        """
+        stats = PlayerStats.__new__(PlayerStats)
+        object.__setattr__(stats, 'watchers', [])
+        stats.assign(self)
+        stats.health = self.health
+        return stats
+        
+    def watch(self, watcher):
+        """
+        Call watcher(stats, field) whenever a field changes
+        """
+        self.watchers.append(watcher)
+        
+    def unwatch(self, watcher):
+        """
+        Stop calling watcher when a field changes
+        """
+        if watcher in self.watchers:
+            self.watchers.remove(watcher)
+            
+    def assign(self, other):
+        """
+        Set every field to other's value, only changed fields notify watchers
+        """
+        for name in PlayerStats.FIELDS:
+            setattr(self, name, getattr(other, name))
+        
+    def heal(self):
+        """
+        Restore health to full hp, i.e. at the start of a fight
+        """
+        self.health = self.hp
+
+    def takeDamage(self, damage):
+        """
+        Lose damage health, less netArmor but always at least 1.
+        returns True if no health is left
+        """
+        self.health -= max(1, damage - self.netArmor)
+        return self.health <= 0
+
     def addExperience(self, xp):
         """
         Increments the players experience by xp amount.
-        Will level up player if they have enough experience.
+        Levels up the player once for every level the new total
+        reaches, looked up in XP_TABLE instead of looping.
+        returns (levels gained, skill points gained)
         """
         self.xp += xp
-        if self.xp >= self.xpNeeded:
-            self.LevelUpPlayer()
+        if self.xp < self.xpNeeded:
+            return 0, 0
+        lvl = max(self.lvl, bisect_right(XP_TABLE, self.xp)) # levels whose xp is reached
+        return self.LevelUpPlayer(lvl - self.lvl)
     
-    def LevelUpPlayer(self):
-        """
-        Level up the player by 1 and give them 1 skill point.
-        Also compute how much xp is needed to reach next level.
-        """
-        self.lvl += 1
-        self.skillPts += 1
-        percent = 0.5
-        if self.lvl > 8:
-            percent = 0.45 # reduce how much xp is added once higher level
-        elif self.lvl > 16:
-            percent = 0.4
-        elif self.lvl > 25:
-            percent = 0.3
-        self.xpNeeded = floor(self.xpNeeded + self.xpNeeded * percent)
+    def LevelUpPlayer(self, levels=1):
+        """
+        Level up the player by levels and give them 1 skill point per level.
+        Also look up how much xp is needed to reach next level.
+        returns (levels gained, skill points gained)
+        """
+        levels = min(levels, MAX_LEVEL - self.lvl)
+        if levels <= 0:
+            return 0, 0
+        self.lvl += levels
+        self.skillPts += levels
+        self.xpNeeded = XP_TABLE[min(self.lvl, MAX_LEVEL - 1)] # stays at the last level's xp once maxed
+        return levels, levels
+        
+    def maxed(self):
+        """
+        return True if the player is at MAX_LEVEL and can't level up again
+        """
+        return self.lvl >= MAX_LEVEL
 
-class Player(pygame.sprite.Sprite):
+class Player(pygame.sprite.DirtySprite):
     """
     """
     # image = pygame.image.load("Snake.gif")
@@ -71,32 +181,43 @@ class Player(pygame.sprite.Sprite):
         self.image = pygame.Surface([self.width, self.height])
         self.image.fill((0,0,255))
         self.rect = self.image.get_rect()
+        self.exact = pygame.math.Vector2(self.rect.topleft) # sub-pixel position of rect
+        self.prevPos = pygame.math.Vector2(self.exact) # position before last update, for interpolation
+        self.dirty = 2 # player moves most frames so always redraw
         
         # create arm
         self.arm = Arm(self)
         
+        self.hurtTime = 0.0 # seconds until the player can be hurt again
         self.level = None # list of sprites can bump into in current lvl
+        self.weapon = None # weapon held in arm
+        self.mousePos = (0, 0) # screen position the arm aims at, set by MainView each frame
     
     def kill(self):
         """
         do other things before killing sprite
         """
         # stuff
-        pygame.sprite.Sprite.kill(self)
+        pygame.sprite.DirtySprite.kill(self)
         
     def update(self, seconds):
         """
         Update stats such as position of Player
-        where seconds is time since last frame
+        where seconds is the length of the physics step
         """
+        self.prevPos.update(self.exact)
+        k = seconds * REFERENCE_FPS # speeds are per frame at REFERENCE_FPS
+        self.hurtTime = max(0.0, self.hurtTime - seconds)
+        
         # Gravity
         self.calcGravity(seconds)
  
         # Move left/right
-        self.rect.x += self.change_x
+        self.exact.x += self.change_x * k
+        self.rect.x = round(self.exact.x)
  
         # See if we hit anything
-        block_hit_list = pygame.sprite.spritecollide(self, self.level.platform_list, False)
+        block_hit_list = self.level.platform_list.collide(self)
         for block in block_hit_list:
             # If we are moving right,
             # set our right side to the left side of the item we hit
@@ -105,15 +226,20 @@ class Player(pygame.sprite.Sprite):
             elif self.change_x < 0:
                 # Otherwise if we are moving left, do the opposite.
                 self.rect.left = block.rect.right
+        if block_hit_list:
+            self.exact.x = self.rect.x
  
         # Move up/down
-        self.rect.y += self.change_y
+        self.exact.y += self.change_y * k
+        self.rect.y = round(self.exact.y)
         
         # update arm position
         self.arm.update(seconds)
+        if self.weapon is not None:
+            self.weapon.update(seconds)
  
         # Check and see if we hit anything
-        block_hit_list = pygame.sprite.spritecollide(self, self.level.platform_list, False)
+        block_hit_list = self.level.platform_list.collide(self)
         for block in block_hit_list:
  
             # Reset our position based on the top/bottom of the object.
@@ -124,18 +250,21 @@ class Player(pygame.sprite.Sprite):
  
             # Stop our vertical movement
             self.change_y = 0
+        if block_hit_list:
+            self.exact.y = self.rect.y
  
     def calcGravity(self, seconds):
-        """ Calculate effect of gravity. """
+        """ Calculate effect of gravity over seconds. """
         if self.change_y == 0:
             self.change_y = 1
         else:
-            self.change_y += .35
+            self.change_y += GRAVITY * seconds * REFERENCE_FPS
  
         # See if we are on the ground.
         if self.rect.y >= SCR_HEIGHT - self.rect.height and self.change_y >= 0:
             self.change_y = 0
             self.rect.y = SCR_HEIGHT - self.rect.height
+            self.exact.y = self.rect.y
  
     def jump(self):
         """ Called when user hits 'jump' button. """
@@ -144,30 +273,56 @@ class Player(pygame.sprite.Sprite):
         # Move down 2 pixels because it doesn't work well if we only move down 1
         # when working with a platform moving down.
         self.rect.y += 2
-        platform_hit_list = pygame.sprite.spritecollide(self, self.level.platform_list, False)
+        platform_hit_list = self.level.platform_list.collide(self)
         self.rect.y -= 2
  
         # If it is ok to jump, set our speed upwards
         if len(platform_hit_list) > 0 or self.rect.bottom >= SCR_HEIGHT:
-            self.change_y = -8
+            self.change_y = JUMP_SPEED
  
+    def hurt(self, damage):
+        """
+        Take damage unless the player was hurt less than HURT_TIME ago.
+        returns True if the player took the damage
+        """
+        if self.hurtTime > 0:
+            return False
+        self.hurtTime = HURT_TIME
+        self.stats.takeDamage(damage)
+        return True
+
     # Player-controlled movement:
     def goLeft(self, seconds):
         """ Called when the user hits the left arrow. """
-        self.change_x = -5
+        self.change_x = -RUN_SPEED
  
     def goRight(self, seconds):
         """ Called when the user hits the right arrow. """
-        self.change_x = 5
+        self.change_x = RUN_SPEED
  
     def stop(self):
         """ Called when the user lets off the keyboard. """
         self.change_x = 0
+ 
+    def interpolate(self, alpha):
+        """
+        Set drawRect of player and arm to the position alpha of the
+        way between the last two physics steps so movement looks smooth
+        when rendering at a different rate than physics.
+        """
+        pos = self.prevPos.lerp(self.exact, alpha)
+        self.drawRect = self.rect.copy()
+        self.drawRect.topleft = (round(pos.x), round(pos.y))
+        dx = self.drawRect.x - self.rect.x
+        dy = self.drawRect.y - self.rect.y
+        self.arm.drawRect = self.arm.rect.move(dx, dy)
         
-class Arm(pygame.sprite.Sprite):
+class Arm(pygame.sprite.DirtySprite):
     """
     Represents the arm of the player.
     """
+    rotations = None # RotationCache shared by all arms
+    
     def __init__(self, player):
         super().__init__()
         
@@ -181,42 +336,50 @@ class Arm(pygame.sprite.Sprite):
         # Create an image of the block, and fill it with a color.
         self.width = 60
         self.height = 10
-        self.orig_image = pygame.image.load("images/temp_arm.png").convert_alpha()
-        self.image = self.orig_image.copy()
-        self.rect = self.image.get_rect()
-        self.rect.center = (0, 8)
-        self.rect.x = self.player.rect.x + self.player.width/2
-        self.rect.y = self.player.rect.y + self.player.height/2
+        self.orig_image = assets.image("images/temp_arm.png", alpha=True)
+        if Arm.rotations is None:
+            # rotate around the shoulder (middle of the left edge)
+            Arm.rotations = RotationCache(self.orig_image, step=ARM_ROTATE_STEP,
+                                        pivot=(0, self.orig_image.get_height()/2))
+            Arm.rotations.preload()
+        self.rotations = Arm.rotations
         self.angle = 0
+        self.image, offset = self.rotations.get(self.angle)
+        self.rect = self.image.get_rect()
+        self.placeAt(offset)
+        self.dirty = 2 # follows the mouse so always redraw
 
     def kill(self):
         """
         do other things before killing sprite
         """
         # stuff
-        pygame.sprite.Sprite.kill(self)
+        pygame.sprite.DirtySprite.kill(self)
         
     def update(self, seconds):
         """
         Update angle of arm based on mouse x,y coordinates
         where seconds is time since last frame
         """
-        oldCenter = self.rect.center
-        print("center:", (self.player.rect.centerx, self.player.rect.centery))
-        self.update_angle(pygame.mouse.get_pos())
+        # mouse is in screen coordinates, player is in world coordinates
+        self.update_angle(self.player.level.camera.toWorld(self.player.mousePos))
         
-        # update rectangle angle
-        oldrect = self.image.get_rect()
-        self.image = pygame.transform.rotate(self.orig_image, self.angle*-1)
-        self.rect = self.image.get_rect(center=(0,8))
-
-        self.rect.x = self.player.rect.x + self.player.width/2
-        self.rect.y = self.player.rect.y + self.player.height/3
+        # use pre-rendered image for the angle instead of rotating every frame
+        self.image, offset = self.rotations.get(self.angle*-1)
+        self.rect.size = self.image.get_size()
+        self.placeAt(offset)
+        
+    def placeAt(self, offset):
+        """
+        Move the arm so the shoulder lines up with the player
+        where offset is topleft of image relative to the shoulder
+        """
+        self.rect.x = self.player.rect.centerx + offset[0]
+        self.rect.y = self.player.rect.y + self.player.height/3 + offset[1]
         
     def update_angle(self, mouse):
         """
         Find the new angle between the center of player and the mouse.
         """
         offset = (mouse[1]-self.player.rect.centery, mouse[0]-self.player.rect.centerx)
-        self.angle = degrees(atan2(*offset))
-        print("angle:", self.angle)
\ No newline at end of file
+        self.angle = degrees(atan2(*offset))
\ No newline at end of file
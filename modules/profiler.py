@@ -0,0 +1,182 @@
+"""
+Module to define the Profiler that times named scopes of the game
+loop into a fixed-size ring buffer, the FrameGraph overlay that draws
+its frame times on screen, and export to Chrome trace-event JSON
+(open the file in chrome://tracing or https://ui.perfetto.dev).
+"""
+import json
+import os
+import time
+import pygame
+
+SCOPE_CAPACITY = 8192 # timed scopes kept, the oldest are overwritten
+FRAME_CAPACITY = 240 # frame times kept for the graph
+TRACE_FILE = "frame-trace.json" # where the export hotkey writes the trace
+GRAPH_HEIGHT = 80
+GRAPH_SCALE = 2.0 # pixels per millisecond of frame time
+GRAPH_TARGETS = (1000.0 / 60, 1000.0 / 30) # frame budgets marked on the graph in ms
+
+class Profiler():
+    """
+    Records (name, start, duration) of timed scopes in preallocated
+    lists used as a ring buffer, so recording never allocates or grows.
+    Nothing is timed while disabled; callers check enabled once per
+    frame and skip the timing code, which is all it costs when off.
+    """
+    def __init__(self, capacity=SCOPE_CAPACITY, frames=FRAME_CAPACITY):
+        self.enabled = False
+        self.clock = time.perf_counter
+        self.origin = self.clock() # trace timestamps are relative to this
+        self.capacity = capacity
+        self.names = [None] * capacity
+        self.starts = [0.0] * capacity
+        self.durations = [0.0] * capacity
+        self.next = 0 # slot the next scope is written to
+        self.count = 0 # scopes in the buffer
+        self.frameTimes = [0.0] * frames # seconds each frame took
+        self.frameNext = 0
+        self.frameCount = 0
+
+    def toggle(self):
+        """
+        Turn recording on or off, returns True if now on
+        """
+        self.enabled = not self.enabled
+        return self.enabled
+
+    def add(self, name, start, end):
+        """
+        Record scope name that ran from start to end, perf_counter() seconds
+        """
+        i = self.next
+        self.names[i] = name
+        self.starts[i] = start
+        self.durations[i] = end - start
+        self.next = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def addFrame(self, start, end):
+        """
+        Record a whole frame, as a scope and in the frame times of the graph
+        """
+        self.add("frame", start, end)
+        self.frameTimes[self.frameNext] = end - start
+        self.frameNext = (self.frameNext + 1) % len(self.frameTimes)
+        if self.frameCount < len(self.frameTimes):
+            self.frameCount += 1
+
+    def scope(self, name):
+        """
+        return context manager timing its block as scope name, for code
+        that doesn't run every frame. Times nothing while disabled.
+        """
+        return Scope(self, name)
+
+    def clear(self):
+        """
+        Forget every recorded scope and frame
+        """
+        self.next = self.count = 0
+        self.frameNext = self.frameCount = 0
+
+    def scopes(self):
+        """
+        return list of recorded (name, start, duration), oldest first
+        """
+        first = (self.next - self.count) % self.capacity
+        order = [(first + n) % self.capacity for n in range(self.count)]
+        return [(self.names[i], self.starts[i], self.durations[i]) for i in order]
+
+    def frames(self):
+        """
+        return list of recorded frame times in seconds, oldest first
+        """
+        size = len(self.frameTimes)
+        first = (self.frameNext - self.frameCount) % size
+        return [self.frameTimes[(first + n) % size] for n in range(self.frameCount)]
+
+    def traceEvents(self):
+        """
+        return recorded scopes as a list of Chrome trace "complete" events
+        """
+        pid = os.getpid()
+        us = 1000000.0
+        return [{"name": name, "cat": "frame" if name == "frame" else "loop", "ph": "X",
+                 "ts": (start - self.origin) * us, "dur": duration * us, "pid": pid, "tid": 1}
+                for name, start, duration in self.scopes()]
+
+    def export(self, path=TRACE_FILE):
+        """
+        Write recorded scopes to path as Chrome trace-event JSON.
+        returns number of events written
+        """
+        events = self.traceEvents()
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+class Scope():
+    """
+    Context manager that records its block in a Profiler
+    """
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if self.profiler.enabled:
+            self.start = self.profiler.clock()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            self.profiler.add(self.name, self.start, self.profiler.clock())
+            self.start = None
+
+class FrameGraph():
+    """
+    Bar graph of the profiler's recent frame times drawn in the top
+    left corner of the screen while the profiler is enabled, with
+    lines at the 60 and 30 fps frame budgets.
+    Can be added to a DirtyRenderer as an overlay.
+    """
+    def __init__(self, profiler, pos=(8, 8)):
+        self.profiler = profiler
+        self.rect = pygame.Rect(pos, (len(profiler.frameTimes), GRAPH_HEIGHT))
+        self.surface = None # made on first draw, the display must exist
+        self.font = None
+        self.message = None # text shown under the frame times, i.e. the result of a trace export
+
+    def draw(self, screen, camera=None):
+        """
+        Draw the graph if the profiler is enabled.
+        returns list of screen rects drawn to
+        """
+        profiler = self.profiler
+        if not profiler.enabled:
+            return []
+        if self.surface is None:
+            self.surface = pygame.Surface(self.rect.size)
+            self.surface.set_alpha(200)
+            self.font = pygame.font.Font(None, 16)
+        surface = self.surface
+        surface.fill((20, 20, 20))
+        height = self.rect.height
+        times = profiler.frames()
+        for x, seconds in enumerate(times):
+            ms = seconds * 1000.0
+            bar = min(height, int(ms * GRAPH_SCALE))
+            color = (80, 200, 80) if ms <= GRAPH_TARGETS[0] else (230, 200, 60) if ms <= GRAPH_TARGETS[1] else (230, 60, 60)
+            pygame.draw.line(surface, color, (x, height - 1), (x, height - bar))
+        for ms in GRAPH_TARGETS:
+            y = height - 1 - int(ms * GRAPH_SCALE)
+            pygame.draw.line(surface, (120, 120, 120), (0, y), (self.rect.width, y))
+        if times:
+            text = "{:.1f} ms avg  {:.1f} max".format(sum(times) / len(times) * 1000.0, max(times) * 1000.0)
+            surface.blit(self.font.render(text, True, (255, 255, 255)), (4, 2))
+        if self.message:
+            surface.blit(self.font.render(self.message, True, (255, 255, 255)), (4, 14))
+        screen.blit(surface, self.rect)
+        return [self.rect]
@@ -0,0 +1,182 @@
+"""
+Module to define the renderers used to draw the Arena
+"""
+import pygame
+from collections import OrderedDict
+
+COLORKEY = (255,0,255) # transparent color of baked tiles
+
+class StaticLayer():
+    """
+    Bakes sprites that never move (i.e. platforms) into screen sized
+    tiles so drawing them is a couple of big blits instead of one blit
+    per sprite. A tile is only re-baked after a sprite covering it is
+    added or removed. Sprites with moving set to True aren't baked
+    and are kept in movers to be drawn as normal sprites.
+    """
+    def __init__(self, group, width, height, maxTiles=8):
+        """
+        Initialize layer for the sprites in group, an IndexedGroup,
+        with tiles of width x height world pixels. At most maxTiles
+        baked tiles are kept in memory.
+        """
+        self.group = group
+        self.width = width
+        self.height = height
+        self.maxTiles = maxTiles
+        self.tiles = OrderedDict() # tile number -> Surface, least recently used first
+        self.movers = pygame.sprite.Group() # sprites in group that aren't baked
+        self.version = 0 # goes up every time baked geometry changes
+        for sprite in group:
+            self.changed(sprite, True)
+        group.watch(self.changed)
+
+    def changed(self, sprite, added):
+        """
+        Called when sprite is added to or removed from group.
+        Throws away the tiles it covers so they get baked again.
+        """
+        if getattr(sprite, 'moving', False):
+            if added:
+                self.movers.add(sprite)
+            else:
+                self.movers.remove(sprite)
+            return
+        for n in range(sprite.rect.left // self.width, (sprite.rect.right - 1) // self.width + 1):
+            self.tiles.pop(n, None)
+        self.version += 1
+
+    def tile(self, n):
+        """
+        return the baked Surface for tile n, baking it if needed
+        """
+        surface = self.tiles.get(n)
+        if surface is not None:
+            self.tiles.move_to_end(n)
+            return surface
+
+        left = n * self.width
+        surface = pygame.Surface((self.width, self.height)).convert()
+        surface.fill(COLORKEY)
+        for sprite in self.group.query(pygame.Rect(left, 0, self.width, self.height)):
+            if not getattr(sprite, 'moving', False):
+                surface.blit(sprite.image, sprite.rect.move(-left, 0))
+        surface.set_colorkey(COLORKEY, pygame.RLEACCEL)
+        self.tiles[n] = surface
+        if len(self.tiles) > self.maxTiles:
+            self.tiles.popitem(last=False)
+        return surface
+
+    def draw(self, screen, camera):
+        """
+        Draw the tiles that are on screen
+        """
+        x = camera.x
+        for n in range(x // self.width, (x + camera.width - 1) // self.width + 1):
+            screen.blit(self.tile(n), (n * self.width - x, 0))
+
+class SpriteView(pygame.sprite.DirtySprite):
+    """
+    Stand-in for a world sprite in the DirtyRenderer. Holds the
+    sprite's image at its screen position so the sprite itself
+    can stay in world coordinates.
+    """
+    def __init__(self, sprite):
+        super().__init__()
+        self.sprite = sprite
+        self.image = sprite.image
+        self.rect = pygame.Rect(0, 0, 0, 0)
+
+class DirtyRenderer():
+    """
+    Draws the arena and its sprites with a LayeredDirty group so only
+    the parts of the screen that changed are redrawn and pushed
+    to the display, instead of filling and flipping the whole window.
+    Only sprites inside the camera's viewport are drawn, and baked
+    platforms are drawn into the background.
+    """
+    def __init__(self, screen, arena):
+        """
+        Initialize renderer that draws arena onto screen
+        """
+        self.screen = screen
+        self.arena = arena
+        self.camera = arena.camera
+        self.group = pygame.sprite.LayeredDirty()
+        self.tracked = [] # (group, layer) pairs drawn by this renderer
+        self.views = {} # world sprite -> SpriteView on screen
+        self.backdrop = pygame.Surface(screen.get_size()).convert() # background as last drawn
+        self.bgState = None # camera position and baked geometry version of backdrop
+        self.overlays = [] # things drawn on top of the sprites each frame
+        self.overlayRects = [] # screen rects overlays drew to last frame
+
+        self.track(arena.staticLayer.movers, 0)
+        self.track(arena.enemy_list, 1)
+        self.overlay(arena.projectiles)
+
+    def track(self, group, layer):
+        """
+        Draw the sprites in group on the given layer.
+        Sprites added to or killed from group are picked up on the next draw.
+        """
+        self.tracked.append((group, layer))
+
+    def overlay(self, drawable):
+        """
+        Draw drawable on top of the sprites every frame, where
+        drawable.draw(screen, camera) returns the screen rects it drew to
+        """
+        self.overlays.append(drawable)
+
+    def sync(self):
+        """
+        Update the screen position of every visible sprite, adding
+        views for sprites that scrolled on screen and removing views
+        of sprites that scrolled off screen or were killed.
+        """
+        views = self.views
+        camx = self.camera.x
+        seen = set()
+        for group, layer in self.tracked:
+            for sprite in self.camera.visible(group):
+                seen.add(sprite)
+                view = views.get(sprite)
+                if view is None:
+                    view = views[sprite] = SpriteView(sprite)
+                    self.group.add(view, layer=layer)
+                rect = getattr(sprite, 'drawRect', sprite.rect).move(-camx, 0)
+                if rect != view.rect or sprite.image is not view.image:
+                    view.rect = rect
+                    view.image = sprite.image
+                    view.dirty = 1
+                if getattr(sprite, 'dirty', 0):
+                    view.dirty = 1 # sprite changed its image in place
+                    if sprite.dirty == 1:
+                        sprite.dirty = 0
+
+        for sprite in [s for s in views if s not in seen]:
+            views.pop(sprite).kill() # LayeredDirty clears the area it covered
+
+    def draw(self):
+        """
+        Draw changed areas of the arena.
+        returns list of rects on the screen that need to be updated
+        """
+        self.sync()
+        state = (self.camera.x, self.arena.staticLayer.version)
+        if state != self.bgState:
+            # background or baked platforms moved so the whole screen is dirty
+            self.arena.drawBackground(self.backdrop)
+            self.arena.staticLayer.draw(self.backdrop, self.camera)
+            self.group.repaint_rect(self.screen.get_rect())
+            self.bgState = state
+
+        # erase what overlays drew last frame
+        for rect in self.overlayRects:
+            self.group.repaint_rect(rect)
+
+        rects = self.group.draw(self.screen, self.backdrop)
+        self.overlayRects = []
+        for drawable in self.overlays:
+            self.overlayRects.extend(drawable.draw(self.screen, self.camera))
+        return rects + self.overlayRects
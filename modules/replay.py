@@ -0,0 +1,195 @@
+"""
+Module to record the input of a fight and play it back.
+
+A recording is a json file:
+    {"version": 2, "seed": 7, "hashEvery": 10, "backends": {"1": "sprites", ...},
+     "hash": "...", "frames": [[seconds, [mouse x, mouse y], [[event type, values...], ...]], ...]}
+with one entry per frame holding the frame time, the mouse position
+the arm aimed at and the input events handled that frame. Playing
+it back with the same seed reproduces the fight exactly, which the
+stored hash confirms: a running sha256 of the game state every
+hashEvery frames and at the end, so a change is caught even if the
+fight happens to end the same way. backends is the enemy backend
+each wave was fought with.
+"""
+import hashlib
+import json
+import pygame
+from modules.enemysim import FREE
+
+RECORDING_VERSION = 2
+HASH_EVERY = 10 # frames between states added to the running hash
+# values saved for each kind of event MainView handles
+EVENT_FIELDS = {
+    pygame.QUIT: (),
+    pygame.KEYDOWN: ('key',),
+    pygame.KEYUP: ('key',),
+    pygame.MOUSEBUTTONDOWN: ('button', 'pos'),
+    pygame.MOUSEBUTTONUP: ('button', 'pos'),
+}
+
+def backend(view):
+    """
+    return name of the enemy backend the current wave in view's arena uses
+    """
+    return "sprites" if view.arena.waves.pool.sim is None else "numpy"
+
+def stateHash(view):
+    """
+    return hex sha256 of the state of the player, enemies and
+    projectiles in view's arena. Floats are rounded so the hash
+    only changes when behaviour does.
+    """
+    player = view.player
+    arena = view.arena
+    waves = arena.waves
+    stats = player.stats
+    state = [round(player.exact.x, 4), round(player.exact.y, 4),
+             round(player.change_x, 4), round(player.change_y, 4),
+             tuple(player.rect), round(player.arm.angle, 4),
+             [getattr(stats, name) for name in stats.FIELDS], stats.health,
+             waves.wave, waves.pending, round(waves.cooldown, 4),
+             arena.projectiles.hits, arena.camera.x]
+    state.append([(round(shot.x, 2), round(shot.y, 2)) for shot in arena.projectiles.live])
+    sim = waves.pool.sim
+    if sim is None:
+        enemies = sorted(arena.enemy_list, key=lambda enemy: enemy.slot)
+        state.append([(enemy.slot, tuple(enemy.rect), enemy.hp,
+                       round(enemy.change_x, 4), round(enemy.change_y, 4)) for enemy in enemies])
+    else:
+        live = sim.state != FREE
+        for values in (sim.x, sim.y, sim.vx, sim.vy, sim.hp):
+            state.append([round(float(v), 2) for v in values[live]])
+    return hashlib.sha256(repr(state).encode("utf-8")).hexdigest()
+
+class StateTrail():
+    """
+    Running hash of the game state every few frames and the enemy
+    backend of each wave, computed the same way while recording
+    and playing back
+    """
+    def __init__(self, every=HASH_EVERY):
+        self.every = every
+        self.frames = 0
+        self.sha = hashlib.sha256()
+        self.backends = {} # wave number as a string (a json key) -> backend name
+
+    def add(self, view):
+        """
+        Add the state of view after a frame
+        """
+        self.frames += 1
+        self.backends.setdefault(str(view.arena.waves.wave), backend(view))
+        if self.frames % self.every == 0:
+            self.sha.update(stateHash(view).encode("ascii"))
+
+    def hexdigest(self, view):
+        """
+        return hex digest of the states added so far and the final state of view
+        """
+        sha = self.sha.copy()
+        sha.update(stateHash(view).encode("ascii"))
+        return sha.hexdigest()
+
+class LiveInput():
+    """
+    Input read from pygame, what MainView uses unless told otherwise
+    """
+    def poll(self, seconds):
+        """
+        return (seconds, events, mouse position) for a frame that took seconds
+        """
+        return seconds, pygame.event.get(), pygame.mouse.get_pos()
+
+    def frameDone(self, view):
+        """
+        Called with the MainView after the physics of every frame
+        """
+
+    def close(self, view):
+        """
+        Called with the MainView before its game is torn down
+        """
+
+class InputRecorder(LiveInput):
+    """
+    Reads input from pygame and saves it, with the running state hash,
+    to path when the game ends
+    """
+    def __init__(self, path, seed):
+        self.path = path
+        self.seed = seed
+        self.frames = []
+        self.trail = StateTrail()
+
+    def poll(self, seconds):
+        seconds, events, pos = LiveInput.poll(self, seconds)
+        saved = []
+        for event in events:
+            fields = EVENT_FIELDS.get(event.type)
+            if fields is not None:
+                saved.append([event.type] + [getattr(event, name) for name in fields])
+        self.frames.append([seconds, list(pos), saved])
+        return seconds, events, pos
+
+    def frameDone(self, view):
+        self.trail.add(view)
+
+    def close(self, view):
+        recording = {"version": RECORDING_VERSION, "seed": self.seed, "hashEvery": self.trail.every,
+                     "backends": self.trail.backends, "hash": self.trail.hexdigest(view),
+                     "frames": self.frames}
+        with open(self.path, "w") as f:
+            json.dump(recording, f)
+
+class InputPlayer(LiveInput):
+    """
+    Feeds the frames of a recording to MainView instead of reading
+    pygame, and computes the running state hash as it goes
+    """
+    def __init__(self, recording):
+        """
+        recording -- dict loaded from a recording file
+        """
+        if recording.get("version") != RECORDING_VERSION:
+            raise ValueError("unsupported recording version: {}".format(recording.get("version")))
+        self.recording = recording
+        self.seed = recording["seed"]
+        self.frames = recording["frames"]
+        self.next = 0 # index of the next frame to play
+        self.trail = StateTrail(recording["hashEvery"])
+        self.hash = None # running state hash once the game ended
+        self.backends = self.trail.backends
+
+    @staticmethod
+    def load(path):
+        """
+        return InputPlayer for the recording file at path
+        """
+        with open(path) as f:
+            return InputPlayer(json.load(f))
+
+    def done(self):
+        """
+        return True once every recorded frame was played
+        """
+        return self.next >= len(self.frames)
+
+    def poll(self, seconds):
+        seconds, pos, saved = self.frames[self.next]
+        self.next += 1
+        pygame.event.pump() # keep the window responsive, its events are ignored
+        events = []
+        for values in saved:
+            fields = EVENT_FIELDS[values[0]]
+            attrs = dict(zip(fields, values[1:]))
+            if 'pos' in attrs:
+                attrs['pos'] = tuple(attrs['pos'])
+            events.append(pygame.event.Event(values[0], attrs))
+        return seconds, events, tuple(pos)
+
+    def frameDone(self, view):
+        self.trail.add(view)
+
+    def close(self, view):
+        self.hash = self.trail.hexdigest(view)
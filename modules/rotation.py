@@ -0,0 +1,79 @@
+"""
+Module to define the RotationCache class used by rotating sprites
+"""
+import pygame
+from collections import OrderedDict
+
+class RotationCache():
+    """
+    Caches rotated copies of a Surface bucketed by angle so a
+    rotating sprite can reuse a pre-rendered image instead of calling
+    pygame.transform.rotate every frame. Each entry stores the rotated
+    Surface and the offset from the pivot to the topleft of the image.
+    """
+    def __init__(self, image, step=2, maxsize=180, pivot=None):
+        """
+        Create a cache for image where:
+            step -- size of each angle bucket in degrees
+            maxsize -- max number of rotated images kept in memory
+            pivot -- point on image (x,y) to rotate around, defaults to center
+        """
+        self.image = image
+        self.step = step
+        self.maxsize = maxsize
+        self.buckets = int(round(360 / step)) # number of distinct angles
+        self.cache = OrderedDict() # bucket -> (surface, offset), least recently used first
+        rect = image.get_rect()
+        if pivot is None:
+            pivot = rect.center
+        # vector from center of image to the pivot
+        self.pivot = pygame.math.Vector2(pivot) - pygame.math.Vector2(rect.center)
+
+    def bucket(self, angle):
+        """
+        return the bucket index the given angle falls into
+        """
+        return int(round(angle / self.step)) % self.buckets
+
+    def get(self, angle):
+        """
+        return (surface, offset) for the image rotated counter-clockwise by angle.
+        offset is the position of the topleft of surface relative to the pivot.
+        """
+        key = self.bucket(angle)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.cache.move_to_end(key)
+            return entry
+
+        entry = self.render(key)
+        self.cache[key] = entry
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False) # evict least recently used angle
+        return entry
+
+    def render(self, key):
+        """
+        rotate the image to the angle of bucket key
+        """
+        angle = key * self.step
+        surface = pygame.transform.rotate(self.image, angle)
+        # rotate keeps the image centered, so find where the pivot ended up
+        # (screen y points down so a counter-clockwise rotate is a negative angle)
+        pivot = self.pivot.rotate(-angle)
+        rect = surface.get_rect(center=(-pivot.x, -pivot.y))
+        return surface, rect.topleft
+
+    def preload(self):
+        """
+        Pre-render every angle bucket, up to maxsize of them
+        """
+        for key in range(min(self.buckets, self.maxsize)):
+            if key not in self.cache:
+                self.cache[key] = self.render(key)
+
+    def clear(self):
+        """
+        remove all cached images, i.e. after the source image changes
+        """
+        self.cache.clear()
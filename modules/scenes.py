@@ -0,0 +1,84 @@
+"""
+Module to define the SceneManager that runs the menu and fights
+in one window, and the Scene base class they are run as
+"""
+import time
+import pygame
+
+class Scene():
+    """
+    Base class for a screen of the game run by the SceneManager
+    """
+    fps = 60
+
+    def enter(self):
+        """
+        Called when the scene becomes the current one
+        """
+
+    def leave(self):
+        """
+        Called when another scene replaces this one or the game quits
+        """
+
+    def frame(self, seconds):
+        """
+        Run one frame that took seconds.
+        returns False to quit the game
+        """
+        return True
+
+class SceneManager():
+    """
+    Owns pygame and the display for the whole game. Scenes share the
+    display Surface and the asset cache, so switching between them
+    only costs what the scenes do in leave() and enter().
+    """
+    def __init__(self, width, height, caption="TaskArena"):
+        pygame.init()
+        pygame.display.set_caption(caption)
+        self.screen = pygame.display.set_mode((width, height))
+        self.clock = pygame.time.Clock()
+        self.scene = None
+        self.pending = None # scene to switch to before the next frame
+        self.running = False
+        self.switchTime = 0.0 # seconds the last switch took
+
+    def switch(self, scene):
+        """
+        Make scene the current scene before the next frame
+        """
+        self.pending = scene
+
+    def quit(self):
+        """
+        Stop after the current frame
+        """
+        self.running = False
+
+    def change(self):
+        """
+        Replace the current scene with the pending one
+        """
+        start = time.perf_counter()
+        if self.scene is not None:
+            self.scene.leave()
+        self.scene, self.pending = self.pending, None
+        self.scene.enter()
+        self.switchTime = time.perf_counter() - start
+        self.clock.tick() # don't count the switch as frame time
+
+    def run(self, scene):
+        """
+        Run scene and whatever scenes it switches to until one quits
+        """
+        self.switch(scene)
+        self.running = True
+        while self.running:
+            if self.pending is not None:
+                self.change()
+            seconds = self.clock.tick(self.scene.fps) / 1000.0
+            if not self.scene.frame(seconds):
+                self.running = False
+        self.scene.leave()
+        pygame.quit()
@@ -0,0 +1,99 @@
+"""
+Module to define the DueScheduler that posts a TASK_DUE
+pygame event when a task's due date passes
+"""
+import heapq
+import time
+from datetime import datetime, time as dayStart, timedelta
+import pygame
+from modules.taskindex import parseDueDate, taskKey
+
+TASK_DUE = pygame.USEREVENT + 1 # event posted with a task attribute when it is due
+MAX_POSTS = 32 # due events posted per update, the rest wait for the next one
+
+def dueTimestamp(text):
+    """
+    return time.time() timestamp a task with due date string text is due,
+    the end of that day, or None if the date can't be parsed
+    """
+    day = parseDueDate(text)
+    if day is None:
+        return None
+    return datetime.combine(day + timedelta(days=1), dayStart()).timestamp()
+
+class DueScheduler():
+    """
+    Priority queue of pending tasks ordered by when they are due.
+    update() is called every tick but only looks at the top of the
+    heap, so it costs nothing until the earliest deadline passes.
+    Removed tasks are marked dead in place and dropped when they
+    reach the top instead of searching the heap for them.
+    Tasks are known by taskKey(), so a copy of a task read from the
+    repository again unschedules or replaces the original.
+    """
+    def __init__(self):
+        self.heap = [] # [timestamp, number, task] entries, task None if removed
+        self.entries = {} # taskKey -> its heap entry
+        self.count = 0 # tie breaker so tasks are never compared
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, task):
+        """
+        Schedule task if it has a due date that can be parsed
+        """
+        due = dueTimestamp(task.dueDate)
+        if due is None:
+            return
+        self.remove(task)
+        entry = [due, self.count, task]
+        self.count += 1
+        self.entries[taskKey(task)] = entry
+        heapq.heappush(self.heap, entry)
+
+    def remove(self, task):
+        """
+        Unschedule task
+        """
+        entry = self.entries.pop(taskKey(task), None)
+        if entry is not None:
+            entry[2] = None
+            if len(self.heap) > 2 * len(self.entries) + 64: # mostly dead entries, rebuild
+                self.heap = [e for e in self.heap if e[2] is not None]
+                heapq.heapify(self.heap)
+
+    def replace(self, old, new):
+        """
+        Unschedule old and schedule new, i.e. after a task was edited
+        """
+        self.remove(old)
+        self.add(new)
+
+    def nextDue(self):
+        """
+        return timestamp of the earliest deadline or None
+        """
+        heap = self.heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def update(self, now=None):
+        """
+        Post a TASK_DUE event for each task whose deadline passed.
+        returns list of the tasks that became due
+        """
+        if now is None:
+            now = time.time()
+        heap = self.heap
+        due = []
+        while heap and heap[0][0] <= now and len(due) < MAX_POSTS:
+            entry = heapq.heappop(heap)
+            task = entry[2]
+            if task is None:
+                continue # removed while waiting
+            del self.entries[taskKey(task)]
+            due.append(task)
+            pygame.event.post(pygame.event.Event(TASK_DUE, task=task))
+        return due
@@ -0,0 +1,198 @@
+"""
+Module to define the SpatialHash grid used for collision queries
+"""
+import pygame
+
+class SpatialHash():
+    """
+    Uniform grid that buckets sprites by the cells their rect covers
+    so collision queries only look at sprites near the query rect
+    instead of every sprite in a group. Sprites are stored per group
+    so the same grid can answer platform, enemy and projectile queries,
+    and a sprite can be in more than one group on the same grid.
+    """
+    def __init__(self, cellSize=128):
+        """
+        Initialize empty grid with square cells of cellSize pixels
+        """
+        self.cellSize = cellSize
+        self.cells = {} # (group, cx, cy) -> set of sprites
+        self.spans = {} # (group, sprite) -> cell range it is bucketed in
+        self.order = {} # (group, sprite) -> insertion number, keeps query results stable
+        self.count = 0
+
+    def span(self, rect):
+        """
+        return range of cells (x0, y0, x1, y1) covered by rect
+        """
+        size = self.cellSize
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def add(self, sprite, group):
+        """
+        Add sprite to the grid as a member of group
+        """
+        key = (group, sprite)
+        if key in self.spans:
+            self.remove(sprite, group)
+        span = self.span(sprite.rect)
+        self.spans[key] = span
+        self.order[key] = self.count
+        self.count += 1
+        self.bucket(sprite, group, span)
+
+    def remove(self, sprite, group):
+        """
+        Remove sprite from the grid as a member of group
+        """
+        key = (group, sprite)
+        span = self.spans.pop(key, None)
+        if span is None:
+            return
+        del self.order[key]
+        self.unbucket(sprite, group, span)
+
+    def move(self, sprite, group):
+        """
+        Re-bucket sprite of group after its rect changed. Only touches
+        the grid when the sprite crossed into different cells.
+        """
+        key = (group, sprite)
+        old = self.spans.get(key)
+        if old is None:
+            return
+        span = self.span(sprite.rect)
+        if span == old:
+            return
+        self.unbucket(sprite, group, old)
+        self.bucket(sprite, group, span)
+        self.spans[key] = span
+
+    def bucket(self, sprite, group, span):
+        """
+        add sprite to each cell in span
+        """
+        cells = self.cells
+        x0, y0, x1, y1 = span
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                key = (group, cx, cy)
+                cell = cells.get(key)
+                if cell is None:
+                    cell = cells[key] = set()
+                cell.add(sprite)
+
+    def unbucket(self, sprite, group, span):
+        """
+        remove sprite from each cell in span
+        """
+        cells = self.cells
+        x0, y0, x1, y1 = span
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                key = (group, cx, cy)
+                cell = cells[key]
+                cell.discard(sprite)
+                if not cell:
+                    del cells[key] # don't keep empty cells around
+
+    def cell(self, group, cx, cy):
+        """
+        return the sprites of group bucketed in cell cx,cy
+        """
+        return self.cells.get((group, cx, cy), ())
+
+    def query(self, rect, group):
+        """
+        return list of sprites in group whose rect collides with rect,
+        in the order they were added to the grid
+        """
+        cells = self.cells
+        found = set()
+        x0, y0, x1, y1 = self.span(rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((group, cx, cy))
+                if cell:
+                    found.update(cell)
+        hits = [s for s in found if rect.colliderect(s.rect)]
+        if len(hits) > 1:
+            order = self.order
+            hits.sort(key=lambda s: order[(group, s)])
+        return hits
+
+    def collide(self, sprite, group):
+        """
+        Same as pygame.sprite.spritecollide(sprite, group, False)
+        but only checks sprites in nearby cells
+        """
+        return [s for s in self.query(sprite.rect, group) if s is not sprite]
+
+class IndexedGroup(pygame.sprite.Group):
+    """
+    Group that keeps its sprites in a SpatialHash. Sprites are added
+    to the grid when added to the group and removed when killed.
+    """
+    def __init__(self, index, *sprites):
+        self.index = index
+        self.watchers = [] # called with (sprite, added) when membership changes
+        pygame.sprite.Group.__init__(self, *sprites)
+
+    def add_internal(self, sprite, layer=None):
+        pygame.sprite.Group.add_internal(self, sprite)
+        self.index.add(sprite, self)
+        for watcher in self.watchers:
+            watcher(sprite, True)
+
+    def remove_internal(self, sprite):
+        pygame.sprite.Group.remove_internal(self, sprite)
+        self.index.remove(sprite, self)
+        for watcher in self.watchers:
+            watcher(sprite, False)
+
+    def watch(self, watcher):
+        """
+        Call watcher(sprite, added) whenever a sprite is added to
+        (added True) or removed from the group
+        """
+        self.watchers.append(watcher)
+
+    def moved(self, sprite):
+        """
+        Re-bucket sprite after it moved
+        """
+        self.index.move(sprite, self)
+
+    def suspend(self, sprite):
+        """
+        Take sprite out of the grid but keep it in the group, so
+        queries don't find it until resume() puts it back
+        """
+        self.index.remove(sprite, self)
+
+    def resume(self, sprite):
+        """
+        Put a suspended sprite back in the grid where its rect is now
+        """
+        self.index.add(sprite, self)
+
+    def refresh(self):
+        """
+        Re-bucket every sprite in the group, i.e. after update() moved them
+        """
+        move = self.index.move
+        for sprite in self:
+            move(sprite, self)
+
+    def collide(self, sprite):
+        """
+        return sprites in this group that collide with sprite
+        """
+        return self.index.collide(sprite, self)
+
+    def query(self, rect):
+        """
+        return sprites in this group that collide with rect
+        """
+        return self.index.query(rect, self)
@@ -6,6 +6,66 @@ from pygame.locals import *
 from pgu import gui
 from copy import copy
 
+def xpText(stats):
+    """
+    return experience shown in the stat table, MAX once the player can't level up
+    """
+    if stats.maxed():
+        return str(stats.xp) + " / MAX"
+    return str(stats.xp) + " / " + str(stats.xpNeeded)
+
+class StatLabels():
+    """
+    Labels showing fields of a PlayerStats. Watches the stats and
+    remembers which fields changed so refresh() only re-renders
+    the labels of those fields. Each widget owns one and refreshes
+    it itself, so widgets never redraw each other's labels.
+    """
+    def __init__(self, stats):
+        self.stats = stats
+        self.labels = {} # field -> list of (Label, function(stats) returning its text)
+        self.changed = set() # fields changed since last refresh
+        stats.watch(self.statChanged)
+        
+    def add(self, label, text, *fields):
+        """
+        Show text(stats) in label whenever one of fields changes
+        """
+        for field in fields:
+            self.labels.setdefault(field, []).append((label, text))
+        
+    def statChanged(self, stats, field):
+        """
+        Watcher of the stats, remembers field for the next refresh()
+        if one of the labels shows it
+        """
+        if field in self.labels:
+            self.changed.add(field)
+            
+    def rebind(self, stats):
+        """
+        Show a different PlayerStats
+        """
+        self.stats.unwatch(self.statChanged)
+        self.stats = stats
+        stats.watch(self.statChanged)
+        for field in self.labels:
+            self.statChanged(stats, field)
+            
+    def refresh(self):
+        """
+        Set the text of labels whose field changed, skipping ones that would look the same
+        """
+        update = {}
+        for field in self.changed:
+            for label, text in self.labels[field]:
+                update[label] = text
+        self.changed.clear()
+        for label, text in update.items():
+            value = text(self.stats)
+            if label.value != value:
+                label.set_text(value)
+
 class StatTable(gui.Table):
     """
     Inherits from Table. creates a table to display
@@ -16,6 +76,7 @@ class StatTable(gui.Table):
         Initialize StatTable with the given stats
         """
         gui.Table.__init__(self,**params)
+        self.statLabels = StatLabels(stats)
         
         # Health row
         self.tr()
@@ -56,7 +117,7 @@ class StatTable(gui.Table):
         # XP row
         self.tr()
         self.td(gui.Label("Experience:"), align=-1)
-        self.xpLabel = gui.Label(str(stats.xp) + " / " + str(stats.xpNeeded))
+        self.xpLabel = gui.Label(xpText(stats))
         self.td(self.xpLabel)
         
         # Level row
@@ -71,20 +132,32 @@ class StatTable(gui.Table):
         self.skillLabel = gui.Label(str(stats.skillPts))
         self.td(self.skillLabel)
         
+        labels = self.statLabels
+        labels.add(self.hpLabel, lambda s: str(s.hp), 'hp')
+        labels.add(self.manaLabel, lambda s: str(s.mana), 'mana')
+        labels.add(self.staminaLabel, lambda s: str(s.stamina), 'stamina')
+        labels.add(self.strLabel, lambda s: "{:.2f}".format(s.strength), 'strength')
+        labels.add(self.speedLabel, lambda s: "{:.2f}".format(s.atkSpeed), 'atkSpeed')
+        labels.add(self.armorLabel, lambda s: str(s.netArmor), 'netArmor')
+        labels.add(self.xpLabel, xpText, 'xp', 'xpNeeded', 'lvl')
+        labels.add(self.lvlLabel, lambda s: str(s.lvl), 'lvl')
+        labels.add(self.skillLabel, lambda s: str(s.skillPts), 'skillPts')
+        
     def updateStats(self, stats):
         """
-        update the values of stats with the new given stats
+        Show stats if they are a different PlayerStats. Changes to
+        the stats shown are picked up by the next refreshStats().
         """
-        self.hpLabel.set_text(str(stats.hp))
-        self.manaLabel.set_text(str(stats.mana))
-        self.staminaLabel.set_text(str(stats.stamina))
-        self.strLabel.set_text("{:.2f}".format(stats.strength))
-        self.speedLabel.set_text("{:.2f}".format(stats.atkSpeed))
-        self.armorLabel.set_text(str(stats.netArmor))
-        self.xpLabel.set_text(str(stats.xp) + " / " + str(stats.xpNeeded))
-        self.lvlLabel.set_text(str(stats.lvl))
-        self.skillLabel.set_text(str(stats.skillPts))
-        
+        if stats is not self.statLabels.stats:
+            self.statLabels.rebind(stats)
+            
+    def refreshStats(self):
+        """
+        Update the labels of stats that changed since the last call.
+        Called once per frame so many changes cause one redraw.
+        """
+        self.statLabels.refresh()
+
 
 class UpgradeStatsTable(gui.Table):
     """
@@ -179,6 +252,14 @@ class UpgradeStatsTable(gui.Table):
         self.skillLabel = gui.Label(str(stats.skillPts))
         self.td(self.skillLabel)
         
+        labels = self.statLabels = StatLabels(self.updatedStats)
+        labels.add(self.hpLabel, lambda s: str(s.hp), 'hp')
+        labels.add(self.manaLabel, lambda s: str(s.mana), 'mana')
+        labels.add(self.staminaLabel, lambda s: str(s.stamina), 'stamina')
+        labels.add(self.strLabel, lambda s: "{:.2f}".format(s.strength), 'strength')
+        labels.add(self.speedLabel, lambda s: "{:.2f}".format(s.atkSpeed), 'atkSpeed')
+        labels.add(self.skillLabel, lambda s: str(s.skillPts), 'skillPts')
+        
     def plusBtnClicked(self, stat):
         """
         callback for when '+' button is clicked. increment
@@ -188,7 +269,7 @@ class UpgradeStatsTable(gui.Table):
             return # no skill points available
         
         values = {'hp':5, 'mana':5, 'stamina':5,'strength':0.1, 'atkSpeed':0.05}
-        self.updatedStats.__dict__[stat] += values[stat] # increment the selected stat
+        setattr(self.updatedStats, stat, getattr(self.updatedStats, stat) + values[stat]) # increment the selected stat
         self.usedPts[stat] += 1 # skill point used
         self.updatedStats.skillPts -= 1 # remove one from availabe
         self.updateStatsUI()
@@ -201,22 +282,16 @@ class UpgradeStatsTable(gui.Table):
         if self.usedPts[stat] == 0:
             return # no skill points used for that stat
         
-        self.updatedStats.__dict__[stat] -= self.increments[stat] # increment the selected stat
+        setattr(self.updatedStats, stat, getattr(self.updatedStats, stat) - self.increments[stat]) # increment the selected stat
         self.updatedStats.skillPts += 1 # skill point now avaible
         self.usedPts[stat] -= 1 # one less used up pt for stat
-        
         self.updateStatsUI()
         
     def updateStatsUI(self):
         """
-        update the UI to show updated stats
+        update the UI now to show stats changed since the last refresh
         """
-        self.hpLabel.set_text(str(self.updatedStats.hp))
-        self.manaLabel.set_text(str(self.updatedStats.mana))
-        self.staminaLabel.set_text(str(self.updatedStats.stamina))
-        self.strLabel.set_text("{:.2f}".format(self.updatedStats.strength))
-        self.speedLabel.set_text("{:.2f}".format(self.updatedStats.atkSpeed))
-        self.skillLabel.set_text(str(self.updatedStats.skillPts))
+        self.statLabels.refresh()
         
 class UpgradeStatsDialog(gui.Dialog):
     """
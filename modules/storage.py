@@ -0,0 +1,253 @@
+"""
+Module to define the JournalStore used to save tasks and player stats
+"""
+import json
+import os
+import threading
+
+class JournalStore():
+    """
+    Record store kept in memory and saved as a snapshot file plus an
+    append-only journal of changes. Every record has a stable integer
+    id. Only records changed since the last flush are written, so a
+    save costs the same no matter how many records there are. The
+    journal is folded into a new snapshot every compactEvery changes
+    by writing a temp file and renaming it over the old snapshot, so
+    a crash at any point leaves either the old or new data on disk.
+    Each snapshot has a generation number and the journal starts with
+    the generation it follows, so a journal left over from before the
+    last snapshot is never replayed on top of it.
+    Changes can be made on one thread while another flushes.
+    """
+    def __init__(self, path, compactEvery=500):
+        """
+        Open (or create) the store saved at path. The journal is kept next to it.
+        """
+        self.path = path
+        self.journalPath = path + ".journal"
+        self.compactEvery = compactEvery
+        self.records = {} # id -> record dict
+        self.nextId = 1
+        self.generation = 0 # goes up with every snapshot written
+        self.dirty = set() # ids changed since last flush
+        self.deleted = set() # ids removed since last flush
+        self.journalled = 0 # changes in journal since last compaction
+        self.lock = threading.Lock() # guards records and the dirty/deleted sets
+        self.writeLock = threading.Lock() # one thread writes the files at a time
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        self.load()
+        self.journal = open(self.journalPath, "ab") # kept open for the life of the store
+        if self.journal.tell() == 0:
+            self.writeHeader(self.journal)
+
+    def load(self):
+        """
+        Read the snapshot and replay the journal on top of it
+        """
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                snapshot = json.load(f)
+            self.records = {int(k): v for k, v in snapshot["records"].items()}
+            self.nextId = snapshot["nextId"]
+            self.generation = snapshot.get("generation", 0)
+
+        if not os.path.exists(self.journalPath):
+            return
+        good = 0 # offset after the last complete entry
+        with open(self.journalPath, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break # partly written entry from a crash, drop it
+                try:
+                    entry = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    break
+                if "generation" in entry:
+                    if entry["generation"] != self.generation:
+                        break # written before the snapshot, its changes are already in it
+                    good += len(line)
+                    continue
+                self.apply(entry)
+                self.journalled += 1
+                good += len(line)
+        if good < os.path.getsize(self.journalPath):
+            with open(self.journalPath, "r+b") as f:
+                f.truncate(good)
+
+    def writeHeader(self, f):
+        """
+        Start journal file f with the generation of the current snapshot
+        """
+        f.write((json.dumps({"generation": self.generation}) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+    def apply(self, entry):
+        """
+        Apply one journal entry to the records in memory
+        """
+        recordId = entry["id"]
+        if entry["op"] == "put":
+            self.records[recordId] = entry["record"]
+            self.nextId = max(self.nextId, recordId + 1)
+        elif entry["op"] == "del":
+            self.records.pop(recordId, None)
+
+    def insert(self, record):
+        """
+        Add record and return its new id
+        """
+        with self.lock:
+            recordId = self.nextId
+            self.nextId += 1
+            self.records[recordId] = dict(record)
+            self.dirty.add(recordId)
+            self.deleted.discard(recordId)
+        return recordId
+
+    def update(self, recordId, record):
+        """
+        Replace the record with id recordId, creating it if needed.
+        Nothing is written if the record didn't change.
+        """
+        with self.lock:
+            if self.records.get(recordId) == record:
+                return False
+            self.records[recordId] = dict(record)
+            self.nextId = max(self.nextId, recordId + 1)
+            self.dirty.add(recordId)
+            self.deleted.discard(recordId)
+        return True
+
+    def remove(self, recordId):
+        """
+        Remove the record with id recordId
+        """
+        with self.lock:
+            if self.records.pop(recordId, None) is None:
+                return False
+            self.dirty.discard(recordId)
+            self.deleted.add(recordId)
+        return True
+
+    def get(self, recordId):
+        """
+        return the record with id recordId or None
+        """
+        return self.records.get(recordId)
+
+    def all(self):
+        """
+        return list of (id, record) in the order records were created
+        """
+        with self.lock:
+            return sorted(self.records.items())
+
+    def __len__(self):
+        return len(self.records)
+
+    def pending(self):
+        """
+        return number of changes not written yet
+        """
+        return len(self.dirty) + len(self.deleted)
+
+    def flush(self):
+        """
+        Append changes since the last flush to the journal,
+        compacting it into the snapshot once it is long enough.
+        returns number of changes written.
+        If writing raises OSError the changes stay pending for the next flush.
+        """
+        with self.writeLock:
+            if self.journal is None: # the journal couldn't be replaced after the last snapshot
+                count = self.pending()
+                self.writeSnapshot()
+                return count
+            with self.lock: # only hold the lock while serializing, not during disk io
+                lines = []
+                for recordId in sorted(self.dirty):
+                    lines.append(json.dumps({"op": "put", "id": recordId, "record": self.records[recordId]}))
+                for recordId in sorted(self.deleted):
+                    lines.append(json.dumps({"op": "del", "id": recordId}))
+                dirty, deleted = self.dirty, self.deleted
+                self.dirty, self.deleted = set(), set()
+            if not lines:
+                return 0
+            end = self.journal.tell()
+            try:
+                self.journal.write(("\n".join(lines) + "\n").encode("utf-8"))
+                self.journal.flush()
+                os.fsync(self.journal.fileno())
+            except OSError:
+                self.restore(dirty, deleted)
+                try:
+                    self.journal.truncate(end) # don't leave half an entry for the next one to follow
+                except OSError:
+                    pass # load() drops a partly written entry anyway
+                raise
+            self.journalled += len(lines)
+            if self.journalled >= self.compactEvery:
+                self.writeSnapshot()
+            return len(lines)
+
+    def restore(self, dirty, deleted):
+        """
+        Mark changes whose write failed as pending again, unless
+        they were replaced by newer changes in the meantime
+        """
+        with self.lock:
+            self.dirty.update(i for i in dirty if i in self.records and i not in self.deleted)
+            self.deleted.update(i for i in deleted if i not in self.records)
+
+    def compact(self):
+        """
+        Write every record to a new snapshot and empty the journal
+        """
+        with self.writeLock:
+            self.writeSnapshot()
+
+    def writeSnapshot(self):
+        """
+        compact() without taking writeLock, caller must hold it
+        """
+        with self.lock:
+            generation = self.generation + 1
+            data = json.dumps({"nextId": self.nextId, "generation": generation,
+                               "records": {str(k): v for k, v in self.records.items()}})
+            dirty, deleted = self.dirty, self.deleted # unflushed changes go into the snapshot
+            self.dirty, self.deleted = set(), set()
+        temp = self.path + ".tmp"
+        try:
+            with open(temp, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, self.path) # atomic, the old snapshot stays valid until here
+        except OSError:
+            self.restore(dirty, deleted)
+            raise
+        # from here on the old journal is ignored by load() because its generation
+        # is older, so a crash before it is replaced can't replay stale changes
+        self.generation = generation
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        temp = self.journalPath + ".tmp"
+        with open(temp, "wb") as f:
+            self.writeHeader(f)
+        os.replace(temp, self.journalPath)
+        self.journal = open(self.journalPath, "ab")
+        self.journalled = 0
+
+    def close(self):
+        """
+        Flush changes and close the journal
+        """
+        self.flush()
+        with self.writeLock:
+            if self.journal is not None:
+                self.journal.close()
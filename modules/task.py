@@ -0,0 +1,27 @@
+"""
+Module to define the Task class, kept apart from the widgets
+so storage and import code can use it without pgu
+"""
+
+class Task():
+    """
+    Class that represents a task user can create.
+    Task has name, notes, dueDate, tags properties
+    """
+    def __init__(self, name=None, notes=None, duedate=None, tags=None, id=None):
+        """
+        Create new Task. id is the task's id in storage,
+        None until the task is saved
+        """
+        self.name = name
+        self.notes = notes
+        self.dueDate = duedate
+        self.tags = tags
+        self.id = id
+        
+    def toRecord(self):
+        """
+        return dict of task values to save in storage
+        """
+        return {'name': self.name, 'notes': self.notes,
+                'dueDate': self.dueDate, 'tags': self.tags}
@@ -0,0 +1,182 @@
+"""
+Module to define the TaskIndex that lets the TaskList filter
+tasks by tag, sort them by due date and search their text
+"""
+import re
+from bisect import bisect_left, insort
+from datetime import date, datetime
+from functools import lru_cache
+
+WORD = re.compile(r"\w+")
+ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})$")
+# due dates are typed freely in the TaskDialog, these are the formats understood
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%Y/%m/%d",
+                "%b %d %Y", "%B %d %Y", "%b %d, %Y", "%B %d, %Y", "%d %b %Y", "%d %B %Y"]
+
+@lru_cache(maxsize=4096) # many tasks share a due date
+def parseDueDate(text):
+    """
+    return datetime.date for a due date string or None if it can't be parsed
+    """
+    if not text:
+        return None
+    text = " ".join(str(text).split())
+    match = ISO_DATE.match(text)
+    if match: # most common, skip strptime
+        try:
+            return date(*map(int, match.groups()))
+        except ValueError:
+            return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+def words(text):
+    """
+    return set of lower case words in text
+    """
+    return set(WORD.findall(text.lower())) if text else set()
+
+def taskKey(task):
+    """
+    return what identifies task across copies read from storage,
+    its id, or the Task itself until it is saved
+    """
+    return task if task.id is None else task.id
+
+class TaskIndex():
+    """
+    Indexes of a list of Tasks kept up to date as tasks are added,
+    replaced or removed so filtering doesn't scan every task:
+        an inverted index of tag -> tasks,
+        a sorted list of parsed due dates,
+        an inverted index of word -> tasks over name and notes, with
+        the words kept sorted so a prefix finds its words by bisection.
+    """
+    def __init__(self):
+        self.order = {} # Task -> insertion number, results keep list order
+        self.ordered = [] # sorted (order, Task), the whole list without sorting it
+        self.count = 0
+        self.byTag = {} # tag -> set of Tasks
+        self.due = [] # sorted (date, order, Task) of tasks with a due date
+        self.dueOf = {} # Task -> parsed due date
+        self.byWord = {} # word -> set of Tasks
+        self.words = [] # sorted words in byWord
+        self.wordsOf = {} # Task -> set of words
+
+    def __len__(self):
+        return len(self.order)
+
+    def add(self, task, order=None):
+        """
+        Index task, after every task already indexed unless order is given
+        """
+        if order is None:
+            order = self.count
+            self.count += 1
+        self.order[task] = order
+        insort(self.ordered, (order, task))
+        for tag in task.tags or ():
+            self.byTag.setdefault(tag, set()).add(task)
+        day = parseDueDate(task.dueDate)
+        if day is not None:
+            self.dueOf[task] = day
+            insort(self.due, (day, order, task))
+        found = words(task.name) | words(task.notes)
+        self.wordsOf[task] = found
+        for word in found:
+            tasks = self.byWord.get(word)
+            if tasks is None:
+                tasks = self.byWord[word] = set()
+                insort(self.words, word)
+            tasks.add(task)
+
+    def remove(self, task):
+        """
+        Remove task from the index
+        """
+        order = self.order.pop(task, None)
+        if order is None:
+            return
+        del self.ordered[bisect_left(self.ordered, (order,))]
+        for tag in task.tags or ():
+            tasks = self.byTag.get(tag)
+            if tasks is not None:
+                tasks.discard(task)
+        day = self.dueOf.pop(task, None)
+        if day is not None:
+            del self.due[bisect_left(self.due, (day, order))]
+        for word in self.wordsOf.pop(task):
+            tasks = self.byWord[word]
+            tasks.discard(task)
+            if not tasks:
+                del self.byWord[word]
+                del self.words[bisect_left(self.words, word)]
+
+    def replace(self, old, new):
+        """
+        Index new in place of old, keeping old's position
+        """
+        order = self.order.get(old)
+        self.remove(old)
+        self.add(new, order)
+
+    def prefixed(self, prefix):
+        """
+        return set of tasks with a word starting with prefix
+        """
+        found = set()
+        i = bisect_left(self.words, prefix)
+        while i < len(self.words) and self.words[i].startswith(prefix):
+            found.update(self.byWord[self.words[i]])
+            i += 1
+        return found
+
+    def search(self, text):
+        """
+        return set of tasks that have a word starting with each word in text
+        """
+        found = None
+        for prefix in sorted(words(text), key=len, reverse=True): # longest prefixes match fewest tasks
+            matches = self.prefixed(prefix)
+            found = matches if found is None else found & matches
+            if not found:
+                break
+        return found if found is not None else set(self.order)
+
+    def select(self, tag=None, text=None, byDueDate=False):
+        """
+        return list of tasks that have tag and match the search text,
+        in list order or by due date (tasks without one last)
+        """
+        if tag is not None:
+            found = set(self.byTag.get(tag, ()))
+            if text:
+                found &= self.search(text)
+        elif text:
+            found = self.search(text)
+        elif byDueDate: # everything, the indexes are already in order
+            return ([t for day, order, t in self.due] +
+                    [t for order, t in self.ordered if t not in self.dueOf])
+        else:
+            return [t for order, t in self.ordered]
+        if not byDueDate:
+            return sorted(found, key=self.order.__getitem__)
+        if len(found) * 4 < len(self.due): # few matches, cheaper to sort them than scan the dates
+            dated = sorted([t for t in found if t in self.dueOf],
+                           key=lambda t: (self.dueOf[t], self.order[t]))
+        else:
+            dated = [t for day, order, t in self.due if t in found]
+        undated = sorted([t for t in found if t not in self.dueOf], key=self.order.__getitem__)
+        return dated + undated
+
+    def dueBetween(self, start, end):
+        """
+        return list of tasks due from date start up to but not including end, by due date
+        """
+        i = bisect_left(self.due, (start,))
+        j = bisect_left(self.due, (end,))
+        return [t for day, order, t in self.due[i:j]]
@@ -0,0 +1,268 @@
+"""
+Module to import and export tasks as JSON lines, CSV or iCalendar
+VTODO files. Readers and writers are generators working on one
+task record at a time, so files of any size are streamed between
+the file and the task repository in constant memory.
+"""
+import csv
+import json
+import os
+from itertools import islice
+from modules.taskindex import parseDueDate
+from modules.taskrepo import TaskPages
+
+BATCH_SIZE = 500 # records inserted per transaction when importing
+ICAL_LINE = 75 # longest iCalendar line in octets before it is folded
+
+# lower case column/field names other to-do tools use for each record field
+ALIASES = {
+    'name': ['name', 'title', 'summary', 'task', 'content'],
+    'notes': ['notes', 'description', 'note', 'body'],
+    'dueDate': ['duedate', 'due', 'due_date', 'due date', 'deadline'],
+    'tags': ['tags', 'categories', 'labels', 'tag'],
+    'done': ['done', 'completed', 'complete', 'status'],
+}
+DONE_VALUES = ['1', 'true', 'yes', 'x', 'done', 'completed']
+
+def normalize(raw):
+    """
+    return task record dict for a dict read from a file, taking the
+    first field found for each of the record's values
+    """
+    fields = {str(k).strip().lower(): v for k, v in raw.items()}
+    record = {}
+    for key, names in ALIASES.items():
+        value = None
+        for name in names:
+            value = fields.get(name)
+            if value is not None and value != "":
+                break
+        record[key] = value
+    tags = record['tags']
+    if isinstance(tags, str):
+        tags = [t.strip().lower() for t in tags.replace(',', ';').split(';') if t.strip()]
+    record['tags'] = list(tags or [])
+    done = record['done']
+    record['done'] = done if isinstance(done, bool) else str(done).strip().lower() in DONE_VALUES
+    return record
+
+def batches(records, size=BATCH_SIZE):
+    """
+    yield lists of up to size records
+    """
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+# JSON lines
+
+def readJSONL(f):
+    """
+    yield task records from a file with one json object per line
+    """
+    for n, line in enumerate(f, 1):
+        if line.strip():
+            raw = json.loads(line)
+            if not isinstance(raw, dict):
+                raise ValueError("line {} is not a JSON object".format(n))
+            yield normalize(raw)
+
+def writeJSONL(records, f):
+    """
+    write task records to f one json object per line
+    """
+    for record in records:
+        f.write(json.dumps(record) + "\n")
+
+# CSV
+
+CSV_FIELDS = ['name', 'notes', 'dueDate', 'tags', 'done']
+
+def readCSV(f):
+    """
+    yield task records from a csv file with a header row
+    """
+    reader = csv.DictReader(f)
+    try:
+        for row in reader:
+            yield normalize(row)
+    except csv.Error as e:
+        raise ValueError("line {}: {}".format(reader.line_num, e))
+
+def writeCSV(records, f):
+    """
+    write task records to f as csv with CSV_FIELDS columns, tags separated by ;
+    """
+    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        row = dict(record)
+        row['tags'] = ";".join(record.get('tags') or [])
+        row['done'] = int(bool(record.get('done')))
+        writer.writerow(row)
+
+# iCalendar VTODO
+
+def icalEscape(text):
+    """
+    return text with iCalendar TEXT special characters escaped
+    """
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+def icalUnescape(text):
+    """
+    return iCalendar TEXT value with escapes removed
+    """
+    out = []
+    chars = iter(text)
+    for c in chars:
+        if c == "\\":
+            c = next(chars, "")
+            out.append("\n" if c in "nN" else c)
+        else:
+            out.append(c)
+    return "".join(out)
+
+def icalFold(line):
+    """
+    return line folded into ICAL_LINE octet pieces joined with CRLF and a space
+    """
+    data = line.encode("utf-8")
+    pieces = []
+    limit = ICAL_LINE
+    while len(data) > limit:
+        cut = limit
+        while (data[cut] & 0xC0) == 0x80: # don't split a utf-8 character
+            cut -= 1
+        pieces.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+        limit = ICAL_LINE - 1 # continuation lines start with a space
+    pieces.append(data.decode("utf-8"))
+    return "\r\n ".join(pieces)
+
+def icalLines(f):
+    """
+    yield unfolded content lines of an iCalendar file
+    """
+    current = None
+    for line in f:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+def readICal(f):
+    """
+    yield task records from the VTODO components of an iCalendar file
+    """
+    todo = None
+    for line in icalLines(f):
+        if line == "BEGIN:VTODO":
+            todo = {}
+        elif line == "END:VTODO" and todo is not None:
+            yield normalize(todo)
+            todo = None
+        elif todo is not None and ":" in line:
+            head, value = line.split(":", 1)
+            name = head.split(";", 1)[0].lower()
+            if name in ('summary', 'description'):
+                todo[name] = icalUnescape(value)
+            elif name == 'categories':
+                todo[name] = ";".join(icalUnescape(v) for v in value.split(","))
+            elif name == 'due' and len(value) >= 8:
+                todo[name] = "{}-{}-{}".format(value[:4], value[4:6], value[6:8])
+            elif name == 'status':
+                todo['done'] = value.strip().upper() == "COMPLETED"
+
+def writeICal(records, f):
+    """
+    write task records to f as an iCalendar file of VTODO components.
+    The UID comes from the record's repository id so calendars
+    recognize the same task in later exports.
+    """
+    f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//TaskArena//Tasks//EN\r\n")
+    for n, record in enumerate(records):
+        uid = record.get('id')
+        uid = "task-{}@taskarena".format(uid) if uid is not None else "task-new-{}@taskarena".format(n)
+        lines = ["BEGIN:VTODO", "UID:" + uid,
+                 "SUMMARY:" + icalEscape(record.get('name') or "")]
+        if record.get('notes'):
+            lines.append("DESCRIPTION:" + icalEscape(record['notes']))
+        due = parseDueDate(record.get('dueDate'))
+        if due is not None:
+            lines.append("DUE;VALUE=DATE:" + due.strftime("%Y%m%d"))
+        if record.get('tags'):
+            lines.append("CATEGORIES:" + ",".join(icalEscape(t) for t in record['tags']))
+        lines.append("STATUS:" + ("COMPLETED" if record.get('done') else "NEEDS-ACTION"))
+        lines.append("END:VTODO")
+        f.write("".join(icalFold(line) + "\r\n" for line in lines))
+    f.write("END:VCALENDAR\r\n")
+
+FORMATS = { # file extension -> (reader, writer)
+    '.jsonl': (readJSONL, writeJSONL),
+    '.csv': (readCSV, writeCSV),
+    '.ics': (readICal, writeICal),
+}
+
+def fileFormat(path):
+    """
+    return (reader, writer) for path's extension
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError("unknown task file format: " + path)
+    return FORMATS[ext]
+
+def importTasks(repo, path, batchSize=BATCH_SIZE):
+    """
+    Add every task in the file at path to repo, committing each batch.
+    returns number of tasks imported
+    """
+    reader = fileFormat(path)[0]
+    count = 0
+    with open(path, newline='', encoding='utf-8') as f:
+        for batch in batches(reader(f), batchSize):
+            count += repo.addMany(batch)
+            repo.flush()
+    return count
+
+def taskRecords(repo):
+    """
+    yield records of every task in repo with their id, open tasks
+    then done ones, fetched a page at a time
+    """
+    for done in (False, True):
+        for task in TaskPages(repo, done=done):
+            record = task.toRecord()
+            record['done'] = done
+            record['id'] = task.id
+            yield record
+
+def exportTasks(repo, path):
+    """
+    Write every task in repo to the file at path.
+    The file is written next to path and renamed when complete.
+    returns number of tasks exported
+    """
+    writer = fileFormat(path)[1]
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+    temp = path + ".tmp"
+    with open(temp, "w", newline='', encoding='utf-8') as f:
+        writer(counted(taskRecords(repo)), f)
+    os.replace(temp, path)
+    return count
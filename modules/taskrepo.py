@@ -0,0 +1,304 @@
+"""
+Module to define the SQLiteTaskRepository the main menu saves tasks
+in, and TaskPages to read its tasks a page at a time
+"""
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from modules.task import Task
+
+PAGE_SIZE = 100 # tasks fetched per query when paging
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    notes TEXT,
+    due_date TEXT,
+    done INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS task_tags (
+    tag TEXT NOT NULL,
+    task_id INTEGER NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, task_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tasks_done ON tasks(done, id);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks(done, due_date, id);
+CREATE INDEX IF NOT EXISTS task_tags_task ON task_tags(task_id);
+"""
+
+class SQLiteTaskRepository():
+    """
+    Tasks saved in a SQLite database with indexes on completion,
+    due date and tag, so the menu can fetch one page of open tasks
+    without reading the rest. Every change is committed right away,
+    which in WAL mode with synchronous=NORMAL only appends to the
+    write-ahead log without waiting for the disk. flush(), called by
+    the AutoSaver on its thread, makes the changes durable by
+    checkpointing the log from a connection of its own, without
+    taking the lock the UI thread's edits and reads use.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock() # guards self.db, also used by import threads
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA wal_autocheckpoint=0") # flush() checkpoints, off the UI thread
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+        self.saver = None # connection flush() checkpoints with, opened on first flush
+        self.saveLock = threading.Lock() # imports flush on their own thread too
+        self.changes = 0 # changes since the last checkpoint
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold the lock and run the block's statements in one transaction
+        """
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def isEmpty(self):
+        """
+        return True if no task was ever saved
+        """
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM tasks LIMIT 1").fetchone() is None
+
+    def add(self, task):
+        """
+        Save a new task and return its id
+        """
+        with self.transaction():
+            cursor = self.db.execute("INSERT INTO tasks (name, notes, due_date) VALUES (?, ?, ?)",
+                                     (task.name, task.notes, task.dueDate))
+            taskId = cursor.lastrowid
+            self.setTags(taskId, task.tags)
+            self.changes += 1
+        return taskId
+
+    def addMany(self, records):
+        """
+        Save an iterable of record dicts in one transaction.
+        returns number of tasks added
+        """
+        count = 0
+        with self.transaction():
+            for record in records:
+                cursor = self.db.execute("INSERT INTO tasks (name, notes, due_date, done) VALUES (?, ?, ?, ?)",
+                                         (record.get('name'), record.get('notes'),
+                                          record.get('dueDate'), int(bool(record.get('done')))))
+                self.setTags(cursor.lastrowid, record.get('tags'))
+                count += 1
+            self.changes += count
+        return count
+
+    def update(self, task):
+        """
+        Save the changed values of a task that was already saved
+        """
+        with self.transaction():
+            self.db.execute("UPDATE tasks SET name=?, notes=?, due_date=? WHERE id=?",
+                            (task.name, task.notes, task.dueDate, task.id))
+            self.db.execute("DELETE FROM task_tags WHERE task_id=?", (task.id,))
+            self.setTags(task.id, task.tags)
+            self.changes += 1
+
+    def setTags(self, taskId, tags):
+        """
+        insert tag rows for taskId, caller must hold the lock
+        """
+        if tags:
+            self.db.executemany("INSERT OR IGNORE INTO task_tags (tag, task_id) VALUES (?, ?)",
+                                [(tag, taskId) for tag in tags])
+
+    def complete(self, taskId):
+        """
+        Mark a task done. Done tasks are kept but not returned by page() by default.
+        """
+        with self.lock:
+            self.db.execute("UPDATE tasks SET done=1 WHERE id=?", (taskId,))
+            self.changes += 1
+
+    def remove(self, taskId):
+        """
+        Delete a task
+        """
+        with self.lock:
+            self.db.execute("DELETE FROM tasks WHERE id=?", (taskId,))
+            self.changes += 1
+
+    def get(self, taskId):
+        """
+        return the Task with id taskId or None
+        """
+        with self.lock:
+            row = self.db.execute("SELECT id, name, notes, due_date FROM tasks WHERE id=?",
+                                  (taskId,)).fetchone()
+            if row is None:
+                return None
+            return self.build([row])[0]
+
+    def where(self, done, tag, hasDue=False):
+        """
+        return (sql, params) of the WHERE clause for done, tag and hasDue filters
+        """
+        sql = "WHERE done=?"
+        params = [int(done)]
+        if tag is not None:
+            sql += " AND id IN (SELECT task_id FROM task_tags WHERE tag=?)"
+            params.append(tag)
+        if hasDue:
+            sql += " AND due_date IS NOT NULL AND due_date != ''"
+        return sql, params
+
+    def count(self, done=False, tag=None, hasDue=False):
+        """
+        return number of tasks that are done (or not), have tag if given
+        and have a due date if hasDue is True
+        """
+        sql, params = self.where(done, tag, hasDue)
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM tasks " + sql, params).fetchone()[0]
+
+    def page(self, offset=0, limit=PAGE_SIZE, done=False, tag=None, byDueDate=False, after=None,
+             hasDue=False):
+        """
+        return list of up to limit Tasks starting at offset, in the order
+        they were created or by due date if byDueDate is True.
+        after -- only tasks with a larger id, cheaper than a large offset
+                 when reading every page in creation order
+        """
+        sql, params = self.where(done, tag, hasDue)
+        if after is not None:
+            sql += " AND id > ?"
+            params.append(after)
+        order = " ORDER BY due_date, id" if byDueDate else " ORDER BY id"
+        with self.lock:
+            rows = self.db.execute("SELECT id, name, notes, due_date FROM tasks " + sql + order +
+                                   " LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+            return self.build(rows)
+
+    def build(self, rows):
+        """
+        return Tasks for rows of (id, name, notes, due_date) with their tags,
+        caller must hold the lock
+        """
+        if not rows:
+            return []
+        tags = {}
+        ids = [row[0] for row in rows]
+        marks = ",".join("?" * len(ids))
+        for tag, taskId in self.db.execute("SELECT tag, task_id FROM task_tags WHERE task_id IN (" +
+                                           marks + ")", ids):
+            tags.setdefault(taskId, []).append(tag)
+        return [Task(name=name, notes=notes, duedate=due, tags=tags.get(taskId, []), id=taskId)
+                for taskId, name, notes, due in rows]
+
+    def pending(self):
+        """
+        return number of changes not made durable yet
+        """
+        return self.changes
+
+    def flush(self):
+        """
+        Write changes made since the last flush from the log into the
+        database file and sync it to disk.
+        returns number of changes saved, raises OSError if saving failed
+        """
+        with self.saveLock:
+            with self.lock:
+                changes = self.changes
+                self.changes = 0
+            if not changes:
+                return 0
+            try:
+                if self.saver is None:
+                    self.saver = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                self.saver.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            except sqlite3.Error as e:
+                with self.lock:
+                    self.changes += changes # retried on the next flush
+                raise OSError("saving tasks failed: {}".format(e))
+            return changes
+
+    def close(self):
+        """
+        Save changes and close the database
+        """
+        self.flush()
+        with self.saveLock:
+            if self.saver is not None:
+                self.saver.close()
+                self.saver = None
+        with self.lock:
+            self.db.close()
+
+class TaskPages():
+    """
+    Read only sequence of the tasks matching a query that fetches
+    them from a repository one page at a time as they are accessed.
+    Only the most recently used pages are kept in memory.
+    """
+    def __init__(self, repo, pageSize=PAGE_SIZE, maxPages=4, **query):
+        """
+        query -- done, tag, hasDue, byDueDate filters passed to repo.page()
+        """
+        self.repo = repo
+        self.pageSize = pageSize
+        self.maxPages = maxPages
+        self.query = query
+        self.pages = OrderedDict() # page number -> list of Tasks
+        self.length = None
+
+    def __len__(self):
+        if self.length is None:
+            self.length = self.repo.count(done=self.query.get('done', False), tag=self.query.get('tag'),
+                                          hasDue=self.query.get('hasDue', False))
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("task index out of range")
+        n = index // self.pageSize
+        page = self.pages.get(n)
+        if page is None:
+            page = self.pages[n] = self.repo.page(n * self.pageSize, self.pageSize, **self.query)
+            if len(self.pages) > self.maxPages:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(n)
+        return page[index - n * self.pageSize]
+
+    def __iter__(self):
+        if self.query.get('byDueDate'):
+            for n in range((len(self) + self.pageSize - 1) // self.pageSize):
+                for task in self.repo.page(n * self.pageSize, self.pageSize, **self.query):
+                    yield task
+            return
+        after = None
+        while True: # continue from the last id seen instead of skipping offset rows
+            page = self.repo.page(0, self.pageSize, after=after, **self.query)
+            for task in page:
+                yield task
+            if len(page) < self.pageSize:
+                return
+            after = page[-1].id
+
+    def invalidate(self):
+        """
+        Forget fetched pages after the repository changed
+        """
+        self.pages.clear()
+        self.length = None
@@ -4,64 +4,322 @@ Module to define all classes/widgets related to Tasks
 import pygame
 from pygame.locals import *
 from pgu import gui
+from modules.taskindex import TaskIndex, taskKey
+from modules.task import Task
 
-class Task():
-    """
-    Class that represents a task user can create.
-    Task has name, notes, dueDate, tags properties
-    """
-    def __init__(self, name=None, notes=None, duedate=None, tags=None):
-        """
-        Create new Task
-        """
-        self.name = name
-        self.notes = notes
-        self.dueDate = duedate
-        self.tags = tags
-    
+ROW_HEIGHT = 32 # pixels per task row in a virtual TaskList
+LABEL_WIDTH = 200 # width of task name labels in a virtual TaskList
+WHEEL_ROWS = 3 # rows scrolled per mouse wheel click
+TAGS = ["school", "work", "health"]
 
 class TaskList(gui.Table):
     """
     represents a scrollable list of Tasks.
     this widget is responsible for displaying user's tasks
-    along with creating buttons to interact with the tasks
+    along with creating buttons to interact with the tasks.
+    In virtual mode only the rows that fit in the list's height
+    are built, and scrolling rebinds those rows to other tasks
+    instead of creating widgets, so long lists stay responsive.
+    A virtual list can also show a TaskPages, reading tasks from
+    the repository a page at a time as rows scroll into view.
+    A TaskIndex kept next to the tasks lets the list be filtered
+    by tag and search text, and sorted by due date, without
+    scanning every task. It is built the first time a filter is used.
     """
-    def __init__(self, doneFnc=None, editFnc=None, removeFnc=None,**params):
+    def __init__(self, doneFnc=None, editFnc=None, removeFnc=None, virtual=False, **params):
         """
         Initialize TaskList with three callbacks:
             doneFnc -- callback when 'Done' button is clicked
             editFnc -- callback when 'Edit' button is clicked
             removeFnc -- callback when 'Remove' button is clicked
         These three callbacks should be defined functions
-        in the parent widget with parameters (task, task_index)
+        in the parent widget with parameters (task, task_index),
+        task_index is None for a filtered paged list
+        virtual -- reuse a fixed pool of rows sized to the height param
         """
         gui.Table.__init__(self,**params)
-        self.tasks = [] # list of Tasks
+        self.tasks = [] # list of Tasks, or a TaskPages
+        self.paged = False # True when self.tasks is a TaskPages
+        self.index = None # TaskIndex of the tasks once a filter was used
+        self.indexed = {} # taskKey -> Task in the index of a paged list
+        self.filter = None # dict of TaskIndex.select() arguments, None shows every task
+        self.shown = self.tasks # tasks displayed, self.tasks unless filtered
+        self.overdue = set() # taskKeys of tasks past their due date
         self.editFnc = editFnc
         self.removeFnc = removeFnc
         self.doneFnc = doneFnc
+        self.virtual = virtual
+        self.rows = [] # name Label of each row in virtual mode
+        self.offset = 0 # index of the task shown in the first row
+        if virtual:
+            self.buildFilterBar()
+            self.buildRows(max(1, params.get('height', ROW_HEIGHT) // ROW_HEIGHT - 1))
         
     def addTask(self, task):
         """
-        Add a task to the list and add to UI
+        Add a task to the list and add to UI.
+        A paged list reads it from the repository, where it must be saved already.
         """
-        self.tasks.append(task)
-        self.createTaskItem(len(self.tasks)-1)
+        if self.paged:
+            self.tasks.invalidate()
+        else:
+            self.tasks.append(task)
+        self.indexTask(task)
+        if self.filter is not None:
+            self.refilter()
+        elif self.virtual:
+            self.updateScroll()
+            self.bindRows(len(self.tasks)-1 - self.offset)
+        else:
+            self.createTaskItem(len(self.tasks)-1)
         
     def updateTask(self, updated_task, task_index):
         """
         Update Task in task list at given task_index with updated_task.
+        A paged list finds the task by id and reads the saved changes.
         """
-        self.tasks[task_index] = updated_task
-        self.updateList()
+        key = taskKey(updated_task)
+        if self.paged:
+            self.tasks.invalidate()
+            old = self.indexed.pop(key, None)
+        else:
+            old = self.tasks[task_index]
+            self.tasks[task_index] = updated_task
+            key = taskKey(old)
+        self.overdue.discard(key)
+        if self.index is not None and old is not None:
+            self.index.replace(old, updated_task)
+            if self.paged:
+                self.indexed[key] = updated_task
+        if self.filter is not None:
+            self.refilter()
+        elif self.paged:
+            self.bindRows()
+        elif self.virtual:
+            self.bindRows(task_index - self.offset, task_index - self.offset + 1)
+        else:
+            self.updateList()
     
-    def removeTask(self, task_index):
+    def removeTask(self, task_index, task=None):
         """
-        Remove Task in task list at given task_index
+        Remove Task in task list at given task_index.
+        A paged list needs the removed task, already gone from the repository.
         """
-        del self.tasks[task_index]
-        self.updateList()
+        if self.paged:
+            self.tasks.invalidate()
+            task = self.indexed.pop(taskKey(task), task)
+        else:
+            task = self.tasks.pop(task_index)
+        if self.index is not None:
+            self.index.remove(task)
+        self.overdue.discard(taskKey(task))
+        if self.filter is not None:
+            self.refilter()
+        elif self.paged:
+            self.updateScroll()
+            self.bindRows()
+        elif self.virtual:
+            self.updateScroll()
+            self.bindRows(task_index - self.offset) # rows below it shift up
+        else:
+            self.updateList()
         self.repaint()
+        
+    def setTasks(self, tasks):
+        """
+        Replace every task in the list with tasks, updating the UI once
+        at the end. tasks is an iterable of Tasks or, in virtual mode,
+        a TaskPages that is only read as its tasks are shown.
+        """
+        self.paged = self.virtual and hasattr(tasks, 'invalidate')
+        self.tasks = tasks if self.paged else list(tasks)
+        self.index = None
+        self.indexed = {}
+        self.overdue.clear()
+        self.refilter()
+        
+    def indexTasks(self):
+        """
+        return the TaskIndex of the tasks, building it on first use
+        """
+        if self.index is None:
+            self.index = TaskIndex()
+            for task in self.tasks: # a TaskPages is read a page at a time
+                self.indexTask(task)
+        return self.index
+        
+    def indexTask(self, task):
+        """
+        Add task to the index if it was built. A paged list orders
+        tasks by id, the order the repository returns them in.
+        """
+        if self.index is None:
+            return
+        if self.paged:
+            self.index.add(task, task.id)
+            self.indexed[taskKey(task)] = task
+        else:
+            self.index.add(task)
+        
+    def markOverdue(self, task):
+        """
+        Show task as overdue
+        """
+        key = taskKey(task)
+        self.overdue.add(key)
+        if self.virtual:
+            for r in range(min(len(self.rows), len(self.shown) - self.offset)):
+                if taskKey(self.shown[self.offset + r]) == key:
+                    self.bindRows(r, r + 1)
+        else:
+            self.updateList()
+            
+    def setFilter(self, tag=None, text=None, byDueDate=False):
+        """
+        Only show tasks with tag whose name or notes have words starting
+        with each word of text, sorted by due date if byDueDate is True.
+        Call with no arguments to show every task again.
+        """
+        if tag or (text and text.strip()) or byDueDate:
+            self.filter = {'tag': tag or None, 'text': text, 'byDueDate': byDueDate}
+        else:
+            self.filter = None
+        if self.virtual: # start at the top of the new results
+            self.offset = 0
+            self.slider.value = 0
+        self.refilter()
+        
+    def refilter(self):
+        """
+        Update the tasks shown after the filter or the tasks changed
+        """
+        self.shown = self.tasks if self.filter is None else self.indexTasks().select(**self.filter)
+        if self.virtual:
+            self.updateScroll()
+            self.bindRows()
+        else:
+            self.updateList()
+            
+    def buildFilterBar(self):
+        """
+        Create the search, tag and due date sort inputs above the rows
+        """
+        bar = gui.Table()
+        bar.tr()
+        bar.td(gui.Label("Search:"))
+        self.searchInput = gui.Input(size=12)
+        self.searchInput.connect(gui.CHANGE, self.filterChanged)
+        bar.td(self.searchInput)
+        
+        self.tagSelect = gui.Select(value="")
+        self.tagSelect.add("All", "")
+        for tag in TAGS:
+            self.tagSelect.add(tag.capitalize(), tag)
+        self.tagSelect.connect(gui.CHANGE, self.filterChanged)
+        bar.td(self.tagSelect)
+        
+        self.dueSwitch = gui.Switch(False)
+        self.dueSwitch.connect(gui.CHANGE, self.filterChanged)
+        bar.td(self.dueSwitch)
+        bar.td(gui.Label("By due date"))
+        
+        self.tr()
+        self.td(bar, colspan=8, align=-1)
+        
+    def filterChanged(self):
+        """
+        callback when one of the filter bar inputs changes
+        """
+        self.setFilter(tag=self.tagSelect.value, text=self.searchInput.value,
+                       byDueDate=self.dueSwitch.value)
+        
+    def buildRows(self, count):
+        """
+        Create count rows and the scroll bar for virtual mode.
+        Buttons call back with whatever task their row is bound to.
+        """
+        for r in range(count):
+            self.tr()
+            label = gui.Label("", width=LABEL_WIDTH)
+            self.td(label, colspan=3, align=-1)
+            self.td(gui.Spacer(width=50,height=1))
+            
+            doneBtn = gui.Button("Done")
+            doneBtn.connect(pygame.MOUSEBUTTONUP, self.rowClicked, r, self.doneFnc)
+            self.td(doneBtn, align=0)
+            
+            editBtn = gui.Button("Edit")
+            editBtn.connect(gui.CLICK, self.rowClicked, r, self.editFnc)
+            self.td(editBtn, align=0)
+            
+            removeBtn = gui.Button("Remove")
+            removeBtn.connect(gui.CLICK, self.rowClicked, r, self.removeFnc)
+            self.td(removeBtn, align=0)
+            self.rows.append(label)
+            
+        self.slider = gui.VSlider(value=0, min=0, max=0, size=20, width=16, height=count*ROW_HEIGHT)
+        self.slider.connect(gui.CHANGE, self.scrolled)
+        self.td(self.slider, row=1, col=7, rowspan=count) # row 0 is the filter bar
+        
+    def rowClicked(self, row, fnc):
+        """
+        callback of the buttons in row, passes the row's task on to fnc
+        """
+        shown_index = self.offset + row
+        if fnc is None or shown_index >= len(self.shown): # rows past the end are blank
+            return
+        task = self.shown[shown_index]
+        if self.shown is self.tasks:
+            task_index = shown_index
+        else:
+            task_index = None if self.paged else self.tasks.index(task)
+        fnc(task, task_index)
+            
+    def bindRows(self, first=0, last=None):
+        """
+        Show the tasks for rows first to last (default all following rows)
+        """
+        if last is None:
+            last = len(self.rows)
+        for r in range(max(first, 0), min(last, len(self.rows))):
+            shown_index = self.offset + r
+            name = ""
+            if shown_index < len(self.shown):
+                task = self.shown[shown_index]
+                name = (task.name or "") + (" (overdue)" if taskKey(task) in self.overdue else "")
+            self.rows[r].set_text(name)
+            
+    def updateScroll(self):
+        """
+        Fit the scroll bar to the number of tasks after it changed
+        """
+        maxOffset = max(0, len(self.shown) - len(self.rows))
+        self.slider.max = maxOffset
+        if self.offset > maxOffset:
+            self.scrollTo(maxOffset)
+            
+    def scrollTo(self, offset):
+        """
+        Show tasks starting at index offset in the first row
+        """
+        offset = max(0, min(offset, len(self.shown) - len(self.rows)))
+        if offset == self.offset:
+            return
+        self.offset = offset
+        self.slider.value = offset
+        self.bindRows()
+        
+    def scrolled(self):
+        """
+        callback when the scroll bar is moved
+        """
+        self.scrollTo(self.slider.value)
+        
+    def event(self, e):
+        if self.virtual and e.type == pygame.MOUSEBUTTONDOWN and e.button in (4, 5):
+            self.scrollTo(self.offset + (WHEEL_ROWS if e.button == 5 else -WHEEL_ROWS))
+            return True
+        return gui.Table.event(self, e)
 
     def createTaskItem(self, task_index):
         """
@@ -69,7 +327,10 @@ class TaskList(gui.Table):
         Displays Task name, along with 'Done','Edit','Remove' button
         """
         self.tr()
-        self.td(gui.Label(self.tasks[task_index].name), colspan=3, align=-1)
+        name = self.tasks[task_index].name or ""
+        if taskKey(self.tasks[task_index]) in self.overdue:
+            name += " (overdue)"
+        self.td(gui.Label(name), colspan=3, align=-1)
         self.td(gui.Spacer(width=50,height=1))
         
         doneBtn = gui.Button("Done")
@@ -91,11 +352,15 @@ class TaskList(gui.Table):
         """
         self.clear() # clear old list
         print('num tasks:', len(self.tasks))
-        if len(self.tasks) == 0:
+        if len(self.shown) == 0:
             self.tr()
-        else:
+        elif self.shown is self.tasks:
             for i in range(0, len(self.tasks)): # redraw updated list
                 self.createTaskItem(i)
+        else:
+            position = {task: i for i, task in enumerate(self.tasks)}
+            for task in self.shown:
+                self.createTaskItem(position[task])
         
         
 class TaskDialog(gui.Dialog):
@@ -0,0 +1,221 @@
+"""
+Module to define the Weapon base class, ranged weapons and the
+ProjectileSystem that moves their shots and checks what they hit
+"""
+import pygame
+from math import cos, sin, radians, floor
+
+PROJECTILE_POOL = 1024 # projectiles allocated up front
+PROJECTILE_SIZE = 4
+
+def hitOrder(sprite):
+    """
+    return sort key deciding which of two sprites a shot hits when
+    they are the same distance along its path: platforms before
+    enemies, then enemies by pool slot and platforms by position.
+    Grid cells are sets, so the order they give can't be used.
+    """
+    slot = getattr(sprite, 'slot', None)
+    if slot is None:
+        return (0, sprite.rect.x, sprite.rect.y)
+    return (1, slot, 0)
+
+class Weapon(pygame.sprite.Sprite):
+    """
+    Base class for weapons
+    """
+
+class RangedWeapon(Weapon):
+    """
+    Weapon held in the player's arm that fires projectiles
+    toward the mouse while the trigger is held.
+    """
+    def __init__(self, player, projectiles, fireRate=8, speed=900, damage=10, life=1.5):
+        """
+        Initialize weapon for player that fires into projectiles, a ProjectileSystem, where:
+            fireRate -- shots per second
+            speed -- projectile speed in pixels per second
+            damage -- damage done to an enemy by each shot
+            life -- seconds a shot flies before disappearing
+        """
+        super().__init__()
+        self.player = player
+        self.projectiles = projectiles
+        self.fireRate = fireRate
+        self.speed = speed
+        self.damage = damage
+        self.life = life
+        self.triggered = False
+        self.cooldown = 0.0 # seconds until weapon can fire again
+
+    def trigger(self, held):
+        """
+        Called when the fire button is pressed (held True) or released
+        """
+        self.triggered = held
+
+    def update(self, seconds):
+        """
+        Fire as often as fireRate allows while the trigger is held
+        """
+        self.cooldown -= seconds
+        while self.triggered and self.cooldown <= 0:
+            self.fire()
+            self.cooldown += 1.0 / self.fireRate
+        if self.cooldown < 0:
+            self.cooldown = 0.0
+
+    def muzzle(self):
+        """
+        return world position of the end of the arm and the unit direction it points
+        """
+        arm = self.player.arm
+        angle = radians(arm.angle)
+        dx, dy = cos(angle), sin(angle)
+        x = self.player.rect.centerx + dx * arm.orig_image.get_width()
+        y = self.player.rect.y + self.player.height/3 + dy * arm.orig_image.get_width()
+        return (x, y), (dx, dy)
+
+    def fire(self):
+        """
+        Launch one projectile from the end of the arm
+        """
+        (x, y), (dx, dy) = self.muzzle()
+        self.projectiles.launch(x, y, dx * self.speed, dy * self.speed, self.damage, self.life)
+
+class Projectile():
+    """
+    A single shot. Kept in ProjectileSystem's pool and reused.
+    """
+    __slots__ = ('x', 'y', 'px', 'py', 'vx', 'vy', 'damage', 'life')
+
+    def __init__(self):
+        self.x = self.y = 0.0
+        self.px = self.py = 0.0 # position before the last step, for interpolation
+        self.vx = self.vy = 0.0
+        self.damage = 0
+        self.life = 0.0
+
+class ProjectileSystem():
+    """
+    Moves every live projectile and tests the whole path it
+    travelled during a step (not just where it ends up) so fast
+    shots can't skip through thin platforms or enemies. Collision
+    is batched per step: projectiles are grouped by the grid cells
+    their paths cross, and each cell's platforms and enemies are
+    fetched from the arena's SpatialHash once for all of them.
+    """
+    def __init__(self, arena, size=PROJECTILE_POOL):
+        self.arena = arena
+        self.index = arena.index
+        self.free = [Projectile() for i in range(size)]
+        self.live = []
+        self.image = pygame.Surface([PROJECTILE_SIZE, PROJECTILE_SIZE])
+        self.image.fill((0,0,0))
+        self.hits = 0 # enemies hit since the game started
+        self.alpha = 1.0 # how far between the last two steps projectiles are drawn
+
+    def launch(self, x, y, vx, vy, damage, life):
+        """
+        Fire a projectile from world position x,y with velocity vx,vy
+        in pixels per second. Dropped if every pooled projectile is in flight.
+        """
+        if not self.free:
+            return None
+        shot = self.free.pop()
+        shot.x, shot.y = x, y
+        shot.px, shot.py = x, y
+        shot.vx, shot.vy = vx, vy
+        shot.damage = damage
+        shot.life = life
+        self.live.append(shot)
+        return shot
+
+    def update(self, seconds):
+        """
+        Move projectiles by seconds and resolve what they hit
+        """
+        if not self.live:
+            return
+        index = self.index
+        size = index.cellSize
+        platforms = self.arena.platform_list
+        enemies = self.arena.enemy_list
+
+        # group projectile paths by the cells they cross
+        paths = []
+        byCell = {} # cell -> projectiles crossing it
+        for shot in self.live:
+            x0, y0 = shot.x, shot.y
+            x1, y1 = x0 + shot.vx * seconds, y0 + shot.vy * seconds
+            cells = []
+            for cx in range(floor(min(x0, x1)) // size, floor(max(x0, x1)) // size + 1):
+                for cy in range(floor(min(y0, y1)) // size, floor(max(y0, y1)) // size + 1):
+                    cells.append((cx, cy))
+                    byCell.setdefault((cx, cy), []).append(shot)
+            paths.append((shot, (x0, y0), (x1, y1), cells))
+
+        # fetch what is in each cell once for every projectile in it
+        targets = {}
+        for cx, cy in byCell:
+            targets[(cx, cy)] = list(index.cell(platforms, cx, cy)) + list(index.cell(enemies, cx, cy))
+
+        # find the first thing along each path
+        alive = []
+        dead = set() # enemies killed this step
+        for shot, p0, p1, cells in paths:
+            nearest = None
+            best = None
+            for key in cells:
+                for sprite in targets[key]:
+                    if sprite in dead:
+                        continue
+                    clip = sprite.rect.clipline(p0, p1)
+                    if clip:
+                        ex, ey = clip[0]
+                        dist = (ex - p0[0]) ** 2 + (ey - p0[1]) ** 2
+                        if best is None or dist < best or \
+                                (dist == best and sprite is not nearest and hitOrder(sprite) < hitOrder(nearest)):
+                            best = dist
+                            nearest = sprite
+
+            shot.life -= seconds
+            if nearest is not None:
+                if nearest in enemies:
+                    self.hits += 1
+                    if nearest.hit(shot.damage):
+                        dead.add(nearest)
+                self.free.append(shot)
+            elif shot.life <= 0:
+                self.free.append(shot)
+            else:
+                shot.px, shot.py = p0
+                shot.x, shot.y = p1
+                alive.append(shot)
+        self.live = alive
+
+    def interpolate(self, alpha):
+        """
+        Draw projectiles alpha of the way between the last two steps
+        """
+        self.alpha = alpha
+
+    def draw(self, screen, camera):
+        """
+        Draw projectiles that are on screen.
+        They are drawn between their last two positions, see interpolate().
+        returns list of screen rects drawn to
+        """
+        view = camera.viewport
+        camx = camera.x
+        blit = screen.blit
+        image = self.image
+        half = PROJECTILE_SIZE // 2
+        alpha = self.alpha
+        rects = []
+        for shot in self.live:
+            x = shot.px + (shot.x - shot.px) * alpha
+            y = shot.py + (shot.y - shot.py) * alpha
+            if view.collidepoint(x, y):
+                rects.append(blit(image, (int(x) - half - camx, int(y) - half)))
+        return rects
@@ -1,80 +1,249 @@
+import argparse
+import gc
+import os
 import pygame
-from modules import player
+from modules import player, render, enemysim
+from modules.render import StaticLayer
+from modules.enemy import WaveSpawner, ENEMY_DAMAGE
+from modules.weapon import Weapon, RangedWeapon, ProjectileSystem
+from modules.level import LevelStreamer, MANIFEST, chunkFile
+from modules.assets import manager as assets
+from modules.camera import Camera
+from modules.spatial import SpatialHash, IndexedGroup
+from modules.replay import LiveInput, InputRecorder
+from modules.profiler import Profiler, FrameGraph, TRACE_FILE
+from modules.navigation import NavGraph
 # Screen dimensions
 SCR_WIDTH = 640
 SCR_HEIGHT = 480
+DEFAULT_LEVEL = "levels/arena1"
+# files needed to start a fight, preloaded by the menu
+ARENA_ASSETS = ["images/temp_bg.jpg", "images/temp_arm.png",
+                os.path.join(DEFAULT_LEVEL, MANIFEST),
+                chunkFile(DEFAULT_LEVEL, 0), chunkFile(DEFAULT_LEVEL, 1)]
+PHYSICS_HZ = 120 # physics steps per second, independent of fps
+MAX_FRAME_TIME = 0.25 # longest frame simulated, so a stall doesn't cause a burst of steps
 
 class MainView(object):
     
-    def __init__(self, width=640, height=480, fps=30):
+    def __init__(self, width=640, height=480, fps=30, dirty=False, screen=None, stats=None,
+                 seed=None, input=None, profiler=None):
         """
-        Initialize pygame, window, and font
+        Initialize pygame, window, and font.
+        When dirty is True only changed areas of the screen are redrawn.
+        screen -- display Surface to draw on, pygame is only initialized if None
+        stats -- the player's PlayerStats, new stats if None
+        seed -- seed for enemy spawns, random if None
+        input -- where events come from, a LiveInput, InputRecorder or InputPlayer
+        profiler -- Profiler timing the loop, F3 toggles it and F4 exports a trace
         """
-        pygame.init()
+        if screen is None:
+            pygame.init()
+            screen = pygame.display.set_mode((width,height)) # Set screen size of pygame window
         self.width = width
         self.height = height
         self.fps = fps
+        self.dirty = dirty
+        self.stats = stats
+        self.seed = seed
+        self.input = input if input is not None else LiveInput()
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.closed = False # True once the window was closed
+        self.lost = False # True once the player ran out of health
         self.clock = pygame.time.Clock()
-        self.screen = pygame.display.set_mode((self.width,self.height)) # Set screen size of pygame window
+        self.screen = screen
         self.allGroup = pygame.sprite.Group() # group of all sprites in view
         
+    def setup(self):
+        """
+        Create the arena, player and renderer for a new game
+        """
+        stats = self.stats if self.stats is not None else player.PlayerStats()
+        stats.heal()
+        self.lost = False
+        self.player = player.Player((self.width/2,200), stats)
+        self.arena = Arena(self.player, seed=self.seed, width=self.width, height=self.height)
+        self.player.level = self.arena
+        self.player.weapon = RangedWeapon(self.player, self.arena.projectiles)
+        self.allGroup.add(self.player.arm, self.player)
+        self.renderer = None
+        self.graph = FrameGraph(self.profiler) # frame times, shown while profiling
+        if self.dirty:
+            self.renderer = render.DirtyRenderer(self.screen, self.arena)
+            self.renderer.track(self.allGroup, 2)
+            self.renderer.overlay(self.graph)
+        self.step = 1.0 / PHYSICS_HZ
+        self.lag = 0.0 # simulation time not yet stepped
+        self.dirtyRects = []
+        
+        # everything allocated so far lives for the whole game, so keep
+        # the garbage collector from scanning it again during a fight
+        gc.collect()
+        gc.freeze()
+        
+    def teardown(self):
+        """
+        Let go of the game created by setup()
+        """
+        self.input.close(self) # recorders save the recording and its hash
+        self.allGroup.empty()
+        self.arena = self.player = self.renderer = self.graph = None
+        gc.unfreeze() # the fight's objects can be collected again
+        
     def run(self):
         """
         Main game loop
         """
-        arena = Arena()
-        _player = player.Player((self.width/2,200), player.PlayerStats())
-        _player.level = arena
-        self.allGroup.add(_player.arm, _player)
+        self.setup()
         running = True
         while running:
             seconds = self.clock.tick(self.fps) / 1000.0 # seconds passed since last frame
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_LEFT:
-                        _player.goLeft(seconds)
-                    if event.key == pygame.K_RIGHT:
-                        _player.goRight(seconds)
-                    if event.key == pygame.K_UP:
-                        _player.jump()
+            running = self.frame(seconds)
+        self.teardown()
+        pygame.quit() # clean up
+        
+    def frame(self, seconds):
+        """
+        Run one frame that took seconds. While the profiler is enabled
+        each part of the loop is timed as a scope.
+        returns False when the fight is over, because the player quit
+        or ran out of health
+        """
+        profiler = self.profiler
+        timed = profiler.enabled # checked once, toggling takes effect next frame
+        if timed:
+            clock = profiler.clock
+            add = profiler.add
+            start = clock()
+        seconds, events, self.player.mousePos = self.input.poll(seconds)
+        running = self.handleEvents(seconds, events)
+        if timed:
+            t = clock()
+            add("events", start, t)
+        
+        # advance physics in fixed steps so game speed doesn't depend on fps
+        for i in range(self.steps(seconds)):
+            if timed:
+                for sprite in self.allGroup.sprites():
+                    a = clock()
+                    sprite.update(self.step)
+                    add(type(sprite).__name__.lower() + ".update", a, clock()) # arm.update, player.update
+                b = clock()
+            else:
+                self.allGroup.update(self.step)
+            self.arena.update(self.step)
+            if timed:
+                add("arena.update", b, clock())
+        if self.player.stats.health <= 0:
+            self.lost = True
+            running = False # the enemies won, back to the menu
+        self.input.frameDone(self) # recorders hash the state
+        if timed:
+            physics = clock()
+            add("physics", t, physics)
+        
+        self.draw()
+        if timed:
+            t = clock()
+            add("draw", physics, t)
+        self.flip()
+        if timed:
+            end = clock()
+            add("flip", t, end)
+            profiler.addFrame(start, end)
+        return running
+        
+    def handleEvents(self, seconds, events=None):
+        """
+        Handle events for this frame, read from pygame if events is None.
+        returns False when the user quits or leaves the fight
+        """
+        running = True
+        _player = self.player
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+                self.closed = True
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False # back to the menu
+                if event.key == pygame.K_LEFT:
+                    _player.goLeft(seconds)
+                if event.key == pygame.K_RIGHT:
+                    _player.goRight(seconds)
+                if event.key == pygame.K_UP:
+                    _player.jump()
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                if event.key == pygame.K_F4:
+                    self.exportTrace()
  
-                if event.type == pygame.KEYUP:
-                    if event.key == pygame.K_LEFT and _player.change_x < 0:
-                        _player.stop()
-                    if event.key == pygame.K_RIGHT and _player.change_x > 0:
-                        _player.stop()
-            
-            # If the _player gets near the right side, shift the world left (-x)
-            if _player.rect.right >= 500:
-                diff = _player.rect.right - 500
-                _player.rect.right = 500
-                arena.shift_world(-diff)
-     
-            # If the _player gets near the left side, shift the world right (+x)
-            if _player.rect.left <= 120:
-                diff = 120 - _player.rect.left
-                _player.rect.left = 120
-                arena.shift_world(diff)
-            
-            self.allGroup.clear(self.screen, arena.background)
-            self.allGroup.update(seconds)
-            arena.update()
-            arena.draw(self.screen)
-            self.allGroup.draw(self.screen)
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_LEFT and _player.change_x < 0:
+                    _player.stop()
+                if event.key == pygame.K_RIGHT and _player.change_x > 0:
+                    _player.stop()
+ 
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                _player.weapon.trigger(True)
+            if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                _player.weapon.trigger(False)
+        return running
+        
+    def exportTrace(self, path=TRACE_FILE):
+        """
+        Write the profiler's scopes to path and show how it went on
+        the frame graph, turning the profiler on so the graph is drawn
+        """
+        self.profiler.enabled = True
+        try:
+            count = self.profiler.export(path)
+        except OSError as e:
+            self.graph.message = "trace export failed: {}".format(e.strerror or e)
+        else:
+            self.graph.message = "wrote {} events to {}".format(count, path)
+        
+    def steps(self, seconds):
+        """
+        return how many physics steps to run for a frame that took seconds
+        """
+        self.lag += min(seconds, MAX_FRAME_TIME)
+        count = int(self.lag // self.step)
+        self.lag -= count * self.step
+        return count
+        
+    def draw(self):
+        """
+        Draw the arena and sprites to the screen
+        """
+        alpha = self.lag / self.step
+        self.player.interpolate(alpha) # draw between last two steps
+        self.arena.interpolate(alpha)
+        
+        # scroll when the player gets near the left or right side of the screen
+        self.arena.camera.follow(self.player.drawRect)
+        
+        if self.renderer is None:
+            self.arena.draw(self.screen)
+            self.arena.camera.draw(self.screen, self.allGroup)
+            self.graph.draw(self.screen)
+        else:
+            self.dirtyRects = self.renderer.draw() # only changed areas of screen
+        
+    def flip(self):
+        """
+        Push what was drawn to the display
+        """
+        if self.renderer is None:
             pygame.display.flip() # update pygame display
-            
-        pygame.quit() # clean up
+        else:
+            pygame.display.update(self.dirtyRects)
         
-class Weapon(pygame.sprite.Sprite):
-    """
-    Base class for weapons
-    """
-
-class Platform(pygame.sprite.Sprite):
+class Platform(pygame.sprite.DirtySprite):
     """ Platform the user can jump on """
+    moving = False # platforms that don't move are baked into the StaticLayer
  
     def __init__(self, width, height):
         """ Platform constructor. Assumes constructed with user passing in
@@ -91,61 +260,99 @@ class Arena():
     This is a class used to define the Arena layout.
     """
  
-    def __init__(self, player=None):
-        self.platform_list = pygame.sprite.Group() # platforms in arena
-        self.enemy_list = pygame.sprite.Group() # enemies in arena
-        self.background = pygame.image.load("images/temp_bg.jpg").convert()
-        # self.player = player
-        
-        # Array with width, height, x, and y of platform
-        level = [[500, 25, 0, 400],
-                    [210, 70, 500, 500],
-                 [210, 70, 800, 400],
-                 [210, 70, 1000, 500],
-                 [210, 70, 1120, 280],
-                 ]
- 
-        # Go through the array above and add platforms
-        for platform in level:
-            block = Platform(platform[0], platform[1])
-            block.rect.x = platform[2]
-            block.rect.y = platform[3]
-            # block.player = self.player
-            self.platform_list.add(block)
+    def __init__(self, player=None, level=DEFAULT_LEVEL, seed=None, width=SCR_WIDTH, height=SCR_HEIGHT):
+        """
+        Create arena for player using the chunked level in directory level.
+        seed -- seed for enemy spawns, random if None
+        width, height -- size of the view the arena is drawn in
+        """
+        self.index = SpatialHash() # grid used for all collision queries in arena
+        self.platform_list = IndexedGroup(self.index) # platforms in arena
+        self.enemy_list = IndexedGroup(self.index) # enemies in arena
+        self.camera = Camera(width, height) # part of the arena on screen
+        self.background = assets.image("images/temp_bg.jpg")
+        self.player = player
+        # platforms are drawn from pre-baked tiles
+        self.staticLayer = StaticLayer(self.platform_list, width, height)
+        # how to get between platforms, rebuilt when the baked geometry changes
+        self.nav = NavGraph(self)
+        
+        # load platforms near the camera, more are loaded as it scrolls
+        self.stream = LevelStreamer(self, level, Platform)
+        self.stream.update(self.camera.viewport)
  
-        # How far this world has been scrolled left/right
-        self.world_shift = 0
+        # send waves of enemies at the player, big waves are simulated with numpy when available
+        sim = None
+        if enemysim.np is not None:
+            sim = enemysim.EnemySim()
+        self.waves = WaveSpawner(self, seed=seed, sim=sim)
+        self.projectiles = ProjectileSystem(self) # shots fired by weapons
  
-    def update(self):
-        """ Update everything in this arena."""
+    def update(self, seconds):
+        """ Update everything in this arena over seconds."""
+        self.stream.update(self.camera.viewport)
+        self.waves.recall(*self.stream.area()) # enemies past the loaded platforms would fall through
+        self.waves.update(seconds)
         self.platform_list.update()
-        self.enemy_list.update()
+        sim = self.waves.pool.sim
+        if sim is None:
+            self.enemy_list.update(seconds)
+            self.enemy_list.refresh() # re-bucket enemies that moved
+        else:
+            # move every enemy at once, then only the sprites near the screen
+            targetX = self.player.rect.centerx if self.player else None
+            sim.step(seconds, targetX, self.platform_list)
+            sim.sync(self.waves.pool.enemies, self.enemy_list, self.camera.viewport)
+        self.projectiles.update(seconds)
+        if self.player is not None and self.enemy_list.collide(self.player):
+            self.player.hurt(ENEMY_DAMAGE) # touching enemies hurts
  
+    def interpolate(self, alpha):
+        """ Draw enemies and projectiles alpha of the way between the last two steps. """
+        sim = self.waves.pool.sim
+        if sim is None:
+            for enemy in self.enemy_list:
+                enemy.interpolate(alpha)
+        else:
+            sim.interpolate(alpha, self.waves.pool.enemies)
+        self.projectiles.interpolate(alpha)
+
     def draw(self, screen):
         """ Draw everything on this arena. """
         # Draw the background
-        screen.fill((255,255,255))
-        screen.blit(self.background,(self.world_shift // 3,0))
+        self.drawBackground(screen)
         
-        # Draw all the sprite lists that we have
-        self.platform_list.draw(screen)
-        self.enemy_list.draw(screen)
- 
-    def shift_world(self, shift_x):
-        """ When the user moves left/right and we need to scroll
-        everything: """
- 
-        # Keep track of the shift amount
-        self.world_shift += shift_x
+        # Draw all the sprite lists that are on screen
+        self.staticLayer.draw(screen, self.camera)
+        self.camera.draw(screen, self.staticLayer.movers)
+        self.camera.draw(screen, self.enemy_list)
+        self.projectiles.draw(screen, self.camera)
  
-        # Go through all the sprite lists and shift
-        for platform in self.platform_list:
-            platform.rect.x += shift_x
+    def drawBackground(self, screen):
+        """ Draw the background scrolled at a third of the world speed. """
+        screen.fill((255,255,255))
+        screen.blit(self.background,(self.parallaxOffset(),0))
  
-        for enemy in self.enemy_list:
-            enemy.rect.x += shift_x
+    def parallaxOffset(self):
+        """ x position of the background for the current camera position. """
+        return -self.camera.x // 3
 
 if __name__ == "__main__":
-    game = MainView(SCR_WIDTH, SCR_HEIGHT, fps=60)
+    parser = argparse.ArgumentParser(description="Fight in the arena")
+    parser.add_argument("--record", help="save input to this file, play it back with benchmarks.replay")
+    parser.add_argument("--seed", type=int, help="seed for enemy spawns")
+    parser.add_argument("--trace", help="profile from the start and write a Chrome trace here on exit")
+    args = parser.parse_args()
+    
+    seed = args.seed
+    recorder = None
+    if args.record:
+        seed = seed if seed is not None else int.from_bytes(os.urandom(4), "little")
+        recorder = InputRecorder(args.record, seed)
+    profiler = Profiler()
+    profiler.enabled = bool(args.trace)
+    game = MainView(SCR_WIDTH, SCR_HEIGHT, fps=60, seed=seed, input=recorder, profiler=profiler)
     game.run()
+    if args.trace:
+        profiler.export(args.trace)
     
\ No newline at end of file
@@ -0,0 +1,10 @@
+"""
+Shared setup for the tests: run them from the root of the repo with
+    python -m pytest
+"""
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # modules using pygame don't need a display
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
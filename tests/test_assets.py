@@ -0,0 +1,56 @@
+"""
+Tests of AssetManager preloading and forgetting
+"""
+import json
+import threading
+from modules.assets import AssetManager, dataSize
+
+def slowManager(monkeypatch):
+    """
+    return (manager, started, release) where reads wait for release to be set
+    """
+    manager = AssetManager()
+    started = threading.Event()
+    release = threading.Event()
+    read = manager.read
+    def slowRead(path):
+        started.set()
+        release.wait(5)
+        return read(path)
+    monkeypatch.setattr(manager, "read", slowRead)
+    return manager, started, release
+
+def test_forget_during_preload_drops_the_result(tmp_path, monkeypatch):
+    path = str(tmp_path / "chunk.json")
+    with open(path, "w") as f:
+        json.dump({"platforms": [[1, 2, 3, 4]]}, f)
+    manager, started, release = slowManager(monkeypatch)
+    manager.preload([path])
+    assert started.wait(5)
+    manager.forget(path)
+    release.set()
+    manager.pool.shutdown(wait=True)
+    assert manager.loaded == {} and manager.pending == {} and manager.memory() == {}
+
+def test_preload_again_after_forget(tmp_path, monkeypatch):
+    path = str(tmp_path / "chunk.json")
+    with open(path, "w") as f:
+        json.dump({"platforms": []}, f)
+    manager, started, release = slowManager(monkeypatch)
+    manager.preload([path])
+    assert started.wait(5)
+    manager.forget(path)
+    manager.preload([path])
+    release.set()
+    assert manager.json(path) == {"platforms": []}
+    assert manager.hits == 1 and manager.misses == 0
+
+def test_memory_counts_parsed_json(tmp_path):
+    path = str(tmp_path / "chunk.json")
+    data = {"platforms": [[500, 25, x, 400] for x in range(100)]}
+    with open(path, "w") as f:
+        json.dump(data, f)
+    manager = AssetManager()
+    manager.json(path)
+    assert manager.memory() == {path: dataSize(data)}
+    assert manager.totalMemory() > 100 * 4 * 24 # at least the ints
@@ -0,0 +1,30 @@
+"""
+Tests of AutoSaver error reporting
+"""
+from modules.autosave import AutoSaver
+
+class Store():
+    def __init__(self):
+        self.fail = None
+        self.flushed = 0
+
+    def flush(self):
+        if self.fail is not None:
+            raise self.fail
+        self.flushed += 1
+
+def test_last_error_is_kept_until_a_flush_works(capsys):
+    store = Store()
+    saver = AutoSaver([store], delay=60)
+    try:
+        store.fail = OSError(28, "No space left on device")
+        assert saver.flush() is False
+        stats = saver.stats()
+        assert stats['lastError'] is store.fail and stats['errors'] == 1
+        store.fail = None
+        assert saver.flush() is True
+        assert saver.stats()['lastError'] is None
+    finally:
+        saver.stop()
+    assert store.flushed == 2
+    assert capsys.readouterr().out == ""
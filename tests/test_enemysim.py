@@ -0,0 +1,104 @@
+"""
+Tests of the EnemySim backend and how WaveSpawner picks it
+"""
+import pygame
+import pytest
+from modules.spatial import SpatialHash, IndexedGroup
+from modules.enemy import EnemyPool, WaveSpawner
+from modules.player import SCR_HEIGHT
+np = pytest.importorskip("numpy")
+from modules.enemysim import EnemySim
+
+class Level():
+    def __init__(self, platforms=()):
+        self.index = SpatialHash()
+        self.platform_list = IndexedGroup(self.index)
+        self.enemy_list = IndexedGroup(self.index)
+        for rect in platforms:
+            block = pygame.sprite.Sprite()
+            block.rect = pygame.Rect(rect)
+            self.platform_list.add(block)
+
+def spawn(level, pool, x, y):
+    enemy = pool.acquire()
+    enemy.spawn(level, x, y, None)
+    level.enemy_list.add(enemy)
+    return enemy
+
+def run(sim, level, pool, steps, view=pygame.Rect(0, 0, 640, 480)):
+    for i in range(steps):
+        sim.step(1 / 120.0, None, level.platform_list)
+        sim.sync(pool.enemies, level.enemy_list, view)
+
+def test_lands_on_highest_platform_it_overlaps():
+    level = Level([(0, 300, 200, 20), (100, 250, 200, 20), (1000, 300, 200, 20)])
+    sim = EnemySim()
+    pool = EnemyPool(10, sim=sim)
+    both = spawn(level, pool, 120, 100) # over both platforms
+    far = spawn(level, pool, 1050, 100) # over the one at x 1000, in another cell
+    none = spawn(level, pool, 500, 100) # nothing under it
+    run(sim, level, pool, 300, view=pygame.Rect(0, 0, 2000, 480))
+    assert both.rect.bottom == 250
+    assert far.rect.bottom == 300
+    assert none.rect.bottom == SCR_HEIGHT
+
+def test_lands_across_cell_edges():
+    level = Level([(120, 300, 20, 20)]) # only in cell 0, enemy mostly in cell 1
+    sim = EnemySim()
+    pool = EnemyPool(1, sim=sim)
+    enemy = spawn(level, pool, 125, 100)
+    run(sim, level, pool, 300)
+    assert enemy.rect.bottom == 300
+
+def test_far_enemies_are_suspended_from_the_hash():
+    level = Level()
+    sim = EnemySim(margin=0)
+    pool = EnemyPool(2, sim=sim)
+    near = spawn(level, pool, 100, 400)
+    far = spawn(level, pool, 5000, 400)
+    run(sim, level, pool, 1)
+    everywhere = pygame.Rect(-10000, 0, 20000, 480)
+    assert level.enemy_list.query(everywhere) == [near]
+    assert len(level.enemy_list) == 2
+    sim.x[far.slot] = 300
+    run(sim, level, pool, 1)
+    assert far in level.enemy_list.query(pygame.Rect(290, 0, 60, 480))
+    far.kill()
+    assert not sim.synced[far.slot]
+
+def test_outside():
+    level = Level()
+    sim = EnemySim()
+    pool = EnemyPool(3, sim=sim)
+    inside = spawn(level, pool, 100, 0)
+    left = spawn(level, pool, -50, 0)
+    right = spawn(level, pool, 990, 0)
+    assert sorted(sim.outside(0, 1000)) == sorted([left.slot, right.slot])
+
+def test_backend_follows_wave_size():
+    arena = Level()
+    arena.camera = type("Camera", (), {"viewport": pygame.Rect(0, 0, 640, 480)})()
+    arena.player = None
+    waves = WaveSpawner(arena, firstWave=10, growth=10, delay=0, sim=EnemySim(), simWave=50)
+    waves.update(0.1)
+    assert waves.wave == 1 and waves.pool.sim is None
+    waves.spawnBatch()
+    for enemy in list(arena.enemy_list):
+        enemy.hit(1000)
+    waves.update(0.1)
+    assert waves.wave == 2 and waves.pool.sim is waves.sim
+
+def test_interpolates_like_the_sprites():
+    level = Level()
+    sim = EnemySim()
+    simmed = spawn(level, EnemyPool(1, sim=sim), 100, 100)
+    sprite = spawn(level, EnemyPool(1), 100, 100)
+    for i in range(10):
+        sim.step(1 / 60.0, None, level.platform_list)
+        sprite.update(1 / 60.0)
+    sim.sync(simmed.pool.enemies, level.enemy_list, pygame.Rect(0, 0, 640, 480))
+    sim.interpolate(0.5, simmed.pool.enemies)
+    sprite.interpolate(0.5)
+    assert sprite.prevPos.y < sprite.exact.y
+    assert simmed.drawRect == sprite.drawRect
+    assert sprite.drawRect.y == round((sprite.prevPos.y + sprite.exact.y) / 2) < sprite.rect.y
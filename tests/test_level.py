@@ -0,0 +1,62 @@
+"""
+Tests of the chunked level format and the LevelStreamer
+"""
+import time
+import pygame
+import pytest
+from modules.level import writeLevel, LevelStreamer
+from modules.spatial import SpatialHash, IndexedGroup
+from modules.assets import manager as assets
+
+class Arena():
+    def __init__(self):
+        self.platform_list = IndexedGroup(SpatialHash())
+
+def makePlatform(width, height):
+    block = pygame.sprite.Sprite()
+    block.rect = pygame.Rect(0, 0, width, height)
+    return block
+
+def test_negative_x_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        writeLevel(str(tmp_path), [[100, 20, 0, 300], [100, 20, -1, 300]])
+
+def test_walk_through_level(tmp_path):
+    path = str(tmp_path / "level")
+    writeLevel(path, [[100, 20, x, 300] for x in range(0, 10 * 640, 320)], chunkWidth=640)
+    arena = Arena()
+    stream = LevelStreamer(arena, path, makePlatform)
+    view = pygame.Rect(0, 0, 640, 480)
+    stream.update(view)
+    assert stream.area()[0] == float('-inf')
+    for x in range(0, 6000, 8):
+        view.x = x
+        stream.update(view)
+        first, last = stream.visible
+        assert all(n in stream.loaded for n in range(first, last + 1))
+        left, right = stream.area()
+        assert left <= view.left and view.right <= right
+    for i in range(500): # let the worker thread finish reading
+        if not stream.waiting:
+            break
+        time.sleep(0.01)
+        stream.update(view)
+    first, last = stream.window
+    assert all(n in stream.loaded for n in range(first, last + 1))
+    assert stream.area()[1] == float('inf')
+    xs = sorted(block.rect.x for block in arena.platform_list)
+    assert xs == [x for x in range(0, 10 * 640, 320) if x // 640 in stream.loaded]
+
+def test_area_leaves_out_chunks_still_being_read(tmp_path, monkeypatch):
+    path = str(tmp_path / "level")
+    writeLevel(path, [[100, 20, x, 300] for x in range(0, 10 * 640, 320)], chunkWidth=640)
+    monkeypatch.setattr(assets, "ready", lambda paths: False) # the worker never finishes
+    arena = Arena()
+    stream = LevelStreamer(arena, path, makePlatform)
+    view = pygame.Rect(3 * 640, 0, 640, 480)
+    stream.update(view)
+    first, last = stream.visible
+    assert stream.waiting # chunks past the screen are wanted but not read yet
+    assert sorted(stream.loaded) == list(range(first, last + 1))
+    assert stream.area() == (first * 640 + stream.reach, (last + 1) * 640)
+    assert stream.area()[1] < (stream.window[1] + 1) * 640
@@ -0,0 +1,106 @@
+"""
+Tests of the NavGraph A* search and its path cache
+"""
+import heapq
+import random
+import pygame
+from modules.spatial import SpatialHash, IndexedGroup
+from modules.render import StaticLayer
+from modules.navigation import NavGraph, airTime, JUMP_HEIGHT
+from modules.player import SCR_HEIGHT
+
+class Arena():
+    def __init__(self, rects=()):
+        self.platform_list = IndexedGroup(SpatialHash())
+        for rect in rects:
+            self.platform_list.add(block(rect))
+        self.staticLayer = StaticLayer(self.platform_list, 640, 480)
+
+def block(rect, moving=False):
+    sprite = pygame.sprite.Sprite()
+    sprite.rect = pygame.Rect(rect)
+    sprite.moving = moving
+    return sprite
+
+def standing(sprite):
+    rect = pygame.Rect(0, 0, 30, 40)
+    rect.midbottom = sprite.rect.midtop
+    return rect
+
+def cost(path):
+    total = 0.0
+    for a, b in zip(path, path[1:]):
+        total += min(frames for node, frames, kind in a.edges if node is b)
+    return total
+
+def dijkstra(start, goal):
+    best = {start: 0.0}
+    frontier = [(0.0, 0, start)]
+    count = 0
+    while frontier:
+        c, n, node = heapq.heappop(frontier)
+        if node is goal:
+            return c
+        if c > best[node]:
+            continue
+        for other, frames, kind in node.edges:
+            if c + frames < best.get(other, float('inf')):
+                best[other] = c + frames
+                count += 1
+                heapq.heappush(frontier, (c + frames, count, other))
+    return None
+
+def test_air_time():
+    assert airTime(JUMP_HEIGHT + 1) is None
+    assert airTime(0) > airTime(JUMP_HEIGHT / 2) > 0
+    assert airTime(-100) > airTime(0)
+
+def test_stairs_up_and_too_high():
+    ground = SCR_HEIGHT
+    arena = Arena([(100, ground - 60, 80, 16), (220, ground - 130, 80, 16),
+                   (340, ground - 200, 80, 16), (1000, ground - 150, 80, 16)])
+    low, mid, top, high = list(arena.platform_list)
+    nav = NavGraph(arena)
+    path = nav.route(pygame.Rect(100, ground - 40, 30, 40), standing(top))
+    assert [node.platform for node in path[-3:]] == [low, mid, top]
+    under = nav.route(standing(top), pygame.Rect(1000, ground - 40, 30, 40))
+    assert under[-1].platform is None and under[-1].key in nav.nodes # down and along the ground
+    assert nav.route(standing(top), standing(high)) is None # nothing to climb on
+
+def test_a_star_finds_cheapest_path():
+    rng = random.Random(4)
+    arena = Arena([(rng.randrange(0, 4000), rng.randrange(150, SCR_HEIGHT - 20), rng.randrange(60, 200), 16)
+                   for i in range(80)])
+    nav = NavGraph(arena)
+    nav.current()
+    nodes = list(nav.nodes.values())
+    for i in range(40):
+        start, goal = rng.choice(nodes), rng.choice(nodes)
+        path = nav.search(start, goal)
+        expected = dijkstra(start, goal)
+        if expected is None:
+            assert path is None
+        else:
+            assert path[0] is start and path[-1] is goal
+            assert abs(cost(path) - expected) < 1e-6
+
+def test_paths_are_cached_until_the_geometry_changes():
+    arena = Arena([(100, 400, 80, 16), (300, 380, 80, 16)])
+    a, b = list(arena.platform_list)
+    nav = NavGraph(arena)
+    first = nav.path(a, b)
+    assert nav.path(a, b) is first
+    assert nav.searches == 1 and nav.builds == 1
+
+    arena.platform_list.add(block((600, 300, 50, 10), moving=True))
+    assert nav.path(a, b) is first # moving platforms aren't in the graph
+    assert nav.builds == 1
+
+    arena.platform_list.add(block((200, 390, 50, 10)))
+    again = nav.path(a, b)
+    assert nav.builds == 2 and nav.searches == 2
+    assert again is not first
+
+    b.kill()
+    assert nav.path(a, b) is None
+    assert nav.builds == 3
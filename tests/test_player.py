@@ -0,0 +1,69 @@
+"""
+Tests of the XP_TABLE lookup in PlayerStats.addExperience
+"""
+from modules.player import PlayerStats, XP_TABLE, MAX_LEVEL, FIRST_LEVEL_XP, levelGrowth
+
+def levelOneAtATime(xp):
+    """
+    return level reached with xp by checking one threshold at a time
+    """
+    lvl, needed = 0, FIRST_LEVEL_XP
+    while lvl < MAX_LEVEL and xp >= needed:
+        lvl += 1
+        needed += int(needed * levelGrowth(lvl))
+    return lvl
+
+def test_table():
+    assert len(XP_TABLE) == MAX_LEVEL
+    assert XP_TABLE[0] == FIRST_LEVEL_XP
+    assert all(a < b for a, b in zip(XP_TABLE, XP_TABLE[1:]))
+    assert levelGrowth(9) == 0.45 and levelGrowth(17) == 0.4 and levelGrowth(26) == 0.3
+
+def test_below_threshold():
+    stats = PlayerStats()
+    assert stats.addExperience(FIRST_LEVEL_XP - 1) == (0, 0)
+    assert stats.lvl == 0 and stats.xpNeeded == FIRST_LEVEL_XP
+
+def test_exact_threshold():
+    stats = PlayerStats()
+    assert stats.addExperience(FIRST_LEVEL_XP) == (1, 1)
+    assert stats.lvl == 1 and stats.xpNeeded == XP_TABLE[1]
+
+def test_bulk_award_matches_one_at_a_time():
+    for xp in (0, 49, 50, 74, 75, 1000, 123456, XP_TABLE[40] - 1, XP_TABLE[40]):
+        stats = PlayerStats()
+        gained, points = stats.addExperience(xp)
+        assert stats.lvl == levelOneAtATime(xp) == gained == points
+        assert stats.skillPts == gained
+
+def test_split_awards_match_one_award():
+    whole = PlayerStats()
+    whole.addExperience(5000)
+    split = PlayerStats()
+    gained = sum(split.addExperience(xp)[0] for xp in (30, 900, 70, 4000))
+    assert gained == whole.lvl == split.lvl
+    assert split.xpNeeded == whole.xpNeeded
+
+def test_max_level():
+    stats = PlayerStats()
+    assert stats.addExperience(XP_TABLE[-1] * 10) == (MAX_LEVEL, MAX_LEVEL)
+    assert stats.maxed() and stats.xpNeeded == XP_TABLE[-1]
+    assert stats.addExperience(10 ** 9) == (0, 0)
+    assert stats.lvl == MAX_LEVEL and stats.xpNeeded == XP_TABLE[-1]
+
+def test_watchers_told_once_per_field():
+    stats = PlayerStats()
+    changes = []
+    stats.watch(lambda s, field: changes.append(field))
+    stats.addExperience(1000)
+    assert sorted(changes) == ['lvl', 'skillPts', 'xp', 'xpNeeded']
+
+def test_damage_less_armor_and_heal():
+    stats = PlayerStats(hp=20, armor=3)
+    assert stats.takeDamage(5) is False
+    assert stats.health == 18
+    assert stats.takeDamage(1) is False # at least 1 gets through armor
+    assert stats.health == 17
+    assert stats.takeDamage(100) is True
+    stats.heal()
+    assert stats.health == 20
@@ -0,0 +1,21 @@
+"""
+Test that the fights kept in benchmarks/recordings still play out the same
+"""
+import os
+import pytest
+import pygame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.skipif(not os.path.exists(os.path.join(ROOT, "images", "temp_bg.jpg")),
+                    reason="the arena background image isn't in this checkout")
+@pytest.mark.parametrize("name", ["short-fight.json", "wave-7.json"])
+def test_recorded_fight_matches_its_hash(monkeypatch, name):
+    monkeypatch.chdir(ROOT) # assets are loaded relative to the repo root
+    from benchmarks.replay import RECORDINGS, replay
+    from modules.replay import InputPlayer
+    player = InputPlayer.load(os.path.join(RECORDINGS, name))
+    digest, backends, frames, wall = replay(player)
+    assert frames == len(player.frames)
+    assert backends == player.recording["backends"]
+    assert digest == player.recording["hash"]
@@ -0,0 +1,73 @@
+"""
+Tests of the DueScheduler heap and the TASK_DUE events it posts
+"""
+from datetime import datetime
+import pygame
+import pytest
+from modules.scheduler import DueScheduler, TASK_DUE, dueTimestamp, MAX_POSTS
+
+class Task():
+    def __init__(self, name, dueDate, id=None):
+        self.name = name
+        self.dueDate = dueDate
+        self.id = id
+
+@pytest.fixture(autouse=True)
+def events():
+    pygame.display.init() # the event queue needs the video subsystem
+    pygame.event.clear()
+    yield
+    pygame.display.quit()
+
+def posted():
+    return [e.task for e in pygame.event.get(TASK_DUE)]
+
+def test_due_at_end_of_day():
+    assert dueTimestamp("2024-03-05") == datetime(2024, 3, 6).timestamp()
+    assert dueTimestamp("whenever") is None
+
+def test_update_posts_due_tasks_in_order():
+    scheduler = DueScheduler()
+    later = Task("later", "2024-03-06")
+    sooner = Task("sooner", "2024-03-05")
+    scheduler.add(later)
+    scheduler.add(sooner)
+    scheduler.add(Task("no date", ""))
+    assert len(scheduler) == 2
+    assert scheduler.nextDue() == dueTimestamp("2024-03-05")
+    assert scheduler.update(dueTimestamp("2024-03-05") - 1) == []
+    assert scheduler.update(dueTimestamp("2024-03-06")) == [sooner, later]
+    assert posted() == [sooner, later]
+    assert len(scheduler) == 0
+    assert scheduler.update(dueTimestamp("2030-01-01")) == []
+
+def test_removed_and_replaced_tasks_by_id():
+    scheduler = DueScheduler()
+    task = Task("a", "2024-03-05", id=7)
+    gone = Task("b", "2024-03-05", id=8)
+    scheduler.add(task)
+    scheduler.add(gone)
+    scheduler.remove(Task("b copy", "2024-03-05", id=8)) # a copy read from the repository
+    edited = Task("a edited", "2024-04-01", id=7)
+    scheduler.replace(task, edited)
+    assert scheduler.update(dueTimestamp("2024-03-31")) == []
+    assert scheduler.update(dueTimestamp("2024-04-01")) == [edited]
+    assert scheduler.nextDue() is None
+
+def test_posts_are_limited_per_update():
+    scheduler = DueScheduler()
+    for i in range(MAX_POSTS + 5):
+        scheduler.add(Task(str(i), "2024-01-01", id=i))
+    now = dueTimestamp("2024-01-01")
+    assert len(scheduler.update(now)) == MAX_POSTS
+    assert len(scheduler.update(now)) == 5
+
+def test_heap_is_rebuilt_when_mostly_removed():
+    scheduler = DueScheduler()
+    tasks = [Task(str(i), "2024-01-01", id=i) for i in range(200)]
+    for task in tasks:
+        scheduler.add(task)
+    for task in tasks[:190]:
+        scheduler.remove(task)
+    assert len(scheduler.heap) < 200
+    assert [t.id for t in scheduler.update(dueTimestamp("2024-01-01"))] == list(range(190, 200))
@@ -0,0 +1,47 @@
+"""
+Tests of SpatialHash and IndexedGroup
+"""
+import pygame
+from modules.spatial import SpatialHash, IndexedGroup
+
+def block(x, y, w=20, h=20):
+    sprite = pygame.sprite.Sprite()
+    sprite.rect = pygame.Rect(x, y, w, h)
+    return sprite
+
+def test_query_in_add_order():
+    group = IndexedGroup(SpatialHash(cellSize=32))
+    sprites = [block(x, 0) for x in (100, 0, 50, 10)]
+    group.add(*sprites)
+    assert group.query(pygame.Rect(0, 0, 200, 10)) == sprites
+
+def test_moved_rebuckets():
+    group = IndexedGroup(SpatialHash(cellSize=32))
+    sprite = block(0, 0)
+    group.add(sprite)
+    sprite.rect.x = 500
+    group.moved(sprite)
+    assert group.query(pygame.Rect(0, 0, 30, 30)) == []
+    assert group.query(pygame.Rect(490, 0, 30, 30)) == [sprite]
+
+def test_sprite_in_two_groups_on_one_grid():
+    index = SpatialHash(cellSize=32)
+    first, second = IndexedGroup(index), IndexedGroup(index)
+    sprite = block(0, 0)
+    first.add(sprite)
+    second.add(sprite)
+    everywhere = pygame.Rect(0, 0, 40, 40)
+    assert first.query(everywhere) == [sprite]
+    assert second.query(everywhere) == [sprite]
+
+    sprite.rect.x = 300
+    first.moved(sprite)
+    second.moved(sprite)
+    assert first.query(pygame.Rect(290, 0, 40, 40)) == [sprite]
+    assert second.query(pygame.Rect(290, 0, 40, 40)) == [sprite]
+
+    second.remove(sprite)
+    assert first.query(pygame.Rect(290, 0, 40, 40)) == [sprite]
+    assert second.query(pygame.Rect(290, 0, 40, 40)) == []
+    sprite.kill()
+    assert index.cells == {} and index.spans == {}
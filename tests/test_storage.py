@@ -0,0 +1,80 @@
+"""
+Tests of the JournalStore: flushing, compaction and recovery after crashes
+"""
+import os
+import pytest
+from modules.storage import JournalStore
+
+def reopen(store):
+    store.close()
+    return JournalStore(store.path)
+
+def test_flush_and_reopen(tmp_path):
+    store = JournalStore(str(tmp_path / "tasks.db"))
+    first = store.insert({'name': 'a'})
+    second = store.insert({'name': 'b'})
+    assert store.pending() == 2
+    assert store.flush() == 2
+    assert store.pending() == 0
+    assert store.update(first, {'name': 'a2'})
+    assert not store.update(first, {'name': 'a2'}) # unchanged, nothing to write
+    assert store.remove(second)
+    store = reopen(store)
+    assert store.all() == [(first, {'name': 'a2'})]
+    assert store.insert({'name': 'c'}) == second + 1 # ids aren't reused
+
+def test_compaction_empties_journal(tmp_path):
+    store = JournalStore(str(tmp_path / "tasks.db"), compactEvery=3)
+    ids = [store.insert({'n': i}) for i in range(3)]
+    store.flush()
+    assert os.path.exists(store.path)
+    with open(store.journalPath, "rb") as f:
+        assert f.read().count(b"\n") == 1 # just the header
+    store.update(ids[0], {'n': 10})
+    store = reopen(store)
+    assert dict(store.all()) == {ids[0]: {'n': 10}, ids[1]: {'n': 1}, ids[2]: {'n': 2}}
+
+def test_partial_journal_entry_is_dropped(tmp_path):
+    store = JournalStore(str(tmp_path / "tasks.db"))
+    recordId = store.insert({'n': 1})
+    store.close()
+    with open(store.journalPath, "ab") as f:
+        f.write(b'{"op": "put", "id": 9, "rec') # crash in the middle of a write
+    store = JournalStore(store.path)
+    assert store.all() == [(recordId, {'n': 1})]
+    store.insert({'n': 2})
+    store = reopen(store)
+    assert [r for i, r in store.all()] == [{'n': 1}, {'n': 2}]
+
+def test_stale_journal_is_not_replayed_over_snapshot(tmp_path):
+    store = JournalStore(str(tmp_path / "tasks.db"))
+    recordId = store.insert({'n': 1})
+    store.flush()
+    with open(store.journalPath, "rb") as f:
+        oldJournal = f.read()
+    store.update(recordId, {'n': 2})
+    store.compact()
+    store.close()
+    # crash after the snapshot was replaced but before the journal was
+    with open(store.journalPath, "wb") as f:
+        f.write(oldJournal)
+    store = JournalStore(store.path)
+    assert store.get(recordId) == {'n': 2}
+
+def test_failed_flush_keeps_changes(tmp_path, monkeypatch):
+    store = JournalStore(str(tmp_path / "tasks.db"))
+    recordId = store.insert({'n': 1})
+    store.flush()
+    store.update(recordId, {'n': 2})
+
+    def fail(fd):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "fsync", fail)
+    with pytest.raises(OSError):
+        store.flush()
+    assert store.pending() == 1
+    monkeypatch.undo()
+
+    assert store.flush() == 1
+    store = reopen(store)
+    assert store.get(recordId) == {'n': 2}
@@ -0,0 +1,60 @@
+"""
+Tests of TaskIndex filtering, searching and due date ordering
+"""
+from datetime import date
+from modules.task import Task
+from modules.taskindex import TaskIndex, parseDueDate, words
+
+def makeIndex(tasks):
+    index = TaskIndex()
+    for task in tasks:
+        index.add(task)
+    return index
+
+def test_parse_due_date_formats():
+    assert parseDueDate("2024-03-05") == date(2024, 3, 5)
+    assert parseDueDate("3/5/2024") == date(2024, 3, 5)
+    assert parseDueDate("Mar  5 2024") == date(2024, 3, 5)
+    assert parseDueDate("2024-02-30") is None
+    assert parseDueDate("someday") is None
+    assert parseDueDate("") is None
+
+def test_words_are_lower_case():
+    assert words("Buy MILK, eggs") == {"buy", "milk", "eggs"}
+    assert words(None) == set()
+
+def test_select_by_tag_and_text_keeps_list_order():
+    milk = Task("Buy milk", tags=["health"])
+    report = Task("Write report", notes="for the milk board", tags=["work"])
+    run = Task("Run", tags=["health"])
+    index = makeIndex([milk, report, run])
+    assert index.select(tag="health") == [milk, run]
+    assert index.select(text="mil") == [milk, report]
+    assert index.select(tag="health", text="mil") == [milk]
+    assert index.select(text="mil rep") == [report]
+    assert index.select(text="nothing") == []
+    assert index.select() == [milk, report, run]
+
+def test_select_by_due_date_puts_undated_last():
+    late = Task("late", duedate="2024-05-01")
+    undated = Task("undated")
+    early = Task("early", duedate="4/1/2024")
+    index = makeIndex([late, undated, early])
+    assert index.select(byDueDate=True) == [early, late, undated]
+    assert index.dueBetween(date(2024, 4, 1), date(2024, 5, 1)) == [early]
+
+def test_replace_and_remove_update_every_index():
+    old = Task("old name", duedate="2024-01-01", tags=["work"])
+    other = Task("other", tags=["work"])
+    index = makeIndex([old, other])
+    new = Task("new name", tags=["school"])
+    index.replace(old, new)
+    assert index.select(text="old") == []
+    assert index.select(text="new") == [new]
+    assert index.select(tag="work") == [other]
+    assert index.select() == [new, other] # kept old's position
+    assert index.select(byDueDate=True) == [new, other]
+    assert index.dueBetween(date(2000, 1, 1), date(2100, 1, 1)) == []
+    index.remove(new)
+    assert len(index) == 1
+    assert index.words == ["other"]
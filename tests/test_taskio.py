@@ -0,0 +1,93 @@
+"""
+Tests of task import and export in every file format
+"""
+import io
+import pytest
+from modules import taskio
+from modules.task import Task
+from modules.taskrepo import SQLiteTaskRepository
+
+RECORDS = [
+    {'name': 'Plain', 'notes': None, 'dueDate': None, 'tags': [], 'done': False},
+    {'name': 'Comma, semicolon; back\\\\slash', 'notes': 'two\nlines', 'dueDate': '2024-03-05',
+     'tags': ['work', 'school'], 'done': False},
+    {'name': 'Finished ' + 'long ' * 30 + 'café', 'notes': 'x', 'dueDate': '2024-12-31',
+     'tags': ['health'], 'done': True},
+]
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = SQLiteTaskRepository(str(tmp_path / "tasks.sqlite"))
+    yield repo
+    repo.close()
+
+def saved(repo):
+    """
+    return every record in repo without ids, open tasks first
+    """
+    records = []
+    for record in taskio.taskRecords(repo):
+        del record['id']
+        record['tags'] = sorted(record['tags'] or [])
+        records.append(record)
+    return records
+
+def expected(records):
+    return [dict(r, tags=sorted(r['tags'])) for r in records]
+
+@pytest.mark.parametrize("ext", [".jsonl", ".csv", ".ics"])
+def test_round_trip(tmp_path, repo, ext):
+    repo.addMany(RECORDS)
+    path = str(tmp_path / ("tasks" + ext))
+    assert taskio.exportTasks(repo, path) == 3
+
+    other = SQLiteTaskRepository(str(tmp_path / "other.sqlite"))
+    try:
+        assert taskio.importTasks(other, path, batchSize=2) == 3
+        records = saved(other)
+    finally:
+        other.close()
+    if ext == ".csv": # csv has no null, empty fields come back as ''
+        for record in records:
+            record['notes'] = record['notes'] or None
+            record['dueDate'] = record['dueDate'] or None
+    assert records == expected(RECORDS)
+
+def test_ics_uid_is_task_id(tmp_path, repo):
+    repo.addMany(RECORDS[:2])
+    first = repo.page()[0]
+    repo.remove(first.id)
+    path = str(tmp_path / "tasks.ics")
+    taskio.exportTasks(repo, path)
+    with open(path) as f:
+        text = f.read()
+    assert "UID:task-2@taskarena" in text
+    assert "UID:task-1@taskarena" not in text
+
+def test_ics_lines_are_folded():
+    out = io.StringIO()
+    taskio.writeICal([RECORDS[2]], out)
+    for line in out.getvalue().split("\r\n"):
+        assert len(line.encode("utf-8")) <= taskio.ICAL_LINE
+    records = list(taskio.readICal(io.StringIO(out.getvalue())))
+    assert records[0]['name'] == RECORDS[2]['name']
+
+def test_normalize_other_tools_fields():
+    record = taskio.normalize({'Title': 'x', 'Due Date': '2024-01-02', 'Labels': 'A; b,c', 'Status': 'Completed'})
+    assert record == {'name': 'x', 'notes': None, 'dueDate': '2024-01-02',
+                      'tags': ['a', 'b', 'c'], 'done': True}
+
+def test_jsonl_line_that_is_not_an_object():
+    with pytest.raises(ValueError):
+        list(taskio.readJSONL(io.StringIO('{"name": "ok"}\n[1, 2]\n')))
+
+def test_failed_import_keeps_earlier_batches(tmp_path, repo):
+    path = tmp_path / "tasks.jsonl"
+    path.write_text('{"name": "a"}\n{"name": "b"}\n"oops"\n')
+    with pytest.raises(ValueError):
+        taskio.importTasks(repo, str(path), batchSize=1)
+    assert [t.name for t in repo.page()] == ["a", "b"]
+
+def test_unknown_format(tmp_path, repo):
+    with pytest.raises(ValueError):
+        taskio.exportTasks(repo, str(tmp_path / "tasks.txt"))
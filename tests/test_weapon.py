@@ -0,0 +1,46 @@
+"""
+Tests of what ProjectileSystem shots hit
+"""
+import pygame
+from modules.spatial import SpatialHash, IndexedGroup
+from modules.enemy import EnemyPool
+from modules.weapon import ProjectileSystem
+
+class Arena():
+    def __init__(self):
+        self.index = SpatialHash()
+        self.platform_list = IndexedGroup(self.index)
+        self.enemy_list = IndexedGroup(self.index)
+
+def enemies(arena, count, x, y):
+    pool = EnemyPool(count)
+    spawned = []
+    for i in range(count):
+        enemy = pool.acquire()
+        enemy.spawn(arena, x, y, None)
+        spawned.append(enemy)
+    return spawned
+
+def shoot(arena, x=0, y=100):
+    system = ProjectileSystem(arena)
+    system.launch(x, y, 1000, 0, 5, 1.0)
+    system.update(0.5)
+    return system
+
+def test_tie_goes_to_lowest_slot_whatever_order_they_were_added():
+    for order in (slice(None), slice(None, None, -1)):
+        arena = Arena()
+        stacked = enemies(arena, 6, 200, 80) # all at the same spot
+        arena.enemy_list.add(*stacked[order])
+        shoot(arena)
+        assert [e.hp for e in stacked] == [15, 20, 20, 20, 20, 20]
+
+def test_platform_in_front_of_enemy_at_same_distance():
+    arena = Arena()
+    wall = pygame.sprite.Sprite()
+    wall.rect = pygame.Rect(200, 0, 10, 480)
+    arena.platform_list.add(wall)
+    enemy, = enemies(arena, 1, 200, 80)
+    arena.enemy_list.add(enemy)
+    system = shoot(arena)
+    assert enemy.hp == 20 and system.hits == 0 and not system.live